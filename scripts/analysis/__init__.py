@@ -0,0 +1,6 @@
+"""
+Shared Python helpers for the Stockfish and tactics analysis scripts.
+
+The command-line scripts (analyze-pgn.py, highlights/generate-highlights.py, ...)
+have hyphenated names and cannot be imported, so code they share lives here.
+"""
@@ -0,0 +1,277 @@
+"""
+Asyncio UCI Engine Pool
+=======================
+
+Drives one or more UCI engine processes from a single asyncio event loop
+running on a background thread, so engine searches overlap with the
+Python-side work of the calling script:
+
+    - the next game's positions are searched while the caller analyzes the
+      previous game (EnginePool.map() yields results in order as they finish)
+    - within a game, the next position is sent to the engine before the
+      previous search output is parsed and written to the eval cache
+    - with size > 1, games are handed to whichever engine is idle, without
+      a worker process per engine
+
+The evaluations are the same dicts UciEngine.analyse() returns. With
+`record_path`, every evaluation the pool returns is also written to an
+engine recording (see engine_recording.py) for later replay. With a
+`profiler` (see profiling.py), engine searches, ucinewgame round trips and
+eval cache lookups are timed per call.
+
+Usage:
+    with EnginePool(path, size=2, options={'Hash': 64}, cache_path=path) as pool:
+        for evaluations, hits, misses in pool.map(tasks):
+            ...
+"""
+
+import asyncio
+import threading
+import time
+from typing import Iterable, Iterator, Optional
+
+from .engine_recording import EngineRecorder
+from .eval_cache import EvalCache, engine_fingerprint
+from .profiling import Profiler
+from .search_limit import SearchLimit
+from .uci_engine import EngineError, evaluation_from_output, parse_option_line, position_command
+
+
+class AsyncUciEngine:
+    """A UCI engine subprocess talked to with asyncio streams."""
+
+    def __init__(self, path: str, depth: int = 15, options: Optional[dict] = None):
+        self.path = path
+        self.depth = depth
+        self.name = ''
+        self.options = {}     # Option name -> current value, as in UciEngine
+        self._initial_options = options or {}
+        self._multipv = 1
+        self._output_end = 'bestmove'  # Last output line of the running search
+        self._process = None
+
+    async def start(self) -> None:
+        """Start the process and run the UCI handshake."""
+        try:
+            self._process = await asyncio.create_subprocess_exec(
+                self.path,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT
+            )
+        except OSError as e:
+            raise EngineError(f"Cannot start engine at {self.path}: {e}") from e
+
+        await self._send('uci')
+        for line in await self._read_until('uciok'):
+            if line.startswith('id name '):
+                self.name = line[len('id name '):]
+            elif line.startswith('option name '):
+                name, default = parse_option_line(line)
+                self.options[name] = default
+
+        for name, value in self._initial_options.items():
+            await self.set_option(name, value)
+        await self._ready()
+
+    async def _send(self, command: str) -> None:
+        if self._process.returncode is not None:
+            raise EngineError(f"Engine exited with code {self._process.returncode}")
+        self._process.stdin.write(f"{command}\n".encode())
+        await self._process.stdin.drain()
+
+    async def _read_until(self, prefix: str) -> list[str]:
+        """Read output lines up to and including the first line starting with `prefix`."""
+        lines = []
+        while True:
+            line = await self._process.stdout.readline()
+            if not line:
+                raise EngineError(f"Engine closed its output while waiting for '{prefix}'")
+            line = line.decode().strip()
+            lines.append(line)
+            if line.startswith(prefix):
+                return lines
+
+    async def _ready(self) -> None:
+        await self._send('isready')
+        await self._read_until('readyok')
+
+    async def set_option(self, name: str, value) -> None:
+        """Send a `setoption` command (booleans as true/false)."""
+        if isinstance(value, bool):
+            value = str(value).lower()
+        await self._send(f"setoption name {name} value {value}")
+        self.options[name] = str(value)
+
+    async def new_game(self) -> None:
+        """Clear the engine's hash between games (ucinewgame)."""
+        await self._send('ucinewgame')
+        await self._ready()
+
+    async def start_search(self, fen: str, limit: Optional[SearchLimit] = None, multipv: int = 1,
+                           game_line: Optional[tuple[str, tuple]] = None) -> None:
+        """Send a search without waiting for it; collect it with finish_search()."""
+        if multipv != self._multipv:
+            await self.set_option('MultiPV', multipv)
+            self._multipv = multipv
+        limit = limit or SearchLimit('depth', self.depth)
+        await self._send(position_command(fen, game_line))
+        for command in limit.go_commands():
+            await self._send(command)
+        self._output_end = limit.output_end
+
+    async def finish_search(self) -> list[str]:
+        """Output of the running search, up to and including its `bestmove` (or `readyok`, after `eval`) line."""
+        return await self._read_until(self._output_end)
+
+    async def analyse(self, fen: str, limit: Optional[SearchLimit] = None, multipv: int = 1,
+                      game_line: Optional[tuple[str, tuple]] = None) -> dict:
+        """Search a position once; same arguments and result as UciEngine.analyse()."""
+        await self.start_search(fen, limit, multipv, game_line)
+        return evaluation_from_output(fen, await self.finish_search(), multipv)
+
+    async def quit(self) -> None:
+        """Stop the engine process."""
+        if self._process is None or self._process.returncode is not None:
+            return
+        try:
+            await self._send('quit')
+            await asyncio.wait_for(self._process.wait(), timeout=5)
+        except (EngineError, OSError, asyncio.TimeoutError):
+            self._process.kill()
+            await self._process.wait()
+
+
+class EnginePool:
+    """
+    `size` engines on one event loop in a background thread.
+
+    The eval cache (if `cache_path` is given) is opened on the loop thread and
+    keyed by the engines' fingerprint; all lookups and stores happen there.
+    """
+
+    def __init__(self, path: str, size: int = 1, depth: int = 15, options: Optional[dict] = None,
+                 cache_path: Optional[str] = None, record_path: Optional[str] = None,
+                 profiler: Optional[Profiler] = None):
+        self.size = max(1, size)
+        self.profiler = profiler or Profiler()
+        self.cache: Optional[EvalCache] = None
+        self.recorder: Optional[EngineRecorder] = None
+        self._engines: list[AsyncUciEngine] = []
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='engine-pool', daemon=True)
+        self._thread.start()
+        try:
+            self._call(self._start(path, depth, options, cache_path, record_path))
+        except BaseException:
+            self.close()
+            raise
+
+    def _call(self, coroutine):
+        """Run a coroutine on the pool's loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def _start(self, path, depth, options, cache_path, record_path) -> None:
+        self._engines = [AsyncUciEngine(path, depth, options) for _ in range(self.size)]
+        await asyncio.gather(*(engine.start() for engine in self._engines))
+        self._idle = asyncio.Queue()
+        for engine in self._engines:
+            self._idle.put_nowait(engine)
+        if cache_path:
+            self.cache = EvalCache(engine_fingerprint(self._engines[0]), cache_path)
+        if record_path:
+            self.recorder = EngineRecorder(record_path, self._engines[0])
+
+    @property
+    def name(self) -> str:
+        return self._engines[0].name if self._engines else ''
+
+    async def _evaluate_game(self, requests, limit: SearchLimit, multipv: int) -> tuple[list[dict], int, int]:
+        """Evaluate (and record) the position requests of one game."""
+        result = await self._search_game(requests, limit, multipv)
+        if self.recorder is not None:
+            for request, evaluation in zip(requests, result[0]):
+                self.recorder.record(request.fen, limit, multipv, evaluation, request.game_line)
+        return result
+
+    async def _search_game(self, requests, limit: SearchLimit, multipv: int) -> tuple[list[dict], int, int]:
+        """Evaluate the position requests of one game on the next idle engine."""
+        profiler = self.profiler
+        evaluations: list[Optional[dict]] = [None] * len(requests)
+        if self.cache is not None:
+            with profiler.section('engine', 'cache lookup'):
+                for i, request in enumerate(requests):
+                    evaluations[i] = self.cache.get(request.fen, limit, multipv, request.game_line)
+        to_search = [i for i, evaluation in enumerate(evaluations) if evaluation is None]
+        hits = len(requests) - len(to_search) if self.cache is not None else 0
+        misses = len(to_search) if self.cache is not None else 0
+        if not to_search:
+            return evaluations, hits, misses
+
+        engine = await self._idle.get()
+        try:
+            # The hash is cleared once per game and stays warm across its positions
+            with profiler.section('engine', 'ucinewgame'):
+                await engine.new_game()
+            first = requests[to_search[0]]
+            await engine.start_search(first.fen, limit, multipv, first.game_line)
+            busy_since = time.perf_counter()
+            for n, i in enumerate(to_search):
+                output = await engine.finish_search()
+                # Time from sending the search (right after the previous one finished) to its bestmove
+                profiler.add('engine', f"search {limit.mode}", time.perf_counter() - busy_since)
+                # Keep the engine busy while this result is parsed and stored
+                if n + 1 < len(to_search):
+                    following = requests[to_search[n + 1]]
+                    await engine.start_search(following.fen, limit, multipv, following.game_line)
+                    busy_since = time.perf_counter()
+                with profiler.section('engine', 'parse output'):
+                    evaluations[i] = evaluation_from_output(requests[i].fen, output, multipv)
+                # A static eval the engine printed no value for is not kept
+                if self.cache is not None and not evaluations[i].get('missing'):
+                    with profiler.section('engine', 'cache store'):
+                        self.cache.put(requests[i].fen, limit, evaluations[i], requests[i].game_line)
+        finally:
+            self._idle.put_nowait(engine)
+        return evaluations, hits, misses
+
+    def map(self, tasks: Iterable[tuple[list, SearchLimit]], multipv: int = 1) -> Iterator[tuple[list[dict], int, int]]:
+        """
+        Evaluate (requests, limit) tasks, one game each, yielding
+        (evaluations, cache_hits, cache_misses) in task order. All tasks are
+        queued at once, so engines keep searching while the caller consumes results.
+        """
+        futures = [
+            asyncio.run_coroutine_threadsafe(self._evaluate_game(requests, limit, multipv), self._loop)
+            for requests, limit in tasks
+        ]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    async def _close(self) -> None:
+        await asyncio.gather(*(engine.quit() for engine in self._engines), return_exceptions=True)
+        if self.cache is not None:
+            self.cache.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+    def close(self) -> None:
+        """Stop the engines, close the cache, the recording and the event loop."""
+        if self._loop.is_closed():
+            return
+        try:
+            self._call(self._close())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+
+    def __enter__(self) -> 'EnginePool':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,159 @@
+"""
+Analysis Awards
+===============
+
+Declarative definitions of the analyze-pgn.py awards (Accuracy King, Blunder
+of the Round, ACPL extremes, ...) and a single-pass reducer computing all of
+them from the per-game records.
+
+Each award keeps a bounded min-heap of its best `top_k` entries, so besides
+the winner it exposes a leaderboard. Entries carry every field their score
+is computed from, so reductions are mergeable: two reducers (e.g. from
+parallel workers) merge with merge(), and an earlier output's leaderboards
+are folded back in with AwardReducer.from_leaderboards(), without re-reading
+the game records.
+
+Ties keep the entry that was added first (white before black, earlier game
+before later).
+"""
+
+import heapq
+import itertools
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+
+@dataclass(frozen=True)
+class Award:
+    """An award: candidate entries per game record, ranked by score (higher wins)."""
+    key: str                                        # Summary key, e.g. 'accuracyKing'
+    entries: Callable[[dict, dict], Iterable[dict]]  # (game record, moves per color) -> entries
+    score: Callable[[dict], float]                  # Entry -> rank
+
+
+def _game_ref(game: dict) -> dict:
+    return {'white': game['white'], 'black': game['black'], 'gameIndex': game['gameIndex']}
+
+
+def _per_color(build: Callable[[dict, str, int], dict]) -> Callable[[dict, dict], list[dict]]:
+    """Entries for white and black, built by build(game, color, moves)."""
+    return lambda game, moves: [build(game, color, moves[color]) for color in ('white', 'black')]
+
+
+def _embedded(field: str) -> Callable[[dict, dict], list[dict]]:
+    """The game's own `field` record (biggestBlunder, ...), if any, with the game reference."""
+    return lambda game, moves: [{**game[field], **_game_ref(game)}] if game[field] else []
+
+
+def _accuracy_entry(game, color, moves):
+    return {'player': color, 'accuracy': game[f'{color}Accuracy'], 'acpl': game[f'{color}ACPL'], **_game_ref(game)}
+
+
+def _acpl_entry(game, color, moves):
+    return {'player': color, 'acpl': game[f'{color}ACPL'], 'accuracy': game[f'{color}Accuracy'], **_game_ref(game)}
+
+
+def _combined_entry(game, moves):
+    return [{
+        'combinedACPL': game['whiteACPL'] + game['blackACPL'],
+        'whiteACPL': game['whiteACPL'],
+        'blackACPL': game['blackACPL'],
+        **_game_ref(game)
+    }]
+
+
+def _engine_moves_entry(game, color, moves):
+    engine_moves = game[f'{color}EngineMoves']
+    return {
+        'player': color,
+        'engineMoves': engine_moves,
+        'totalMoves': moves,
+        'percentage': round(engine_moves / moves * 100, 1) if moves > 0 else 0,
+        **_game_ref(game)
+    }
+
+
+def _inaccuracies_entry(game, color, moves):
+    return {
+        'player': color,
+        'inaccuracies': game[f'{color}MoveQuality']['inaccuracies'],
+        'totalMoves': moves,
+        **_game_ref(game)
+    }
+
+
+# In summary output order
+AWARDS = (
+    Award('accuracyKing', _per_color(_accuracy_entry), lambda e: e['accuracy']),
+    Award('biggestBlunder', _embedded('biggestBlunder'), lambda e: e['severity']),
+    Award('comebackKing', _embedded('biggestComeback'), lambda e: e['swing']),
+    Award('luckyEscape', _embedded('luckyEscape'), lambda e: e['escapeAmount']),
+    Award('stockfishBuddy', _per_color(_engine_moves_entry), lambda e: e['engineMoves']),
+    Award('inaccuracyKing', _per_color(_inaccuracies_entry), lambda e: e['inaccuracies']),
+    Award('lowestACPL', _per_color(_acpl_entry), lambda e: -e['acpl']),
+    Award('highestACPL', _per_color(_acpl_entry), lambda e: e['acpl']),
+    Award('lowestCombinedACPL', _combined_entry, lambda e: -e['combinedACPL']),
+    Award('highestCombinedACPL', _combined_entry, lambda e: e['combinedACPL']),
+)
+
+
+class AwardReducer:
+    """Top-K entries of every award over the game records added so far."""
+
+    def __init__(self, awards: Iterable[Award] = AWARDS, top_k: int = 5):
+        self.awards = tuple(awards)
+        self.top_k = max(1, top_k)
+        # Award key -> min-heap of (score, -sequence, entry); the root is the weakest kept entry
+        self._heaps = {award.key: [] for award in self.awards}
+        self._sequence = itertools.count()
+
+    def _push(self, award: Award, entry: dict) -> None:
+        item = (award.score(entry), -next(self._sequence), entry)
+        heap = self._heaps[award.key]
+        if len(heap) < self.top_k:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+
+    def add(self, game: dict) -> None:
+        """Fold one analyze-pgn game record into every award."""
+        moves = {color: sum(game[f'{color}MoveQuality'].values()) for color in ('white', 'black')}
+        for award in self.awards:
+            for entry in award.entries(game, moves):
+                self._push(award, entry)
+
+    def merge(self, other: 'AwardReducer') -> 'AwardReducer':
+        """Fold in another reduction (entries of `self` win ties)."""
+        for key, entries in other.leaderboards().items():
+            self._merge_entries(key, entries)
+        return self
+
+    def _merge_entries(self, key: str, entries: list[dict]) -> None:
+        award = next((award for award in self.awards if award.key == key), None)
+        if award is not None:
+            for entry in entries:
+                self._push(award, entry)
+
+    @classmethod
+    def from_leaderboards(cls, leaderboards: dict, awards: Iterable[Award] = AWARDS,
+                          top_k: int = 5) -> 'AwardReducer':
+        """Rebuild a reduction from the 'leaderboards' of an earlier output."""
+        reducer = cls(awards, top_k)
+        for key, entries in leaderboards.items():
+            reducer._merge_entries(key, entries)
+        return reducer
+
+    def leaderboard(self, key: str) -> list[dict]:
+        """Entries of one award, best first."""
+        return [entry for _, _, entry in sorted(self._heaps[key], reverse=True, key=lambda item: item[:2])]
+
+    def leaderboards(self) -> dict:
+        return {award.key: self.leaderboard(award.key) for award in self.awards}
+
+    def winner(self, key: str) -> Optional[dict]:
+        heap = self._heaps[key]
+        return max(heap, key=lambda item: item[:2])[2] if heap else None
+
+    def summary(self) -> dict:
+        """Winner of every award (None where no game qualified)."""
+        return {award.key: self.winner(award.key) for award in self.awards}
@@ -0,0 +1,129 @@
+"""
+Checkpoint / Resume for Long Engine Runs
+========================================
+
+A Checkpoint is an append-only JSONL sidecar holding the result of every
+game finished so far, so a run killed by a workflow timeout or a crash can be
+restarted with --resume and skip those games.
+
+    line 1:   {"settings": {...}}            engine, search budget, ... of the run
+    line 2+:  {"key": "<game key>", "data": {...}}
+
+Games are identified by a content key such as game_key() (a hash of their
+headers and moves), so a checkpoint never matches a different game even if
+the input PGN changed. A checkpoint written with other settings is ignored
+and started over.
+
+Each line is flushed as it is written and fsynced every FSYNC_INTERVAL
+seconds. terminate_on_sigterm() turns SIGTERM into a Terminated exception so
+scripts can flush the checkpoint and write a partial result before exiting.
+"""
+
+import hashlib
+import json
+import os
+import signal
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+# Default location: <repo>/.cache/<script>.checkpoint.jsonl
+CHECKPOINT_DIR = Path(__file__).resolve().parent.parent.parent / '.cache'
+
+FSYNC_INTERVAL = 30  # seconds
+
+# Headers that identify a game (together with its moves)
+KEY_HEADERS = ('Event', 'Site', 'Date', 'Round', 'White', 'Black', 'Result')
+
+
+class Terminated(Exception):
+    """Raised in the main thread when the process receives SIGTERM."""
+
+
+def terminate_on_sigterm() -> None:
+    """Raise Terminated on SIGTERM, so `finally` / `except` blocks get to run."""
+    def handler(signum, frame):
+        raise Terminated()
+    signal.signal(signal.SIGTERM, handler)
+
+
+def default_checkpoint_path(script: str) -> Path:
+    return CHECKPOINT_DIR / f"{script}.checkpoint.jsonl"
+
+
+def game_key(headers, moves: Iterable[str]) -> str:
+    """Identify a game by its identifying headers and UCI moves."""
+    content = json.dumps([[headers.get(name, '') for name in KEY_HEADERS], list(moves)])
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+class Checkpoint:
+    """Per-game results of an interrupted run, keyed by game_key()."""
+
+    def __init__(self, path: Path, settings: dict, resume: bool = False):
+        self.path = Path(path)
+        self.settings = settings
+        self.completed = {}   # Game key -> data
+        self.resumed = 0      # Games loaded from a previous run
+
+        if resume and self.path.exists():
+            self._load()
+
+        # Rewrite rather than append, dropping a torn last line or a stale run
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._write({'settings': settings})
+        for key, data in self.completed.items():
+            self._write({'key': key, 'data': data})
+        self._synced = time.monotonic()
+
+    def _load(self) -> None:
+        with open(self.path, encoding='utf-8') as f:
+            lines = iter(f)
+            try:
+                header = json.loads(next(lines))
+            except (StopIteration, json.JSONDecodeError):
+                return
+            if header.get('settings') != self.settings:
+                return
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Torn last line of a killed run
+                self.completed[entry['key']] = entry['data']
+        self.resumed = len(self.completed)
+
+    def _write(self, entry: dict) -> None:
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.completed.get(key)
+
+    def add(self, key: str, data: dict) -> None:
+        """Record a finished game (no-op if it is already checkpointed)."""
+        if key in self.completed:
+            return
+        self.completed[key] = data
+        self._write({'key': key, 'data': data})
+        if time.monotonic() - self._synced >= FSYNC_INTERVAL:
+            self.sync()
+
+    def sync(self) -> None:
+        """Force the checkpoint to disk."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._synced = time.monotonic()
+
+    def close(self) -> None:
+        """Sync and close, keeping the file for --resume."""
+        if self._file.closed:
+            return
+        self.sync()
+        self._file.close()
+
+    def discard(self) -> None:
+        """Close and remove the checkpoint once the run's output is written."""
+        self.close()
+        self.path.unlink(missing_ok=True)
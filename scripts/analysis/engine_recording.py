@@ -0,0 +1,129 @@
+"""
+Engine Answer Recording and Replay
+==================================
+
+--record FILE captures every evaluation the engine pool hands to a script
+(searched or served from the eval cache) together with the engine and search
+settings. --replay FILE serves those answers back through ReplayPool, which
+has the interface of EnginePool, so awards and highlights can be recomputed
+after a threshold change without Stockfish, in seconds. Recordings also make
+deterministic fixtures.
+
+File format (gzip-compressed JSON lines):
+
+    line 1:   {"engine": "Stockfish 16", "fingerprint": "...", "options": {...}}
+    line 2+:  {"position": "<EPD>", "limit": ["depth", 15], "multipv": 1, "evaluation": {...}}
+
+Positions are keyed like the eval cache (FEN without move clocks, plus the
+recent game history when searched through the game; see request_key()). A replay
+must ask for the same positions with the same search limits: positions that
+a replayed run resolves differently (e.g. a changed opening book) are missing
+and raise EngineError.
+"""
+
+import gzip
+import json
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from .eval_cache import engine_fingerprint, line_count, request_key
+from .search_limit import SearchLimit
+from .uci_engine import EngineError
+
+
+class EngineRecorder:
+    """Writes the evaluations of one run to a recording file."""
+
+    def __init__(self, path, engine):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = gzip.open(self.path, 'wt', encoding='utf-8')
+        self._seen = set()
+        self._write({'engine': engine.name, 'fingerprint': engine_fingerprint(engine), 'options': engine.options})
+
+    def _write(self, entry: dict) -> None:
+        self._file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+
+    def record(self, fen: str, limit: SearchLimit, multipv: int, evaluation: dict,
+               game_line: Optional[tuple] = None) -> None:
+        """Record an answer (once per position, limit and line count)."""
+        key = (request_key(fen, game_line), limit, multipv)
+        if key in self._seen:
+            return
+        self._seen.add(key)
+        self._write({'position': key[0], 'limit': [limit.mode, limit.amount], 'multipv': multipv,
+                     'evaluation': evaluation})
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+class EngineRecording:
+    """The answers of a recording, looked up by position and search limit."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._answers = {}  # (position key, SearchLimit) -> evaluations with increasing line counts
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                header = json.loads(f.readline())
+                for line in f:
+                    entry = json.loads(line)
+                    key = (entry['position'], SearchLimit(*entry['limit']))
+                    self._answers.setdefault(key, []).append(entry['evaluation'])
+        except (OSError, EOFError, ValueError, KeyError) as e:
+            raise EngineError(f"Cannot read engine recording {self.path}: {e}") from e
+
+        self.name = header['engine']
+        self.fingerprint = header['fingerprint']
+        self.options = header['options']
+        for evaluations in self._answers.values():
+            evaluations.sort(key=line_count)
+
+    def __len__(self) -> int:
+        return sum(len(evaluations) for evaluations in self._answers.values())
+
+    def get(self, fen: str, limit: SearchLimit, multipv: int = 1, game_line: Optional[tuple] = None) -> Optional[dict]:
+        """Recorded answer to a search of `fen` under `limit` with at least `multipv` lines, or None."""
+        for evaluation in self._answers.get((request_key(fen, game_line), limit), ()):
+            if line_count(evaluation) >= multipv:
+                return evaluation
+        return None
+
+
+class ReplayPool:
+    """Drop-in for EnginePool answering from an EngineRecording instead of engine processes."""
+
+    def __init__(self, recording: EngineRecording):
+        self.recording = recording
+        self.size = 1
+        self.cache = None
+
+    @property
+    def name(self) -> str:
+        return self.recording.name
+
+    def map(self, tasks: Iterable[tuple[list, SearchLimit]], multipv: int = 1) -> Iterator[tuple[list[dict], int, int]]:
+        """Same contract as EnginePool.map(); no cache hits or misses are reported."""
+        for requests, limit in tasks:
+            evaluations = []
+            for request in requests:
+                evaluation = self.recording.get(request.fen, limit, multipv, request.game_line)
+                if evaluation is None:
+                    raise EngineError(f"{request.fen} ({limit.describe()}, MultiPV {multipv}) "
+                                      f"is not in the recording {self.recording.path}")
+                evaluations.append(evaluation)
+            yield evaluations, 0, 0
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> 'ReplayPool':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,167 @@
+"""
+Persistent Stockfish Evaluation Cache
+=====================================
+
+SQLite-backed store of engine evaluations shared by all Stockfish-driven
+scripts, so positions searched in an earlier run are not searched again.
+
+Entries are keyed by:
+    - normalized position (FEN without halfmove/fullmove clocks); for a position
+      searched through its game's moves, plus the halfmove clock and the moves
+      since the last capture or pawn move (see request_key())
+    - engine fingerprint (engine name + evaluation-relevant options), suffixed
+      with the search mode for --nodes / --movetime budgets
+
+The depth column holds the search budget (depth, nodes or milliseconds).
+
+The deepest evaluation per key is kept (unless a shallower one brings more
+MultiPV lines), and a cached result satisfies any request at the same or a
+shallower depth asking for no more lines.
+"""
+
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+from .search_limit import SearchLimit
+
+# Default location: <repo>/.cache/stockfish-evals.sqlite
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent.parent / '.cache' / 'stockfish-evals.sqlite'
+
+# Engine options that only affect speed or logging, not the evaluation at a
+# fixed depth. They are left out of the fingerprint so e.g. runs with a
+# different hash size still share cached results.
+NON_EVAL_OPTIONS = {'Debug Log File', 'Hash', 'Threads', 'Ponder', 'Minimum Thinking Time', 'Slow Mover',
+                    'Move Overhead', 'MultiPV', 'UCI_ShowWDL', 'Clear Hash'}
+
+
+def position_key(fen: str) -> str:
+    """Normalize a FEN to board, side to move, castling and en passant fields."""
+    return ' '.join(fen.split()[:4])
+
+
+def request_key(fen: str, game_line: Optional[tuple] = None) -> str:
+    """
+    Key of a search of `fen`, reached through `game_line` (start FEN, UCI moves) if given.
+
+    Through a game line, the engine's result also depends on the history it can
+    see: repetitions and the 50-move rule, i.e. the moves since the last capture
+    or pawn move. Those moves and the halfmove clock are part of the key, so a
+    result never depends on which game (or run) searched the position first.
+    Right after a capture or pawn move the key is position_key(), shared with
+    bare-FEN searches.
+    """
+    fields = fen.split()
+    halfmove = int(fields[4]) if game_line is not None and len(fields) > 4 else 0
+    if halfmove == 0:
+        return position_key(fen)
+    moves = game_line[1]
+    return f"{position_key(fen)} {halfmove} {' '.join(moves[max(0, len(moves) - halfmove):])}".rstrip()
+
+
+def engine_fingerprint(engine) -> str:
+    """
+    Identify the engine configuration that produced an evaluation.
+    Returns a string like "Stockfish 16:3f2a9c1b0d4e".
+    """
+    options = {k: v for k, v in engine.options.items() if k not in NON_EVAL_OPTIONS}
+    options_hash = hashlib.sha1(json.dumps(options, sort_keys=True).encode()).hexdigest()[:12]
+    return f"{engine.name.split(' by ')[0]}:{options_hash}"
+
+
+def line_count(evaluation: dict) -> int:
+    """Number of MultiPV lines an evaluation carries (1 for a plain search)."""
+    return len(evaluation.get('lines', ())) or 1
+
+
+class EvalCache:
+    """Persistent cache of Stockfish evaluations for one engine configuration."""
+
+    def __init__(self, engine: str, path: Path = DEFAULT_CACHE_PATH):
+        self.engine = engine
+        self.path = Path(path)
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit + WAL so concurrent runs can share one file
+        self._conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS evaluations (
+                position TEXT NOT NULL,
+                engine TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                evaluation TEXT NOT NULL,
+                PRIMARY KEY (position, engine)
+            )
+        ''')
+
+    def _engine_key(self, limit: SearchLimit) -> str:
+        return self.engine if limit.mode == 'depth' else f"{self.engine}/{limit.mode}"
+
+    def _lookup(self, position: str, limit: SearchLimit) -> Optional[tuple[int, dict]]:
+        row = self._conn.execute(
+            'SELECT depth, evaluation FROM evaluations WHERE position = ? AND engine = ?',
+            (position, self._engine_key(limit))
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def get(self, fen: str, limit: SearchLimit, multipv: int = 1, game_line: Optional[tuple] = None) -> Optional[dict]:
+        """
+        Return a cached evaluation searched with at least the budget of `limit`
+        and at least `multipv` lines, or None. `game_line`: see request_key().
+        """
+        cached = self._lookup(request_key(fen, game_line), limit)
+        if cached is not None:
+            cached_amount, evaluation = cached
+            if cached_amount >= limit.amount and line_count(evaluation) >= multipv:
+                self.hits += 1
+                return evaluation
+
+        self.misses += 1
+        return None
+
+    def put(self, fen: str, limit: SearchLimit, evaluation: dict, game_line: Optional[tuple] = None) -> None:
+        """Store an evaluation unless one with at least the same budget and lines is cached."""
+        position = request_key(fen, game_line)
+        cached = self._lookup(position, limit)
+        if cached is not None:
+            cached_amount, cached_evaluation = cached
+            if cached_amount >= limit.amount and line_count(cached_evaluation) >= line_count(evaluation):
+                return
+
+        self._conn.execute(
+            'INSERT OR REPLACE INTO evaluations (position, engine, depth, evaluation) VALUES (?, ?, ?, ?)',
+            (position, self._engine_key(limit), limit.amount, json.dumps(evaluation))
+        )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def evaluate_position(engine, fen: str, limit: SearchLimit, cache: Optional[EvalCache] = None,
+                      multipv: int = 1, game_line: Optional[tuple] = None) -> dict:
+    """
+    Evaluate a position with a single engine search, consulting the cache first.
+
+    Returns the evaluation dict of UciEngine.analyse(): 'type', 'value', 'best_move'
+    and 'pv', plus the top `multipv` 'lines' when multipv > 1. `game_line`
+    (start FEN, UCI moves) lets the engine reach the position through the game.
+    """
+    if cache is not None:
+        cached = cache.get(fen, limit, multipv, game_line)
+        if cached is not None:
+            return cached
+
+    evaluation = engine.analyse(fen, limit, multipv, game_line)
+
+    if cache is not None:
+        cache.put(fen, limit, evaluation, game_line)
+
+    return evaluation
@@ -0,0 +1,183 @@
+"""
+Move Quality Metrics
+====================
+
+Lichess-style scoring shared by analyze-pgn.py and generate-highlights.py,
+vectorized with NumPy: win percentage, per-move classification, accuracy and
+ACPL for white and black.
+
+score_moves() takes flat arrays with one entry per scored move, and an
+optional game id per move, so a single game, a round or a whole season of
+stored evaluations is scored in one call. score_game() / score_games() build
+those arrays from eval vectors (see PositionBatch.game_evals).
+
+Classifications are small integer codes; CLASSIFICATIONS holds their names.
+Formulas: https://lichess.org/page/accuracy
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+EXCELLENT, GOOD, INACCURACY, MISTAKE, BLUNDER, BOOK = range(6)
+CLASSIFICATIONS = ('excellent', 'good', 'inaccuracy', 'mistake', 'blunder', 'book')
+
+# Win% loss boundaries between excellent | good | inaccuracy | mistake | blunder
+WIN_LOSS_BOUNDARIES = (2, 5, 10, 20)
+
+WHITE, BLACK = 0, 1
+
+
+def eval_to_cp(evaluation: dict) -> int:
+    """
+    Centipawns from white's perspective of an evaluation dict.
+    Uses granular mate scoring: mate-in-N = 10000 - (N * 10).
+    """
+    if evaluation['type'] == 'mate':
+        mate_in = evaluation['value']
+        return (10000 - abs(mate_in) * 10) * (1 if mate_in > 0 else -1)
+    return evaluation['value']
+
+
+def evals_to_cp(evals: Sequence[Optional[dict]]) -> tuple[np.ndarray, np.ndarray]:
+    """(centipawns, is_mate) arrays of an eval vector; positions without an evaluation are 0 / False."""
+    cp = np.array([eval_to_cp(e) if e is not None else 0 for e in evals], dtype=np.int64)
+    is_mate = np.array([e is not None and e['type'] == 'mate' for e in evals], dtype=bool)
+    return cp, is_mate
+
+
+def win_percentage(cp) -> np.ndarray:
+    """Win percentage for the side the centipawns favor (white's perspective in, white's out)."""
+    cp = np.asarray(cp, dtype=np.float64)
+    return 50 + 50 * (2 / (1 + np.power(10.0, -np.abs(cp) / 400)) - 1) * np.where(cp < 0, -1, 1)
+
+
+def classify(win_before, win_after, is_white, demote_decided: bool = False) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Classification codes and win% losses (from the mover's perspective, >= 0).
+    With `demote_decided`, a blunder played when the position was already decided
+    (win% before outside 10-90) counts as a mistake.
+    """
+    win_before = np.asarray(win_before, dtype=np.float64)
+    win_after = np.asarray(win_after, dtype=np.float64)
+    win_loss = np.where(is_white, win_before - win_after, (100 - win_before) - (100 - win_after))
+    win_loss = np.maximum(0, win_loss)
+
+    codes = np.searchsorted(np.array(WIN_LOSS_BOUNDARIES, dtype=np.float64), win_loss, side='right').astype(np.int8)
+    if demote_decided:
+        decided = (win_before <= 10) | (win_before >= 90)
+        codes[(codes == BLUNDER) & decided] = MISTAKE
+    return codes, win_loss
+
+
+def accuracy(mean_win_loss) -> np.ndarray:
+    """Lichess accuracy from the average win% loss, clamped to 0-100."""
+    return np.clip(103.1668 * np.exp(-0.04354 * np.asarray(mean_win_loss, dtype=np.float64)) - 3.1669, 0, 100)
+
+
+@dataclass
+class MoveScores:
+    """Per-move results (one entry per scored move) and per game / side aggregates."""
+    win_before: np.ndarray
+    win_after: np.ndarray
+    win_loss: np.ndarray
+    cp_loss: np.ndarray      # Centipawns lost by the mover (>= 0)
+    codes: np.ndarray        # Classification codes (see CLASSIFICATIONS)
+    accuracy: np.ndarray     # [game, WHITE | BLACK]; 100 without moves
+    acpl: np.ndarray         # [game, WHITE | BLACK]; moves with a mate score around them excluded, 0 without moves
+    counts: np.ndarray       # [game, WHITE | BLACK, code]
+
+    def quality(self, game: int, side: int) -> dict:
+        """Classification name -> move count of one side of one game."""
+        return dict(zip(CLASSIFICATIONS, self.counts[game, side].tolist()))
+
+
+def score_moves(cp_before, cp_after, is_white, game=None, n_games: Optional[int] = None,
+                cp_scored=None, book=None, demote_decided: bool = False) -> MoveScores:
+    """
+    Score moves given the centipawn evaluation (white's perspective) before and after each.
+
+    Args:
+        cp_before, cp_after: Evaluations around each move
+        is_white: Whether each move was played by white
+        game: Game id (0..n_games-1) of each move (default: all one game)
+        cp_scored: Whether each move counts toward ACPL (default: all)
+        book: Whether each move is an opening book move (classified BOOK, still counts toward accuracy)
+        demote_decided: See classify()
+    """
+    cp_before = np.asarray(cp_before, dtype=np.int64)
+    cp_after = np.asarray(cp_after, dtype=np.int64)
+    is_white = np.asarray(is_white, dtype=bool)
+    moves = len(cp_before)
+    game = np.zeros(moves, dtype=np.int64) if game is None else np.asarray(game, dtype=np.int64)
+    if n_games is None:
+        n_games = int(game.max()) + 1 if moves else 1
+    cp_scored = np.ones(moves, dtype=bool) if cp_scored is None else np.asarray(cp_scored, dtype=bool)
+
+    win_before = win_percentage(cp_before)
+    win_after = win_percentage(cp_after)
+    codes, win_loss = classify(win_before, win_after, is_white, demote_decided)
+    if book is not None:
+        codes[np.asarray(book, dtype=bool)] = BOOK
+    cp_loss = np.maximum(0, np.where(is_white, cp_before - cp_after, cp_after - cp_before))
+
+    # Aggregate per (game, side) group
+    group = game * 2 + np.where(is_white, WHITE, BLACK)
+    n_groups = n_games * 2
+    moves_per_group = np.bincount(group, minlength=n_groups)
+    win_loss_sum = np.bincount(group, weights=win_loss, minlength=n_groups)
+    scored_per_group = np.bincount(group[cp_scored], minlength=n_groups)
+    cp_loss_sum = np.bincount(group[cp_scored], weights=cp_loss[cp_scored], minlength=n_groups)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        group_accuracy = np.where(moves_per_group > 0, accuracy(win_loss_sum / moves_per_group), 100.0)
+        group_acpl = np.where(scored_per_group > 0, cp_loss_sum / scored_per_group, 0.0)
+    counts = np.bincount(group * len(CLASSIFICATIONS) + codes, minlength=n_groups * len(CLASSIFICATIONS))
+
+    return MoveScores(
+        win_before=win_before,
+        win_after=win_after,
+        win_loss=win_loss,
+        cp_loss=cp_loss,
+        codes=codes,
+        accuracy=group_accuracy.reshape(n_games, 2),
+        acpl=group_acpl.reshape(n_games, 2),
+        counts=counts.reshape(n_games, 2, len(CLASSIFICATIONS))
+    )
+
+
+def score_games(games: Iterable[tuple[Sequence[Optional[dict]], Iterable[int], int]],
+                demote_decided: bool = False) -> MoveScores:
+    """
+    Score the moves of several games in one call.
+
+    `games` yields (evals, plies, book_plies): the game's eval vector indexed by
+    position, the plies to score (evals[ply] and evals[ply + 1] must be filled in)
+    and the number of leading book moves. Per-move arrays are concatenated in
+    game order; aggregates are indexed by position in `games`.
+    """
+    before, after, white, game_ids, scored, book = [], [], [], [], [], []
+    n_games = 0
+    for game_id, (evals, plies, book_plies) in enumerate(games):
+        n_games += 1
+        plies = np.fromiter(sorted(plies), dtype=np.int64)
+        cp, is_mate = evals_to_cp(evals)
+        before.append(cp[plies])
+        after.append(cp[plies + 1])
+        white.append(plies % 2 == 0)
+        game_ids.append(np.full(len(plies), game_id, dtype=np.int64))
+        scored.append(~(is_mate[plies] | is_mate[plies + 1]))
+        book.append(plies < book_plies)
+
+    if not n_games:
+        return score_moves([], [], [], n_games=0)
+    return score_moves(np.concatenate(before), np.concatenate(after), np.concatenate(white),
+                       game=np.concatenate(game_ids), n_games=n_games, cp_scored=np.concatenate(scored),
+                       book=np.concatenate(book), demote_decided=demote_decided)
+
+
+def score_game(evals: Sequence[Optional[dict]], plies: Iterable[int], book_plies: int = 0,
+               demote_decided: bool = False) -> MoveScores:
+    """Score the given plies of one game (see score_games)."""
+    return score_games([(evals, plies, book_plies)], demote_decided)
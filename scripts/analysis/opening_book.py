@@ -0,0 +1,119 @@
+"""
+Opening Book Evaluation Table
+=============================
+
+Precomputed Stockfish evaluations for every position along the Lichess ECO
+lines in scripts/utils/openings-*.tsv, so the analyzers can resolve
+textbook opening positions without an engine search.
+
+The table is built once with scripts/build-opening-book.py and stored as
+scripts/utils/opening-book.tsv (not committed; the analysis workflows build it
+into the cached .cache directory before analyzing):
+
+    position<TAB>depth<TAB>type<TAB>value<TAB>best_move
+
+where position is the normalized FEN (see eval_cache.position_key), type/value
+are the Stockfish evaluation ('cp' or 'mate', from white's perspective) and
+best_move is in UCI notation.
+"""
+
+import csv
+import sys
+from pathlib import Path
+from typing import Iterator, Optional
+
+import chess
+
+from .eval_cache import position_key
+
+UTILS_DIR = Path(__file__).resolve().parent.parent / 'utils'
+ECO_FILES = [UTILS_DIR / f'openings-{letter}.tsv' for letter in 'abcde']
+DEFAULT_BOOK_PATH = UTILS_DIR / 'opening-book.tsv'
+
+BOOK_COLUMNS = ['position', 'depth', 'type', 'value', 'best_move']
+
+
+def iter_eco_lines() -> Iterator[tuple[str, str, list[str]]]:
+    """Yield (eco, name, SAN moves) for every line of the ECO TSV files."""
+    for path in ECO_FILES:
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f, delimiter='\t'):
+                moves = [token for token in row['pgn'].split() if not token[0].isdigit()]
+                yield row['eco'], row['name'], moves
+
+
+def book_fens() -> dict[str, str]:
+    """FEN of every position along the ECO lines (starting position included), keyed by position."""
+    fens = {}
+    for _, _, moves in iter_eco_lines():
+        board = chess.Board()
+        fens.setdefault(position_key(board.fen()), board.fen())
+        for san in moves:
+            board.push_san(san)
+            fens.setdefault(position_key(board.fen()), board.fen())
+    return fens
+
+
+class OpeningBook:
+    """Lookup table of opening positions and their stored evaluations."""
+
+    def __init__(self, entries: Optional[dict[str, dict]] = None):
+        self.entries = entries or {}
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_BOOK_PATH) -> 'OpeningBook':
+        """Load the book table; a missing table gives an empty book (with a warning)."""
+        path = Path(path)
+        if not path.exists():
+            print(f"⚠️  Opening book not found at {path}; opening positions will be searched "
+                  f"(build it with scripts/build-opening-book.py)", file=sys.stderr)
+            return cls()
+
+        entries = {}
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f, delimiter='\t'):
+                entries[row['position']] = {
+                    'type': row['type'],
+                    'value': int(row['value']),
+                    'best_move': row['best_move'] or None,
+                    'depth': int(row['depth'])
+                }
+        return cls(entries)
+
+    def save(self, path: Path = DEFAULT_BOOK_PATH) -> None:
+        """Write the table sorted by position so rebuilds give small diffs."""
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f, delimiter='\t', lineterminator='\n')
+            writer.writerow(BOOK_COLUMNS)
+            for position in sorted(self.entries):
+                entry = self.entries[position]
+                writer.writerow([position, entry['depth'], entry['type'], entry['value'], entry['best_move'] or ''])
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, fen: str) -> bool:
+        return position_key(fen) in self.entries
+
+    def get(self, fen: str, depth: int = 0) -> Optional[dict]:
+        """Stored evaluation of a position if it was searched to at least `depth`."""
+        entry = self.entries.get(position_key(fen))
+        if entry is None or entry['depth'] < depth:
+            return None
+        best_move = entry['best_move']
+        return {'type': entry['type'], 'value': entry['value'], 'best_move': best_move,
+                'pv': [best_move] if best_move else []}
+
+    def book_plies(self, fens: list[str]) -> int:
+        """
+        Number of leading moves of a game that stay in book.
+
+        `fens` holds every position of the game, starting position first. Move N
+        is a book move while the positions before and after it are all in the book.
+        """
+        if not fens or fens[0] not in self:
+            return 0
+        plies = 0
+        while plies + 1 < len(fens) and fens[plies + 1] in self:
+            plies += 1
+        return plies
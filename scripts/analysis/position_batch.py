@@ -0,0 +1,136 @@
+"""
+Position Deduplication Across a Batch of Games
+==============================================
+
+League games share long opening prefixes (1.e4 e5 2.Nf3 ...) and repeat
+positions within a game, so many positions of a batch are identical. A
+PositionBatch gathers every position the games need, keyed by EPD (FEN
+without move clocks), so each unique position is searched once and the
+result fans out to every game and ply that references it.
+
+Each unique position is assigned to the first game that reaches it. Games
+are evaluated in order, so by the time a game is analyzed all of its
+positions are known. When the game's moves are given, each request also
+carries the move sequence reaching it, so the engine can follow the game
+with a warm hash table.
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, Optional, Sequence
+
+from .eval_cache import request_key
+
+
+@dataclass
+class PositionRequest:
+    """A unique position to evaluate."""
+    fen: str                         # FEN of the first occurrence
+    start_fen: Optional[str] = None  # Start of the game it was first reached in
+    moves: tuple = ()                # UCI moves from start_fen to fen
+
+    @property
+    def game_line(self) -> Optional[tuple[str, tuple]]:
+        """(start FEN, moves) for UciEngine.analyse(), or None to search the bare FEN."""
+        return (self.start_fen, self.moves) if self.start_fen is not None else None
+
+    @property
+    def key(self) -> str:
+        """Deduplication and cache key (see eval_cache.request_key())."""
+        return request_key(self.fen, self.game_line)
+
+
+class PositionBatch:
+    """Unique positions referenced by a batch of games."""
+
+    def __init__(self):
+        self.references = 0     # Total (game, ply) positions requested
+        self.evaluations = {}   # Position key -> evaluation dict
+        self._requests: dict[str, PositionRequest] = {}
+        self._game_keys = {}    # Game id -> position key per ply (None = not requested)
+        self._game_new_keys = {}  # Game id -> keys first seen in that game, in ply order
+
+    def add_game(self, game_id, fens: list[str], plies: Iterable[int],
+                 moves: Optional[Sequence[str]] = None) -> None:
+        """
+        Register the positions of a game.
+
+        Args:
+            game_id: Identifier of the game (e.g. its gameIndex)
+            fens: FEN of every position of the game, starting position first
+            plies: Indices into `fens` that need an evaluation
+            moves: UCI moves of the game (fens[i + 1] follows moves[i]), if the
+                   engine should reach each position through the game
+        """
+        keys: list[Optional[str]] = [None] * len(fens)
+        new_keys = []
+
+        for ply in sorted(plies):
+            if moves is None:
+                request = PositionRequest(fens[ply])
+            else:
+                request = PositionRequest(fens[ply], fens[0], tuple(moves[:ply]))
+            key = request.key
+            keys[ply] = key
+            self.references += 1
+
+            if key not in self._requests:
+                self._requests[key] = request
+                new_keys.append(key)
+
+        self._game_keys[game_id] = keys
+        self._game_new_keys[game_id] = new_keys
+
+    def resolve(self, lookup) -> int:
+        """
+        Fill in evaluations that need no search (e.g. opening book positions).
+
+        `lookup(request)` returns an evaluation dict or None. Resolved positions
+        are dropped from pending(). Returns the number of resolved positions.
+        """
+        resolved = set()
+        for key, request in self._requests.items():
+            if key in self.evaluations:
+                continue
+            evaluation = lookup(request)
+            if evaluation is not None:
+                self.evaluations[key] = evaluation
+                resolved.add(key)
+
+        for game_id, keys in self._game_new_keys.items():
+            self._game_new_keys[game_id] = [key for key in keys if key not in resolved]
+        return len(resolved)
+
+    def pending(self, game_id) -> list[PositionRequest]:
+        """Positions first reached in this game, in ply order."""
+        return [self._requests[key] for key in self._game_new_keys[game_id]]
+
+    def record(self, game_id, evaluations: list[dict]) -> None:
+        """Store the evaluations of `pending(game_id)`, in the same order."""
+        for key, evaluation in zip(self._game_new_keys[game_id], evaluations):
+            self.evaluations[key] = evaluation
+
+    def game_keys(self, game_id) -> list[Optional[str]]:
+        """Position key of each ply of a game; None where no evaluation was requested."""
+        return list(self._game_keys[game_id])
+
+    def game_evals(self, game_id) -> list[Optional[dict]]:
+        """Eval vector of a game indexed by ply; None where no evaluation was requested."""
+        return [
+            self.evaluations[key] if key is not None else None
+            for key in self._game_keys[game_id]
+        ]
+
+    @property
+    def unique_positions(self) -> int:
+        return len(self._requests)
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Referenced positions per unique position (1.0 = no duplicates)."""
+        return self.references / self.unique_positions if self.unique_positions else 1.0
+
+    def summary(self) -> str:
+        """One-line report of the deduplication savings."""
+        saved = self.references - self.unique_positions
+        return (f"{self.unique_positions} unique of {self.references} positions "
+                f"(dedup ratio {self.dedup_ratio:.2f}x, {saved} searches saved)")
@@ -0,0 +1,206 @@
+"""
+Run Profiling (--profile)
+=========================
+
+Wall time and call counts per phase, engine call and detector, shared by
+analyze-pgn.py, analyze-tactics.py and highlights/generate-highlights.py:
+
+    profiler = Profiler(enabled=args.profile)
+    with profiler.phase('parse'):
+        ...
+    lap = profiler.laps('detector')     # time between marks, no re-indenting
+    ...; lap('checkmate')
+    for result in profiler.waiting(pool.map(tasks)):   # engine wait of the main thread
+        ...
+
+report() returns the breakdown for the output `metadata`: per-section
+{"calls", "seconds"}, plus wall time, process CPU time, main-thread CPU time
+and the time the main thread spent blocked on engine results. A disabled
+Profiler records nothing and its sections are no-ops.
+
+With a pstats path, the main thread additionally runs under cProfile and the
+stats are dumped on stop() (inspect with `python -m pstats FILE`).
+"""
+
+import cProfile
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, Iterable, Iterator, Optional
+
+from .search_limit import format_duration
+
+_NO_SECTION = nullcontext()
+
+
+class _Section:
+    """Context manager adding its wall time to one profiler entry."""
+
+    __slots__ = ('_profiler', '_key', '_started')
+
+    def __init__(self, profiler: 'Profiler', key: tuple[str, str]):
+        self._profiler = profiler
+        self._key = key
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self._profiler.add(*self._key, time.perf_counter() - self._started)
+
+
+class Profiler:
+    """Per-section wall time and call counts of one run."""
+
+    def __init__(self, enabled: bool = False, pstats_path: Optional[str] = None):
+        self.enabled = enabled or bool(pstats_path)
+        self.pstats_path = pstats_path
+        self._stats = {}  # (category, name) -> [calls, seconds]
+        self._lock = threading.Lock()  # Engine pool threads add entries too
+        self._wall_started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        self._thread_cpu_started = time.thread_time()
+        self._cprofile = None
+        self._result = None
+
+    def start(self) -> 'Profiler':
+        """Restart the clocks (and cProfile, with a pstats path) at the beginning of the run."""
+        if self.enabled:
+            self._wall_started = time.perf_counter()
+            self._cpu_started = time.process_time()
+            self._thread_cpu_started = time.thread_time()
+        if self.pstats_path:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        return self
+
+    def add(self, category: str, name: str, seconds: float, calls: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            entry = self._stats.setdefault((category, name), [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+
+    def merge(self, report: Optional[dict]) -> None:
+        """Add the sections of another profiler's report() (e.g. from a worker process)."""
+        if not self.enabled or not report:
+            return
+        for category, entries in report.items():
+            if isinstance(entries, dict):
+                for name, entry in entries.items():
+                    self.add(category, name, entry['seconds'], entry['calls'])
+
+    def section(self, category: str, name: str):
+        """Context manager timing one call of a section."""
+        return _Section(self, (category, name)) if self.enabled else _NO_SECTION
+
+    def phase(self, name: str):
+        return self.section('phase', name)
+
+    def laps(self, category: str) -> Callable[[str], None]:
+        """
+        A lap(name) function charging the time since its previous call (or since
+        laps() was called) to `name`; lap(None) only restarts the clock.
+        """
+        if not self.enabled:
+            return lambda name: None
+        last = [time.perf_counter()]
+
+        def lap(name: Optional[str]) -> None:
+            now = time.perf_counter()
+            if name is not None:
+                self.add(category, name, now - last[0])
+            last[0] = now
+        return lap
+
+    def waiting(self, results: Iterable, name: str = 'wait') -> Iterator:
+        """Yield from `results`, charging the time blocked in next() to ('engine', name)."""
+        if not self.enabled:
+            yield from results
+            return
+        iterator = iter(results)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.add('engine', name, time.perf_counter() - started)
+            yield item
+
+    def stop(self) -> Optional[dict]:
+        """Stop the clocks (dumping cProfile stats, if any); returns report()."""
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.pstats_path)
+            self._cprofile = None
+        if self.enabled and self._result is None:
+            self._result = self._snapshot()
+        return self.report()
+
+    def _snapshot(self) -> dict:
+        with self._lock:
+            stats = {key: list(value) for key, value in self._stats.items()}
+        engine_wait = sum(seconds for (category, name), (_, seconds) in stats.items()
+                          if category == 'engine' and name == 'wait')
+        categories = {}
+        for (category, name), (calls, seconds) in sorted(stats.items(), key=lambda item: -item[1][1]):
+            categories.setdefault(category, {})[name] = {'calls': calls, 'seconds': round(seconds, 4)}
+        return {
+            'wallSeconds': round(time.perf_counter() - self._wall_started, 3),
+            'cpuSeconds': round(time.process_time() - self._cpu_started, 3),
+            'mainThreadCpuSeconds': round(time.thread_time() - self._thread_cpu_started, 3),
+            'engineWaitSeconds': round(engine_wait, 3),
+            **categories,
+            **({'pstats': str(self.pstats_path)} if self.pstats_path else {})
+        }
+
+    def report(self) -> Optional[dict]:
+        """Breakdown for the output metadata (None when disabled)."""
+        if not self.enabled:
+            return None
+        return self._result if self._result is not None else self._snapshot()
+
+    def summary_lines(self, top: int = 8) -> list[str]:
+        """Human-readable breakdown for stderr."""
+        report = self.report()
+        if report is None:
+            return []
+        lines = [f"wall {report['wallSeconds']:.2f}s | CPU {report['cpuSeconds']:.2f}s "
+                 f"(main thread {report['mainThreadCpuSeconds']:.2f}s) | engine wait {report['engineWaitSeconds']:.2f}s"]
+        for category, entries in report.items():
+            if not isinstance(entries, dict):
+                continue
+            for name, entry in list(entries.items())[:top]:
+                per_call = entry['seconds'] / entry['calls'] * 1000 if entry['calls'] else 0
+                lines.append(f"{category:<9} {name:<28} {entry['seconds']:>9.3f}s {entry['calls']:>9} calls "
+                             f"{per_call:>9.3f} ms/call")
+        return lines
+
+
+class Throughput:
+    """
+    Live ETA from the rate at which units of work (e.g. positions) complete;
+    without a known total (streamed input) only the rate is shown.
+    """
+
+    def __init__(self, total: Optional[int] = None, unit: str = 'positions'):
+        self.total = total
+        self.unit = unit
+        self.done = 0
+        self._started = time.perf_counter()
+
+    def advance(self, amount: int = 1) -> None:
+        self.done += amount
+
+    def eta(self) -> str:
+        """'ETA m:ss' at the current rate, or the rate itself ('12.5 games/s') without a total."""
+        elapsed = time.perf_counter() - self._started
+        if self.done <= 0 or elapsed <= 0:
+            return 'ETA --:--' if self.total is not None else f"-- {self.unit}/s"
+        if self.total is None:
+            return f"{self.done / elapsed:.1f} {self.unit}/s"
+        remaining = max(0, self.total - self.done) * elapsed / self.done
+        return f"ETA {format_duration(remaining)}"
@@ -0,0 +1,118 @@
+"""
+Engine Search Budgets
+=====================
+
+How long the engine searches each position:
+
+    depth     fixed depth (default); cost varies a lot between quiet and tactical positions
+    nodes     fixed node count; reproducible for a given engine build, cost ~ nodes / nps
+    movetime  fixed milliseconds per position; predictable wall clock, not reproducible
+
+The scripts take --depth / --nodes / --movetime; --nodes and --movetime
+override --depth. The chosen limit is recorded in each script's output.
+
+STATIC_EVAL is not a search: it asks for the engine's static evaluation (UCI
+`eval`), answered in microseconds. analyze-pgn.py --triage compares it with a
+low-depth search to spot tactical positions.
+"""
+
+from dataclasses import dataclass
+
+SEARCH_MODES = ('depth', 'nodes', 'movetime')
+
+# Budgets shown in the cost estimate for modes that were not selected
+DEFAULT_NODES = 1_000_000
+DEFAULT_MOVETIME = 100  # ms
+
+# Seconds per position at depth 15 on one thread (see HIGHLIGHT_SPEC.md);
+# roughly doubles every 5 plies of depth
+SECONDS_AT_DEPTH_15 = 0.3
+
+
+@dataclass(frozen=True)
+class SearchLimit:
+    """A per-position search budget: `go <mode> <amount>`."""
+    mode: str = 'depth'
+    amount: int = 15
+
+    @classmethod
+    def from_args(cls, args) -> 'SearchLimit':
+        """Limit selected by --movetime, --nodes or --depth (in that order of precedence)."""
+        if getattr(args, 'movetime', None):
+            return cls('movetime', args.movetime)
+        if getattr(args, 'nodes', None):
+            return cls('nodes', args.nodes)
+        return cls('depth', args.depth)
+
+    @property
+    def book_depth(self) -> int:
+        """Minimum opening book depth that may stand in for this search (any for node/time budgets)."""
+        return self.amount if self.mode == 'depth' else 0
+
+    def go_commands(self) -> tuple[str, ...]:
+        """
+        Commands starting the search. The output of `eval` differs between Stockfish
+        versions (trailing lines after `Final evaluation`), so it is followed by
+        `isready`, whose `readyok` ends it.
+        """
+        return ('eval', 'isready') if self.mode == 'static' else (f"go {self.mode} {self.amount}",)
+
+    @property
+    def output_end(self) -> str:
+        """Prefix of the last engine output line answering go_commands()."""
+        return 'readyok' if self.mode == 'static' else 'bestmove'
+
+    def describe(self) -> str:
+        if self.mode == 'movetime':
+            return f"movetime {self.amount}ms"
+        if self.mode == 'static':
+            return 'static eval'
+        return f"{self.mode} {self.amount:,}"
+
+    def to_dict(self) -> dict:
+        """Metadata for the JSON output, e.g. {'mode': 'nodes', 'nodes': 1000000}."""
+        return {'mode': self.mode, self.mode: self.amount}
+
+    def seconds_per_position(self, nps: int) -> float:
+        """Rough cost of one search on one engine process."""
+        if self.mode == 'nodes':
+            return self.amount / max(nps, 1)
+        if self.mode == 'movetime':
+            return self.amount / 1000
+        if self.mode == 'static':
+            return 0.0
+        return SECONDS_AT_DEPTH_15 * 2 ** ((self.amount - 15) / 5)
+
+
+STATIC_EVAL = SearchLimit('static', 0)
+
+
+def format_duration(seconds: float) -> str:
+    """Format seconds as m:ss (or h:mm:ss)."""
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    if hours:
+        return f"{hours}:{rest // 60:02d}:{rest % 60:02d}"
+    return f"{rest // 60}:{rest % 60:02d}"
+
+
+def cost_estimate_lines(selected: SearchLimit, depth: int, positions: int, jobs: int = 1,
+                        nps: int = 1_000_000) -> list[str]:
+    """
+    One line per search mode with the estimated wall clock for `positions` searches,
+    marking the selected mode. Unselected modes use --depth or the DEFAULT_* budgets.
+    """
+    candidates = {
+        'depth': SearchLimit('depth', depth),
+        'nodes': SearchLimit('nodes', DEFAULT_NODES),
+        'movetime': SearchLimit('movetime', DEFAULT_MOVETIME),
+    }
+    candidates[selected.mode] = selected
+
+    lines = []
+    for mode in SEARCH_MODES:
+        limit = candidates[mode]
+        seconds = positions * limit.seconds_per_position(nps) / max(jobs, 1)
+        marker = '▶' if limit == selected else ' '
+        lines.append(f"{marker} {limit.describe():<18} ~{format_duration(seconds)}")
+    return lines
@@ -0,0 +1,626 @@
+"""
+Tactical Analysis
+=================
+
+Enemy territory invasion, most attacked squares and longest tension of each
+game (the trackers behind analyze-tactics.py), as an importable API:
+
+    for game_data in analyze_games('round.pgn'):      # lazily, one result per game
+        ...
+    results = analyze_all_games(games)                 # {'games': [...], 'summary': {...}}
+
+A source is a chess.pgn.Game, an iterable of games (e.g. ones a pipeline has
+already parsed; they are not re-read), a PGN file path or a text file object.
+Results carry the gameIndex of the game in its source. Games that fail to
+analyze are reported on stderr and skipped.
+
+With jobs > 1, analyze_all_games() parses and analyzes the games of a path or
+file object in worker processes and merges the results in gameIndex order
+(identical to an in-process run). Below PARALLEL_MIN_GAMES games the games are
+analyzed in-process anyway: a season takes a few seconds, less than starting
+the workers and pickling the games and results costs.
+"""
+
+import io
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+import chess
+import chess.pgn
+
+from .profiling import Profiler, Throughput
+
+# Anything read_games() accepts
+GameSource = Union[chess.pgn.Game, Iterable[chess.pgn.Game], str, os.PathLike, io.TextIOBase]
+
+# Enemy territory of each side: ranks 5-8 for white, ranks 1-4 for black
+WHITE_ENEMY_TERRITORY = chess.BB_RANK_5 | chess.BB_RANK_6 | chess.BB_RANK_7 | chess.BB_RANK_8
+BLACK_ENEMY_TERRITORY = chess.BB_RANK_1 | chess.BB_RANK_2 | chess.BB_RANK_3 | chess.BB_RANK_4
+
+# Fewest games worth worker processes (a 213-game season: 2.75 s with one
+# process, 2.88 s with four)
+PARALLEL_MIN_GAMES = 1000
+
+
+def add_to_counters(planes: list, mask: int) -> None:
+    """
+    Add 1 to the per-square counters of every square in `mask`. The counters are
+    bit-sliced: planes[i] holds bit i of all 64 counts, so one addition is a
+    ripple-carry over a few integer operations instead of 64 increments.
+    """
+    carry = mask
+    for i, plane in enumerate(planes):
+        if not carry:
+            return
+        planes[i] = plane ^ carry
+        carry &= plane
+    if carry:
+        planes.append(carry)
+
+
+def max_counter(planes: list) -> tuple:
+    """(highest count, bitboard of the squares holding it) of bit-sliced counters."""
+    squares = chess.BB_ALL
+    count = 0
+    for i in range(len(planes) - 1, -1, -1):
+        if squares & planes[i]:
+            squares &= planes[i]
+            count |= 1 << i
+    return count, squares
+
+
+def attack_counters(board: chess.Board) -> list:
+    """
+    Bit-sliced count of the pieces (both colors) attacking each square, the same
+    numbers as len(board.attackers(WHITE, sq)) + len(board.attackers(BLACK, sq)).
+    Pawns are added per capture direction, all pawns of a side at once.
+    """
+    planes = []
+    white_pawns = board.pawns & board.occupied_co[chess.WHITE]
+    black_pawns = board.pawns & board.occupied_co[chess.BLACK]
+    add_to_counters(planes, (white_pawns & ~chess.BB_FILE_A) << 7 & chess.BB_ALL)
+    add_to_counters(planes, (white_pawns & ~chess.BB_FILE_H) << 9 & chess.BB_ALL)
+    add_to_counters(planes, (black_pawns & ~chess.BB_FILE_A) >> 9)
+    add_to_counters(planes, (black_pawns & ~chess.BB_FILE_H) >> 7)
+    for square in chess.scan_forward(board.occupied & ~board.pawns):
+        add_to_counters(planes, board.attacks_mask(square))
+    return planes
+
+
+# Square order of the names ('a1' < 'a2' < ... < 'h8'), which orders the squares of a tension pair
+NAME_ORDER = [chess.square_file(square) * 8 + chess.square_rank(square) for square in chess.SQUARES]
+
+
+def tension_key(a: int, b: int) -> int:
+    """Packed integer key of an unordered square pair: the square with the smaller name in the high bits."""
+    if NAME_ORDER[a] > NAME_ORDER[b]:
+        a, b = b, a
+    return a << 6 | b
+
+
+def tension_squares(key: int) -> str:
+    """'d5-e4'-style name of a tension key (squares in name order)."""
+    return f"{chess.square_name(key >> 6)}-{chess.square_name(key & 63)}"
+
+
+class TensionTracker:
+    """
+    Pieces in tension after each move: a piece attacks an enemy piece while
+    standing on a square the enemy attacks. Keyed by tension_key().
+
+    The attack mask of every piece is cached. After a move only the squares
+    whose occupant changed, the sliders whose rays touched them and the pieces
+    whose "attacked by the enemy" state flipped are recomputed, and only the
+    pairs involving those squares are rebuilt.
+    """
+
+    def __init__(self):
+        self.pairs = set()
+        self._masks = None  # Piece placement bitboards of the previous position
+        self._attacks = {}  # Occupied square -> attack mask
+        self._attacked = [0, 0]  # Squares attacked by black, white (indexed by color)
+
+    def update(self, board: chess.Board) -> set:
+        """Tension pairs of `board`, the position after the next move."""
+        masks = (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+                 board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK])
+        attacks = self._attacks
+        if self._masks is None:
+            changed = chess.BB_ALL
+            recompute = board.occupied
+        else:
+            changed = 0
+            for old, new in zip(self._masks, masks):
+                changed |= old ^ new
+            # A slider's attacks change only if its rays reached a changed square
+            recompute = board.occupied & changed
+            for square in chess.scan_forward((board.bishops | board.rooks | board.queens) & ~changed):
+                if attacks[square] & changed:
+                    recompute |= chess.BB_SQUARES[square]
+        self._masks = masks
+        if not changed:
+            return self.pairs
+
+        for square in chess.scan_forward(changed & ~board.occupied):
+            attacks.pop(square, None)
+        for square in chess.scan_forward(recompute):
+            attacks[square] = board.attacks_mask(square)
+
+        attacked = [0, 0]
+        white = board.occupied_co[chess.WHITE]
+        for square, mask in attacks.items():
+            attacked[white >> square & 1] |= mask
+        flipped = (attacked[chess.WHITE] ^ self._attacked[chess.WHITE]) | (attacked[chess.BLACK] ^ self._attacked[chess.BLACK])
+        self._attacked = attacked
+
+        # Rebuild the pairs involving a dirty square, in both directions
+        dirty = changed | recompute | (flipped & board.occupied)
+        pairs = {key for key in self.pairs if not (dirty >> (key >> 6) & 1 or dirty >> (key & 63) & 1)}
+        for square in chess.scan_forward(dirty & board.occupied):
+            color = bool(white >> square & 1)
+            enemy = not color
+            if attacked[enemy] >> square & 1:
+                for target in chess.scan_forward(attacks[square] & board.occupied_co[enemy]):
+                    pairs.add(tension_key(square, target))
+            for attacker in chess.scan_forward(board.attackers_mask(enemy, square) & attacked[color]):
+                pairs.add(tension_key(attacker, square))
+        self.pairs = pairs
+        return pairs
+
+
+class TacticalAnalyzer:
+    """Analyzes a single chess game for enemy territory invasion."""
+
+    def __init__(self, game: chess.pgn.Game, profiler: Optional[Profiler] = None):
+        self.game = game
+        self.board = game.board()
+        self.profiler = profiler or Profiler()
+
+        # Track enemy territory invasion
+        # White's enemy territory: ranks 5-8 (indices 4-7)
+        # Black's enemy territory: ranks 1-4 (indices 0-3)
+        self.white_pieces_in_enemy = set()  # Track unique piece types
+        self.black_pieces_in_enemy = set()
+
+        # Track first invasion move number (ply)
+        self.white_first_invasion = None
+        self.black_first_invasion = None
+
+        # Track most attacked square
+        self.most_attacked_square = {
+            'square': None,
+            'attackers': 0,
+            'whiteAttackers': 0,
+            'blackAttackers': 0,
+            'moveNumber': 0,
+            'move': None
+        }
+
+        # Track tension (mutual attacks between pieces)
+        self.tensions = TensionTracker()
+        self.current_tensions = {}  # Map of tension keys (see tension_key()) to start move
+        self.longest_tension = {
+            'moves': 0,
+            'squares': None,
+            'startMove': 0,
+            'endMove': 0
+        }
+
+        # Get player names
+        self.white = game.headers.get("White", "Unknown")
+        self.black = game.headers.get("Black", "Unknown")
+
+    def analyze(self) -> Dict[str, Any]:
+        """Run all analysis and return results."""
+        moves = list(self.game.mainline_moves())
+        lap = self.profiler.laps('detector')
+
+        for move_num, move in enumerate(moves):
+            # Get SAN notation BEFORE pushing the move
+            move_san = self.board.san(move)
+
+            # Make the move
+            self.board.push(move)
+            lap('san + push')
+
+            # Track enemy territory invasion and most attacked square
+            self._track_enemy_territory(move_num)
+            lap('enemy territory')
+            self._detect_most_attacked_square(move_num, move_san)
+            lap('most attacked square')
+            self._track_tension(move_num)
+            lap('tension')
+
+        # Tensions still open at the end are counted through the final position
+        for tension_key, start_move in sorted(self.current_tensions.items()):
+            self._end_tension(tension_key, start_move, len(moves) + 1, len(moves))
+
+        return self._format_results()
+
+    def _track_enemy_territory(self, move_num: int) -> None:
+        """
+        Track pieces that enter enemy territory.
+        White's enemy territory: ranks 5-8 (indices 4-7)
+        Black's enemy territory: ranks 1-4 (indices 0-3)
+        """
+        board = self.board
+        for color, territory, invaders in ((chess.WHITE, WHITE_ENEMY_TERRITORY, self.white_pieces_in_enemy),
+                                           (chess.BLACK, BLACK_ENEMY_TERRITORY, self.black_pieces_in_enemy)):
+            # Occupancy of the side masked with the enemy ranks, then per piece type
+            invading = board.occupied_co[color] & territory
+            if not invading or len(invaders) == len(chess.PIECE_TYPES):
+                continue
+            for piece_type in chess.PIECE_TYPES:
+                if piece_type not in invaders and board.pieces_mask(piece_type, color) & invading:
+                    invaders.add(piece_type)
+
+            # Record first invasion if not yet recorded
+            if color == chess.WHITE and self.white_first_invasion is None:
+                self.white_first_invasion = move_num + 1
+            elif color == chess.BLACK and self.black_first_invasion is None:
+                self.black_first_invasion = move_num + 1
+
+    def _detect_most_attacked_square(self, move_num: int, move_san: str) -> None:
+        """
+        Find the most attacked square in the current position.
+        Count attacks from both sides on each square.
+        """
+        total_attackers, squares = max_counter(attack_counters(self.board))
+
+        # Update if this is the most attacked square we've seen (the lowest square on ties)
+        if total_attackers > self.most_attacked_square['attackers']:
+            square = chess.lsb(squares)
+            white_attackers = chess.popcount(self.board.attackers_mask(chess.WHITE, square))
+            self.most_attacked_square = {
+                'square': chess.square_name(square),
+                'attackers': total_attackers,
+                'whiteAttackers': white_attackers,
+                'blackAttackers': total_attackers - white_attackers,
+                'moveNumber': move_num + 1,
+                'move': move_san
+            }
+
+    def _track_tension(self, move_num: int) -> None:
+        """
+        Track tension: when two pieces mutually attack each other.
+        Tension persists as long as both pieces can capture each other.
+        """
+        current_mutual_attacks = self.tensions.update(self.board)
+
+        # Tensions that ended with this move (in key order, for a stable choice between equal durations)
+        for tension_key in sorted(self.current_tensions.keys() - current_mutual_attacks):
+            self._end_tension(tension_key, self.current_tensions.pop(tension_key), move_num + 1, move_num + 1)
+
+        # New tensions start
+        for tension_key in current_mutual_attacks - self.current_tensions.keys():
+            self.current_tensions[tension_key] = move_num + 1
+
+    def _end_tension(self, tension_key: int, start_move: int, until: int, end_move: int) -> None:
+        """Score a tension lasting from `start_move` to `until` (exclusive) and keep the longest."""
+        duration = until - start_move
+        if duration > self.longest_tension['moves']:
+            self.longest_tension = {
+                'moves': duration,
+                'squares': tension_squares(tension_key),
+                'startMove': start_move,
+                'endMove': end_move
+            }
+
+    def _format_results(self) -> Dict[str, Any]:
+        """Format analysis results as JSON-serializable dict."""
+        return {
+            'white': self.white,
+            'black': self.black,
+            'enemyTerritory': {
+                'whitePiecesInEnemy': len(self.white_pieces_in_enemy),
+                'blackPiecesInEnemy': len(self.black_pieces_in_enemy),
+                'whiteFirstInvasion': self.white_first_invasion,
+                'blackFirstInvasion': self.black_first_invasion
+            },
+            'mostAttackedSquare': self.most_attacked_square if self.most_attacked_square['square'] else None,
+            'longestTension': self.longest_tension if self.longest_tension['moves'] > 0 else None
+        }
+
+
+def read_games(source: GameSource) -> Iterator[chess.pgn.Game]:
+    """
+    Games of `source`, read lazily.
+
+    Args:
+        source: A chess.pgn.Game, an iterable of games, a PGN file path or a text file object
+    """
+    if isinstance(source, chess.pgn.Game):
+        yield source
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, encoding='utf-8') as f:
+            yield from read_games(f)
+    elif hasattr(source, 'read'):
+        while (game := chess.pgn.read_game(source)) is not None:
+            yield game
+    else:
+        yield from source
+
+
+def analyze_games(source: GameSource, profiler: Optional[Profiler] = None,
+                  on_game: Optional[Callable[[int], None]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Analyze the games of `source` one at a time, in this process.
+
+    Args:
+        source: See read_games()
+        profiler: Records parsing and tracker time if enabled
+        on_game: Called with the gameIndex before each game is analyzed (progress lines)
+
+    Yields:
+        The analysis of each game, with its gameIndex
+    """
+    profiler = profiler or Profiler()
+    games = iter(read_games(source))
+    for game_index in itertools.count():
+        with profiler.phase('parse pgn'):
+            game = next(games, None)
+        if game is None:
+            return
+        if on_game is not None:
+            on_game(game_index)
+
+        try:
+            with profiler.phase('analyze games'):
+                game_data = TacticalAnalyzer(game, profiler).analyze()
+        except Exception as e:
+            print(f"⚠️  Error analyzing game {game_index + 1}: {e}", file=sys.stderr)
+            continue
+        game_data['gameIndex'] = game_index
+        yield game_data
+
+
+def split_games(source: Union[str, os.PathLike, io.TextIOBase]) -> Iterator[str]:
+    """Yield the PGN text of each game of a path or file object, unparsed (for the worker processes)."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding='utf-8') as f:
+            text = f.read()
+    else:
+        text = source.read()
+    reader = io.StringIO(text)
+    while True:
+        start = reader.tell()
+        if not chess.pgn.skip_game(reader):
+            return
+        yield text[start:reader.tell()]
+
+
+def analyze_game_text(task: tuple) -> tuple:
+    """
+    Worker process: parse and analyze one game.
+
+    Args:
+        task: (game_index, PGN text, whether to profile)
+
+    Returns:
+        (game_index, game data or None, error message or None, profiler report or None)
+    """
+    game_index, pgn_text, profile = task
+    profiler = Profiler(profile)
+    try:
+        with profiler.phase('parse pgn'):
+            game = chess.pgn.read_game(io.StringIO(pgn_text))
+        with profiler.phase('analyze games'):
+            game_data = TacticalAnalyzer(game, profiler).analyze()
+    except Exception as e:
+        return game_index, None, str(e), profiler.report()
+    game_data['gameIndex'] = game_index
+    return game_index, game_data, None, profiler.report()
+
+
+def analyze_games_parallel(source: Union[str, os.PathLike, io.TextIOBase], jobs: int,
+                           profiler: Optional[Profiler] = None,
+                           on_game: Optional[Callable[[int], None]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Analyze the games of a path or file object in `jobs` processes; same contract as
+    analyze_games(), results in gameIndex order. Worker time is added to `profiler`.
+    Fewer than PARALLEL_MIN_GAMES games are analyzed in this process.
+    """
+    profiler = profiler or Profiler()
+    with profiler.phase('split pgn'):
+        tasks = [(game_index, pgn_text, profiler.enabled) for game_index, pgn_text in enumerate(split_games(source))]
+
+    if len(tasks) < PARALLEL_MIN_GAMES:
+        yield from merge_results(map(analyze_game_text, tasks), profiler, on_game)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # map() yields in submission order: merged by gameIndex as results arrive
+        chunksize = max(1, min(16, len(tasks) // (jobs * 4)))
+        yield from merge_results(executor.map(analyze_game_text, tasks, chunksize=chunksize), profiler, on_game)
+
+
+def merge_results(results: Iterable[tuple], profiler: Profiler,
+                  on_game: Optional[Callable[[int], None]] = None) -> Iterator[Dict[str, Any]]:
+    """Game data of analyze_game_text() results, with their profiles merged and errors reported."""
+    for game_index, game_data, error, report in results:
+        if on_game is not None:
+            on_game(game_index)
+        profiler.merge(report)
+        if error is not None:
+            print(f"⚠️  Error analyzing game {game_index + 1}: {error}", file=sys.stderr)
+            continue
+        yield game_data
+
+
+def analyze_all_games(source: GameSource, profiler: Optional[Profiler] = None, jobs: int = 1,
+                      progress: bool = False) -> Dict[str, Any]:
+    """
+    Analyze all games of a source and summarize them.
+
+    Args:
+        source: See read_games()
+        profiler: Records parsing and tracker time if enabled
+        jobs: Number of worker processes (only for a path or file object; 1 analyzes in this process)
+        progress: Print a progress line per game to stderr
+
+    Returns:
+        Dictionary with analysis for all games
+    """
+    profiler = profiler or Profiler()
+    throughput = Throughput(unit='games') if profiler.enabled else None
+
+    def on_game(game_index: int) -> None:
+        rate = f" ({throughput.eta()})" if throughput is not None else ''
+        print(f"🔍 Analyzing game {game_index + 1}...{rate}", file=sys.stderr)
+        if throughput is not None:
+            throughput.advance()
+
+    callback = on_game if progress else None
+    if jobs > 1 and (isinstance(source, (str, os.PathLike)) or hasattr(source, 'read')):
+        games = analyze_games_parallel(source, jobs, profiler, callback)
+    else:
+        games = analyze_games(source, profiler, callback)
+    return summarize_games(list(games))
+
+
+def summarize_games(games_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Summary statistics and chicken awards over the analyzed games.
+
+    Args:
+        games_data: Per-game results in gameIndex order
+
+    Returns:
+        Dictionary with the games and their summary
+    """
+    # Calculate summary statistics and chicken awards
+    summary = {
+        'totalGames': len(games_data),
+
+        # Chicken Award 1: Homebody - Least pieces in enemy territory
+        'homebody': max(
+            games_data,
+            key=lambda g: g['enemyTerritory']['whitePiecesInEnemy'] + g['enemyTerritory']['blackPiecesInEnemy']
+        ) if games_data else None,
+
+        # Chicken Award 2: Late Bloomer - Waited longest to invade
+        'lateBlocker': None,
+
+        # Award: Most attacked square across all games
+        'mostAttackedSquareGame': max(
+            games_data,
+            key=lambda g: g['mostAttackedSquare']['attackers'] if g['mostAttackedSquare'] else 0
+        ) if games_data else None,
+    }
+
+    # Find the player (white or black) who waited longest to invade
+    latest_invasion = 0
+    latest_game = None
+    latest_player = None
+
+    for game in games_data:
+        white_invasion = game['enemyTerritory']['whiteFirstInvasion']
+        black_invasion = game['enemyTerritory']['blackFirstInvasion']
+
+        if white_invasion and white_invasion > latest_invasion:
+            latest_invasion = white_invasion
+            latest_game = game
+            latest_player = 'white'
+
+        if black_invasion and black_invasion > latest_invasion:
+            latest_invasion = black_invasion
+            latest_game = game
+            latest_player = 'black'
+
+    if latest_game:
+        summary['lateBloomer'] = {
+            'white': latest_game['white'],
+            'black': latest_game['black'],
+            'player': latest_player,
+            'moveNumber': latest_invasion,
+            'gameIndex': latest_game['gameIndex']
+        }
+
+    # Find the player with FEWEST pieces in enemy territory (homebody)
+    # Skip games where neither player invaded (empty games)
+    min_invasion = float('inf')
+    homebody_game = None
+    homebody_player = None
+
+    for game in games_data:
+        white_pieces = game['enemyTerritory']['whitePiecesInEnemy']
+        black_pieces = game['enemyTerritory']['blackPiecesInEnemy']
+
+        # Skip games where neither player invaded
+        if white_pieces == 0 and black_pieces == 0:
+            continue
+
+        if white_pieces < min_invasion:
+            min_invasion = white_pieces
+            homebody_game = game
+            homebody_player = 'white'
+
+        if black_pieces < min_invasion:
+            min_invasion = black_pieces
+            homebody_game = game
+            homebody_player = 'black'
+
+    if homebody_game:
+        summary['homebody'] = {
+            'white': homebody_game['white'],
+            'black': homebody_game['black'],
+            'player': homebody_player,
+            'piecesInEnemy': min_invasion,
+            'gameIndex': homebody_game['gameIndex']
+        }
+
+    # Find the player who invaded EARLIEST (quick draw)
+    earliest_invasion = float('inf')
+    earliest_game = None
+    earliest_player = None
+
+    for game in games_data:
+        white_invasion = game['enemyTerritory']['whiteFirstInvasion']
+        black_invasion = game['enemyTerritory']['blackFirstInvasion']
+
+        if white_invasion and white_invasion < earliest_invasion:
+            earliest_invasion = white_invasion
+            earliest_game = game
+            earliest_player = 'white'
+
+        if black_invasion and black_invasion < earliest_invasion:
+            earliest_invasion = black_invasion
+            earliest_game = game
+            earliest_player = 'black'
+
+    if earliest_game:
+        summary['quickDraw'] = {
+            'white': earliest_game['white'],
+            'black': earliest_game['black'],
+            'player': earliest_player,
+            'moveNumber': earliest_invasion,
+            'gameIndex': earliest_game['gameIndex']
+        }
+
+    # Find the game with longest tension
+    longest_tension_duration = 0
+    longest_tension_game = None
+
+    for game in games_data:
+        if game.get('longestTension') and game['longestTension']['moves'] > longest_tension_duration:
+            longest_tension_duration = game['longestTension']['moves']
+            longest_tension_game = game
+
+    if longest_tension_game:
+        tension_data = longest_tension_game['longestTension']
+        summary['longestTension'] = {
+            'white': longest_tension_game['white'],
+            'black': longest_tension_game['black'],
+            'moves': tension_data['moves'],
+            'squares': tension_data['squares'],
+            'startMove': tension_data['startMove'],
+            'endMove': tension_data['endMove'],
+            'gameIndex': longest_tension_game['gameIndex']
+        }
+
+    return {
+        'games': games_data,
+        'summary': summary
+    }
@@ -0,0 +1,331 @@
+"""
+Season-Scale Tactics on NumPy Bitboards
+=======================================
+
+Columnar counterpart of TacticalAnalyzer (analysis/tactics.py) for enemy
+territory invasion and the most attacked square, over a whole season at once.
+
+SeasonBitboards.replay() plays every game once into one contiguous uint64
+array with the twelve piece bitboards of the position after each ply
+(white pawn ... king, then black). The trackers then run as vectorized bit
+operations over all plies of all games:
+
+  - enemy territory: occupancy masked with the enemy half per piece type,
+    reduced per game to the first invading ply and the invading piece types;
+  - attack counts: every piece's attacks split into one bitboard per
+    direction (pawn captures, knight and king steps, Kogge-Stone slider
+    rays). Within one direction no two pieces attack the same square, so the
+    per-square count is the sum of those bitboards, kept in bit-sliced
+    counters (planes[i] holds bit i of all 64 counts);
+  - most attacked square: the maximal count per ply from the counter planes,
+    then the first ply reaching each game's maximum.
+
+season_tactics() returns the same 'enemyTerritory' and 'mostAttackedSquare'
+records as TacticalAnalyzer.analyze() (tension is sequential by nature and
+stays there). Only the position before each game's chosen ply is rebuilt as
+a chess.Board, to write that move in SAN.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List
+
+import chess
+import chess.pgn
+import numpy as np
+
+from .tactics import BLACK_ENEMY_TERRITORY, WHITE_ENEMY_TERRITORY, GameSource, read_games
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)  # Column of a piece type; black columns are + 6
+COUNTER_PLANES = 6  # Bits per square counter (at most 63 attackers)
+CHUNK_PLIES = 1 << 16  # Plies per vectorized batch, bounding the temporary arrays
+TYPE_COUNTS = np.array([bin(bits).count('1') for bits in range(64)], dtype=np.int64)  # Piece types in a 6-bit set
+
+_FILE_A = np.uint64(chess.BB_FILE_A)
+_FILE_H = np.uint64(chess.BB_FILE_H)
+_NOT_A = ~_FILE_A
+_NOT_H = ~_FILE_H
+_NOT_AB = ~np.uint64(chess.BB_FILE_A | chess.BB_FILE_B)
+_NOT_GH = ~np.uint64(chess.BB_FILE_G | chess.BB_FILE_H)
+_ALL = np.uint64(chess.BB_ALL)
+
+# (square delta, mask of the squares a step can land on without wrapping around the board)
+NORTH, SOUTH, EAST, WEST = (8, _ALL), (-8, _ALL), (1, _NOT_A), (-1, _NOT_H)
+NORTH_EAST, NORTH_WEST, SOUTH_EAST, SOUTH_WEST = (9, _NOT_A), (7, _NOT_H), (-7, _NOT_A), (-9, _NOT_H)
+ORTHOGONAL = (NORTH, SOUTH, EAST, WEST)
+DIAGONAL = (NORTH_EAST, NORTH_WEST, SOUTH_EAST, SOUTH_WEST)
+KNIGHT_STEPS = ((17, _NOT_A), (15, _NOT_H), (10, _NOT_AB), (6, _NOT_GH),
+                (-6, _NOT_AB), (-10, _NOT_GH), (-15, _NOT_A), (-17, _NOT_H))
+
+
+def shift(bitboards: np.ndarray, delta: int) -> np.ndarray:
+    """Move every bit `delta` squares up (positive) or down (negative); bits leaving the board are dropped."""
+    return bitboards << np.uint64(delta) if delta > 0 else bitboards >> np.uint64(-delta)
+
+
+def step(bitboards: np.ndarray, direction: tuple) -> np.ndarray:
+    delta, mask = direction
+    return shift(bitboards, delta) & mask
+
+
+def ray_attacks(sliders: np.ndarray, empty: np.ndarray, direction: tuple) -> np.ndarray:
+    """Squares the `sliders` attack in one direction, up to and including the first occupied square (Kogge-Stone fill)."""
+    delta, mask = direction
+    generate = sliders
+    propagate = empty & mask
+    generate = generate | (propagate & shift(generate, delta))
+    propagate = propagate & shift(propagate, delta)
+    generate = generate | (propagate & shift(generate, 2 * delta))
+    propagate = propagate & shift(propagate, 2 * delta)
+    generate = generate | (propagate & shift(generate, 4 * delta))
+    return step(generate, direction)
+
+
+def attack_masks(pieces: np.ndarray, color: chess.Color) -> Iterable[np.ndarray]:
+    """
+    Attacks of one side's pieces as per-direction bitboards (one array entry per ply):
+    no square is attacked twice within one yielded bitboard, so summing them counts attackers.
+    """
+    base = 0 if color == chess.WHITE else 6
+    empty = ~np.bitwise_or.reduce(pieces, axis=1)
+    pawns = pieces[:, base + PAWN]
+    for direction in ((NORTH_EAST, NORTH_WEST) if color == chess.WHITE else (SOUTH_EAST, SOUTH_WEST)):
+        yield step(pawns, direction)
+    knights = pieces[:, base + KNIGHT]
+    for direction in KNIGHT_STEPS:
+        yield step(knights, direction)
+    kings = pieces[:, base + KING]
+    for direction in ORTHOGONAL + DIAGONAL:
+        yield step(kings, direction)
+    queens = pieces[:, base + QUEEN]
+    for sliders, directions in ((pieces[:, base + ROOK] | queens, ORTHOGONAL),
+                                (pieces[:, base + BISHOP] | queens, DIAGONAL)):
+        for direction in directions:
+            yield ray_attacks(sliders, empty, direction)
+
+
+def add_to_counters(planes: List[np.ndarray], masks: np.ndarray) -> None:
+    """Add 1 to the bit-sliced counters of every square set in `masks` (ripple carry over the planes)."""
+    carry = masks
+    for i, plane in enumerate(planes):
+        planes[i] = plane ^ carry
+        carry = plane & carry
+
+
+def attack_counters(pieces: np.ndarray, colors: tuple = (chess.WHITE, chess.BLACK)) -> List[np.ndarray]:
+    """Bit-sliced per-square counts of the pieces of `colors` attacking each square, per ply."""
+    planes = [np.zeros(len(pieces), dtype=np.uint64) for _ in range(COUNTER_PLANES)]
+    for color in colors:
+        for masks in attack_masks(pieces, color):
+            add_to_counters(planes, masks)
+    return planes
+
+
+def max_counter(planes: List[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """(highest count, bitboard of the squares with that count) per ply, from the most significant plane down."""
+    squares = np.full(len(planes[0]), _ALL, dtype=np.uint64)
+    counts = np.zeros(len(planes[0]), dtype=np.int64)
+    for i in reversed(range(len(planes))):
+        candidates = squares & planes[i]
+        found = candidates != 0
+        squares = np.where(found, candidates, squares)
+        counts |= found.astype(np.int64) << i
+    return counts, squares
+
+
+def lowest_square(bitboards: np.ndarray) -> np.ndarray:
+    """Index of the lowest set bit of each (nonzero) bitboard."""
+    lowest = bitboards & (~bitboards + np.uint64(1))
+    return np.log2(lowest.astype(np.float64)).astype(np.int64)  # Powers of two convert exactly
+
+
+def first_per_game(flags: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Index of the first set flag of each game (plies offsets[g]:offsets[g + 1]), or -1."""
+    first = np.full(len(offsets) - 1, -1, dtype=np.int64)
+    plies = np.flatnonzero(flags)
+    games = np.searchsorted(offsets, plies, side='right') - 1
+    games, index = np.unique(games, return_index=True)
+    first[games] = plies[index]
+    return first
+
+
+def reduce_per_game(ufunc: np.ufunc, values: np.ndarray, offsets: np.ndarray, empty) -> np.ndarray:
+    """ufunc.reduceat over the plies of each game; games without plies get `empty`."""
+    result = np.full(len(offsets) - 1, empty, dtype=values.dtype)
+    nonempty = offsets[:-1] < offsets[1:]
+    if nonempty.any():
+        result[nonempty] = ufunc.reduceat(values, offsets[:-1][nonempty])
+    return result
+
+
+@dataclass
+class SeasonBitboards:
+    """Piece bitboards after every ply of a batch of games, in one array."""
+    pieces: np.ndarray  # (plies, 12) uint64: white pawn ... king, black pawn ... king
+    offsets: np.ndarray  # (games + 1,) plies of game g are offsets[g]:offsets[g + 1]
+    moves: list  # chess.Move of each ply
+    starts: list  # Start position (chess.Board) of each game
+    players: list  # (White, Black) of each game
+
+    @classmethod
+    def replay(cls, games: Iterable[chess.pgn.Game]) -> 'SeasonBitboards':
+        """Play every game once, recording the bitboards after each move."""
+        rows, moves, starts, players = [], [], [], []
+        offsets = [0]
+        for game in games:
+            start = game.board()
+            replay_moves(start, game.mainline_moves(), rows, moves)
+            offsets.append(len(rows))
+            starts.append(start)
+            players.append((game.headers.get("White", "Unknown"), game.headers.get("Black", "Unknown")))
+        pieces = np.array(rows, dtype=np.uint64).reshape(len(rows), 12)
+        return cls(pieces, np.array(offsets, dtype=np.int64), moves, starts, players)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def plies(self) -> int:
+        return len(self.pieces)
+
+    def board_before(self, game_index: int, ply: int) -> chess.Board:
+        """
+        The position before the move at `ply` (0-based) of a game, rebuilt from the
+        bitboards; castling rights are not tracked (they do not change a move's SAN).
+        """
+        start = self.starts[game_index]
+        if ply == 0:
+            return start.copy(stack=False)
+        index = self.offsets[game_index] + ply - 1
+        board = chess.Board(None)
+        board.set_piece_map({square: chess.Piece(column % 6 + 1, column < 6)
+                             for column, bitboard in enumerate(self.pieces[index])
+                             for square in chess.scan_forward(int(bitboard))})
+        board.turn = start.turn if ply % 2 == 0 else not start.turn
+        previous = self.moves[index]
+        if previous and board.pawns & chess.BB_SQUARES[previous.to_square] and \
+                abs(previous.to_square - previous.from_square) == 16:
+            board.ep_square = (previous.from_square + previous.to_square) // 2
+        return board
+
+    def move_san(self, game_index: int, ply: int) -> str:
+        """SAN of the move at `ply` (0-based) of a game."""
+        return self.board_before(game_index, ply).san(self.moves[self.offsets[game_index] + ply])
+
+
+def replay_moves(start: chess.Board, game_moves: Iterable[chess.Move], rows: list, moves: list) -> None:
+    """
+    Append the twelve bitboards after each move from `start` to `rows` (and the move to
+    `moves`), applying the moves to plain integers rather than a chess.Board.
+    """
+    bitboards = [start.pieces_mask(piece_type, color) for color in (chess.WHITE, chess.BLACK)
+                 for piece_type in chess.PIECE_TYPES]
+    columns = [-1] * 64  # Column of the piece on each square
+    for column, bitboard in enumerate(bitboards):
+        for square in chess.scan_forward(bitboard):
+            columns[square] = column
+    us, them = (0, 6) if start.turn == chess.WHITE else (6, 0)
+    squares = chess.BB_SQUARES
+    for move in game_moves:
+        if move:
+            from_square, to_square = move.from_square, move.to_square
+            piece, captured = columns[from_square], columns[to_square]
+            bitboards[piece] ^= squares[from_square]
+            columns[from_square] = -1
+
+            if piece == us + KING and (captured == us + ROOK or abs(to_square - from_square) == 2):
+                # Castling (king onto its rook, or two files): king to the g or c file, rook to the f or d file
+                kingside = to_square > from_square
+                rank = from_square & 56
+                rook_from = to_square if captured == us + ROOK else rank | (7 if kingside else 0)
+                king_to, rook_to = rank | (6 if kingside else 2), rank | (5 if kingside else 3)
+                bitboards[us + ROOK] ^= squares[rook_from]
+                columns[rook_from] = -1
+                bitboards[us + ROOK] |= squares[rook_to]
+                columns[rook_to] = us + ROOK
+                bitboards[piece] |= squares[king_to]
+                columns[king_to] = piece
+            else:
+                if captured >= 0:
+                    bitboards[captured] ^= squares[to_square]
+                elif piece == us + PAWN and (to_square - from_square) % 8:
+                    # Diagonal pawn move to an empty square: en passant
+                    victim = to_square - 8 if us == 0 else to_square + 8
+                    bitboards[them + PAWN] ^= squares[victim]
+                    columns[victim] = -1
+                moved = us + move.promotion - 1 if move.promotion else piece
+                bitboards[moved] |= squares[to_square]
+                columns[to_square] = moved
+        us, them = them, us
+        rows.append(tuple(bitboards))
+        moves.append(move)
+
+
+def season_tactics(source: GameSource, chunk_plies: int = CHUNK_PLIES) -> List[Dict[str, Any]]:
+    """
+    Enemy territory and most attacked square of every game of `source` (see
+    read_games()), identical to the same fields of TacticalAnalyzer.analyze().
+
+    Returns:
+        One record per game: white, black, enemyTerritory, mostAttackedSquare, gameIndex
+    """
+    return analyze_season(SeasonBitboards.replay(read_games(source)), chunk_plies)
+
+
+def analyze_season(season: SeasonBitboards, chunk_plies: int = CHUNK_PLIES) -> List[Dict[str, Any]]:
+    """The season_tactics() records of replayed games."""
+    pieces, offsets = season.pieces, season.offsets
+    ply_index = np.arange(season.plies, dtype=np.int64) - np.repeat(offsets[:-1], np.diff(offsets))
+
+    territory = []
+    for columns, enemy_half in ((slice(0, 6), WHITE_ENEMY_TERRITORY), (slice(6, 12), BLACK_ENEMY_TERRITORY)):
+        invading = pieces[:, columns] & np.uint64(enemy_half)
+        first = first_per_game(invading.any(axis=1), offsets)
+        type_bits = ((invading != 0).astype(np.uint8) << np.arange(6, dtype=np.uint8)).sum(axis=1, dtype=np.uint8)
+        invaded_types = reduce_per_game(np.bitwise_or, type_bits, offsets, 0)
+        territory.append((np.where(first >= 0, first - offsets[:-1] + 1, 0), TYPE_COUNTS[invaded_types]))
+    (white_first, white_types), (black_first, black_types) = territory
+
+    # Most attacked square: count, and the squares with it, per ply (in chunks)
+    counts = np.empty(season.plies, dtype=np.int64)
+    squares = np.empty(season.plies, dtype=np.uint64)
+    for start in range(0, season.plies, chunk_plies):
+        chunk = slice(start, start + chunk_plies)
+        counts[chunk], squares[chunk] = max_counter(attack_counters(pieces[chunk]))
+
+    # First ply of each game with its highest count (rank by count, then by earlier ply),
+    # the lowest square with that count, and how many of its attackers are white
+    latest = (1 << 32) - 1
+    best_rank = reduce_per_game(np.maximum, (counts << 32) | (latest - ply_index), offsets, 0)
+    chosen = np.flatnonzero(best_rank >> 32)  # Games with an attacked square at all
+    best_ply = offsets[chosen] + (latest - (best_rank[chosen] & latest))
+    best_square = lowest_square(squares[best_ply])
+    white_planes = attack_counters(pieces[best_ply], colors=(chess.WHITE,))
+    white_attackers = sum(((plane >> best_square.astype(np.uint64)) & np.uint64(1)).astype(np.int64) << i
+                          for i, plane in enumerate(white_planes))
+
+    most_attacked = [None] * len(season)
+    for game_index, ply, square, white in zip(chosen.tolist(), best_ply.tolist(), best_square.tolist(),
+                                              np.asarray(white_attackers).tolist()):
+        attackers = int(counts[ply])
+        ply -= int(offsets[game_index])
+        most_attacked[game_index] = {
+            'square': chess.square_name(square),
+            'attackers': attackers,
+            'whiteAttackers': white,
+            'blackAttackers': attackers - white,
+            'moveNumber': ply + 1,
+            'move': season.move_san(game_index, ply)
+        }
+
+    return [{
+        'white': white,
+        'black': black,
+        'enemyTerritory': {
+            'whitePiecesInEnemy': int(white_types[game_index]),
+            'blackPiecesInEnemy': int(black_types[game_index]),
+            'whiteFirstInvasion': int(white_first[game_index]) or None,
+            'blackFirstInvasion': int(black_first[game_index]) or None
+        },
+        'mostAttackedSquare': most_attacked[game_index],
+        'gameIndex': game_index
+    } for game_index, (white, black) in enumerate(season.players)]
@@ -0,0 +1,285 @@
+"""
+Minimal UCI Engine Driver
+=========================
+
+Talks to a Stockfish binary over the UCI protocol directly, so a position
+costs exactly one `go`: the final info lines carry the score, principal
+variation and (with MultiPV) the top-K alternatives, and the `bestmove`
+line the engine's choice. The `stockfish` pip wrapper needs a separate
+search for get_evaluation() and get_best_move().
+
+Scores are returned from white's perspective, like the rest of the scripts
+expect:
+
+    {'type': 'cp' | 'mate', 'value': int, 'best_move': 'e2e4' | None,
+     'pv': ['e2e4', 'e7e5', ...], 'lines': [{'type', 'value', 'pv'}, ...]}
+
+'lines' is only present for MultiPV searches (multipv > 1). A static
+evaluation (SearchLimit 'static', UCI `eval`) has no best move or PV, and a
+'value' of None when the engine gives none (side to move in check).
+
+Positions of a game can be searched as a move sequence from the game's start
+(`position startpos moves e2e4 e7e5 ...`) instead of a bare FEN. Together
+with calling new_game() only between games, the hash table and search history
+built for one ply stay useful for the next.
+"""
+
+import re
+import subprocess
+import sys
+from typing import Optional
+
+from .search_limit import SearchLimit
+
+STARTING_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# `Final evaluation       +0.25 (white side) ...` / `Final evaluation: none (in check)`
+FINAL_EVALUATION = re.compile(r'^\s*Final evaluation:?\s+(none|[+-]?\d+(?:\.\d+)?)')
+_warned_missing_static = False  # static_evaluation_from_output() warns once per process
+
+
+class EngineError(Exception):
+    """The engine process died or answered something unexpected."""
+
+
+def parse_info_line(line: str) -> Optional[dict]:
+    """
+    Parse the score and PV of a UCI `info` line.
+    Returns {'multipv', 'depth', 'type', 'value', 'pv'} (side-to-move score, plus 'nodes'
+    and 'nps' when reported), or None for info lines without a score (currmove,
+    string, bound-only updates).
+    """
+    tokens = line.split()
+    if 'score' not in tokens or 'lowerbound' in tokens or 'upperbound' in tokens:
+        return None
+
+    info = {'multipv': 1, 'depth': 0, 'pv': []}
+    i = 1
+    while i < len(tokens):
+        token = tokens[i]
+        if token == 'score':
+            info['type'] = tokens[i + 1]
+            info['value'] = int(tokens[i + 2])
+            i += 3
+        elif token in ('multipv', 'depth', 'nodes', 'nps'):
+            info[token] = int(tokens[i + 1])
+            i += 2
+        elif token == 'pv':
+            info['pv'] = tokens[i + 1:]
+            break
+        else:
+            i += 1
+    return info
+
+
+def parse_option_line(line: str) -> tuple[str, Optional[str]]:
+    """Extract (name, default) from an `option name ... type ... default ...` line."""
+    rest = line[len('option name '):]
+    name, _, rest = rest.partition(' type ')
+    default = None
+    if ' default ' in f' {rest}':
+        default = f' {rest}'.split(' default ', 1)[1].split(' min ')[0].split(' var ')[0].strip()
+        if default == '<empty>':
+            default = ''
+    return name.strip(), default
+
+
+def position_command(fen: str, game_line: Optional[tuple[str, tuple]] = None) -> str:
+    """UCI `position` command for `fen`, or for the game line (start FEN, UCI moves) reaching it."""
+    if game_line is None:
+        return f"position fen {fen}"
+    start_fen, moves = game_line
+    root = 'startpos' if start_fen == STARTING_FEN else f"fen {start_fen}"
+    return f"position {root} moves {' '.join(moves)}" if moves else f"position {root}"
+
+
+def static_evaluation_from_output(fen: str, output: list[str]) -> dict:
+    """
+    Evaluation dict of an `eval` command from its `Final evaluation` line, wherever
+    it is in the output, e.g. `Final evaluation       +0.25 (white side)`,
+    `Final evaluation       +0.23 (white side) [with scaled NNUE, ...]` or
+    `Final evaluation: none (in check)` (value None). Without such a line the
+    evaluation is marked 'missing' (a warning is printed once per process).
+    """
+    global _warned_missing_static
+    for line in output:
+        match = FINAL_EVALUATION.match(line)
+        if match is None:
+            continue
+        try:
+            value = None if match[1] == 'none' else round(float(match[1]) * 100)
+        except ValueError:
+            raise EngineError(f"Unexpected static evaluation for {fen}: {line}")
+        return {'type': 'cp', 'value': value, 'best_move': None, 'pv': []}
+
+    if not _warned_missing_static:
+        _warned_missing_static = True
+        print(f"⚠️  No 'Final evaluation' in the engine's eval output (e.g. for {fen}); "
+              f"static evaluations are skipped", file=sys.stderr)
+    return {'type': 'cp', 'value': None, 'best_move': None, 'pv': [], 'missing': True}
+
+
+def evaluation_from_output(fen: str, output: list[str], multipv: int = 1) -> dict:
+    """
+    Build the evaluation dict (see module docstring) from the engine output of one
+    search, from the `go` command up to and including the `bestmove` line (or, for a
+    static evaluation, the output of `eval` up to the `readyok` that follows it).
+    """
+    if output and output[-1].startswith('readyok'):
+        return static_evaluation_from_output(fen, output)
+
+    # Keep the last (deepest) scored line reported for each MultiPV index
+    lines = {}
+    for line in output:
+        if line.startswith('info '):
+            info = parse_info_line(line)
+            if info is not None:
+                lines[info['multipv']] = info
+
+    best_move = output[-1].split()[1] if len(output[-1].split()) > 1 else None
+    if best_move == '(none)':
+        best_move = None
+
+    sign = 1 if fen.split()[1] == 'w' else -1
+    ranked = [
+        {'type': info['type'], 'value': info['value'] * sign, 'pv': info['pv']}
+        for _, info in sorted(lines.items())
+    ]
+    if not ranked:
+        raise EngineError(f"Engine returned no score for {fen}")
+
+    evaluation = {
+        'type': ranked[0]['type'],
+        'value': ranked[0]['value'],
+        'best_move': best_move,
+        'pv': ranked[0]['pv'] or ([best_move] if best_move else [])
+    }
+    if multipv > 1:
+        evaluation['lines'] = ranked
+    return evaluation
+
+
+class UciEngine:
+    """A UCI engine subprocess searching one position at a time."""
+
+    def __init__(self, path: str, depth: int = 15, options: Optional[dict] = None):
+        self.path = path
+        self.depth = depth
+        self.name = ''
+        self.options = {}     # Option name -> current value (as sent to / reported by the engine)
+        self._multipv = 1
+
+        try:
+            self._process = subprocess.Popen(
+                path,
+                universal_newlines=True,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                bufsize=1
+            )
+        except OSError as e:
+            raise EngineError(f"Cannot start engine at {path}: {e}") from e
+
+        self._send('uci')
+        for line in self._read_until('uciok'):
+            if line.startswith('id name '):
+                self.name = line[len('id name '):]
+            elif line.startswith('option name '):
+                name, default = parse_option_line(line)
+                self.options[name] = default
+
+        for name, value in (options or {}).items():
+            self.set_option(name, value)
+        self._ready()
+
+    def _send(self, command: str) -> None:
+        if self._process.poll() is not None:
+            raise EngineError(f"Engine exited with code {self._process.returncode}")
+        self._process.stdin.write(f"{command}\n")
+        self._process.stdin.flush()
+
+    def _read_until(self, prefix: str) -> list[str]:
+        """Read output lines up to and including the first line starting with `prefix`."""
+        lines = []
+        while True:
+            line = self._process.stdout.readline()
+            if not line:
+                raise EngineError(f"Engine closed its output while waiting for '{prefix}'")
+            line = line.strip()
+            lines.append(line)
+            if line.startswith(prefix):
+                return lines
+
+    def _ready(self) -> None:
+        self._send('isready')
+        self._read_until('readyok')
+
+    def set_option(self, name: str, value) -> None:
+        """Send a `setoption` command (booleans as true/false)."""
+        if isinstance(value, bool):
+            value = str(value).lower()
+        self._send(f"setoption name {name} value {value}")
+        self.options[name] = str(value)
+
+    def new_game(self) -> None:
+        """Clear the engine's hash between games (ucinewgame)."""
+        self._send('ucinewgame')
+        self._ready()
+
+    def analyse(self, fen: str, limit: Optional[SearchLimit] = None, multipv: int = 1,
+                game_line: Optional[tuple[str, tuple]] = None) -> dict:
+        """
+        Search a position once and return its evaluation, best move and PV.
+
+        Args:
+            fen: Position to search
+            limit: Search budget (default: the engine's configured depth)
+            multipv: Number of principal variations to report
+            game_line: Optional (start FEN, UCI moves) of the game reaching `fen`;
+                       the engine is then positioned by replaying the moves
+
+        Returns:
+            Evaluation dict from white's perspective (see module docstring)
+        """
+        if multipv != self._multipv:
+            self.set_option('MultiPV', multipv)
+            self._multipv = multipv
+
+        limit = limit or SearchLimit('depth', self.depth)
+        self._send(position_command(fen, game_line))
+        for command in limit.go_commands():
+            self._send(command)
+        return evaluation_from_output(fen, self._read_until(limit.output_end), multipv)
+
+    def measure_nps(self, movetime: int = 250) -> int:
+        """Nodes per second of a short search from the starting position (for cost estimates)."""
+        self._send('position startpos')
+        self._send(f"go movetime {movetime}")
+        nps = 0
+        for line in self._read_until('bestmove'):
+            if line.startswith('info ') and ' nps ' in line:
+                tokens = line.split()
+                nps = int(tokens[tokens.index('nps') + 1])
+        return nps
+
+    def quit(self) -> None:
+        """Stop the engine process."""
+        if self._process.poll() is None:
+            try:
+                self._send('quit')
+                self._process.wait(timeout=5)
+            except (EngineError, OSError, subprocess.TimeoutExpired):
+                self._process.kill()
+
+    def __enter__(self) -> 'UciEngine':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.quit()
+
+    def __del__(self):
+        try:
+            self.quit()
+        except Exception:
+            pass
@@ -7,11 +7,63 @@ Analyzes chess games from PGN data using Stockfish engine.
 Calculates accuracy, ACPL, blunders, mistakes, and inaccuracies.
 
 Requirements:
-    pip install python-chess stockfish
+    pip install python-chess numpy
+    Stockfish binary (driven over UCI, see analysis/uci_engine.py)
 
 Usage:
     python analyze-pgn.py < games.pgn > analysis.json
     python analyze-pgn.py --depth 15 --sample 1 < games.pgn > analysis.json
+    python analyze-pgn.py --jobs 4 < games.pgn > analysis.json  # 4 engine processes, one event loop
+    python analyze-pgn.py --no-cache < games.pgn > analysis.json  # Skip the eval cache
+    python analyze-pgn.py --adaptive < games.pgn > analysis.json  # Depth 8 pass, depth 15 where it matters
+    python analyze-pgn.py --triage < games.pgn > analysis.json  # Cheap signals pick the depth 15 positions
+    python analyze-pgn.py --sparse 8 < games.pgn > analysis.json  # Every 8th position, bisect the swings
+    python analyze-pgn.py --nodes 500000 < games.pgn > analysis.json  # Fixed node budget per position
+    python analyze-pgn.py --movetime 100 < games.pgn > analysis.json  # Fixed 100 ms per position
+    python analyze-pgn.py --ndjson season.pgn > analysis.ndjson  # Stream one record per game
+    python analyze-pgn.py --resume season.pgn > analysis.json  # Continue an interrupted run
+    python analyze-pgn.py --previous old.json round.pgn > new.json  # Re-analyze only new/changed games
+    python analyze-pgn.py --record evals.rec.gz round.pgn > analysis.json  # Keep every engine answer
+    python analyze-pgn.py --replay evals.rec.gz round.pgn > analysis.json  # Re-score without Stockfish
+    python analyze-pgn.py --profile round.pgn > analysis.json  # Time breakdown in metadata.profile
+
+Evaluations are cached in .cache/stockfish-evals.sqlite (see analysis/eval_cache.py),
+so re-running over already analyzed games skips the engine search.
+
+With --triage, every position first gets cheap signals: a very low-depth
+search (--triage-depth), the engine's static evaluation, material swings and
+checks. Only critical positions (see triage_positions()) are searched at full
+depth; each game record lists the positions that kept their triage evaluation
+in "triagedOut".
+
+With --sparse K, every Kth position is searched first; wherever two searched
+positions differ by more than --sparse-threshold win%, the position halfway
+between them is searched, recursively, until each swing is pinned to a single
+move (see bisection_positions()). Positions inside quiet stretches are
+interpolated, so every move is classified and a mistake is attributed to the
+move that made it, at a fraction of the searches. Moves next to an interpolated
+position are listed in "interpolatedMoves"; they count towards accuracy, ACPL
+and move quality with their interpolated loss, but never as biggestBlunder or
+luckyEscape.
+
+Each game record carries a content hash of its moves and the analysis settings;
+with --previous, records of an earlier output whose hash matches are reused
+without search, so only new or changed games reach the engine.
+
+Finished games are also recorded in .cache/analyze-pgn.checkpoint.jsonl (see
+analysis/checkpoint.py) until the run completes. On SIGTERM the run writes the
+games finished so far (metadata "partial": true) and exits with status 143;
+--resume then skips them.
+
+With --record, every engine answer is also written to a compact recording
+(see analysis/engine_recording.py); --replay serves a recording back instead
+of running Stockfish, so classification and award changes can be re-scored
+in seconds. A replay needs the same search settings as the recorded run.
+
+With --profile, wall time and call counts per phase, engine call and analysis
+step (see analysis/profiling.py) go into metadata.profile and the progress
+lines show a throughput-based ETA; --profile-stats FILE also dumps cProfile
+stats of the main thread.
 
 Output JSON format:
     {
@@ -24,80 +76,52 @@ Output JSON format:
                 "blackAccuracy": 78.2,
                 "whiteACPL": 25,
                 "blackACPL": 45,
-                "whiteMoveQuality": {"blunders": 1, "mistakes": 3, ...},
+                "whiteMoveQuality": {"blunders": 1, "mistakes": 3, ..., "book": 4},
                 "blackMoveQuality": {"blunders": 2, "mistakes": 4, ...},
-                "biggestBlunder": {...}
+                "biggestBlunder": {...},
+                "contentHash": "3f2a9c1b0d4e5f60"
             }
         ],
         "summary": {
             "accuracyKing": {...},
             "biggestBlunder": {...}
+        },
+        "leaderboards": {
+            "accuracyKing": [{...}, ...],   # Top --top-k entries per award, best first
+            ...
         }
     }
+
+The awards are defined in analysis/awards.py.
+
+With --ndjson, games are read and analyzed in chunks of --chunk-size and each
+game is written as soon as it is analyzed, one JSON object per line, followed
+by a summary record:
+    {"type": "game", "gameIndex": 0, "white": "Player A", ...}
+    {"type": "summary", "games": 118, "metadata": {...}, "summary": {...}, "leaderboards": {...}}
 """
 
 import sys
+import signal
 import json
+import hashlib
 import argparse
+from collections import deque
 import chess
 import chess.pgn
-from stockfish import Stockfish
-
-def cp_to_win_percentage(cp):
-    """
-    Convert centipawn evaluation to win percentage.
-    Based on Lichess formula: https://lichess.org/page/accuracy
-    """
-    return 50 + 50 * (2 / (1 + pow(10, -abs(cp) / 400)) - 1) * (-1 if cp < 0 else 1)
-
-def classify_move_by_win_percentage(win_before, win_after, is_white):
-    """
-    Classify move quality based on win percentage change.
-    Based on Lichess algorithm: https://github.com/lichess-org/lila/blob/master/modules/analyse/src/main/AccuracyPercent.scala
-
-    Returns: (quality, win_loss) where quality is 'excellent', 'good', 'inaccuracies', 'mistakes', or 'blunders'
-    """
-    # Calculate win percentage loss (from player's perspective)
-    if is_white:
-        win_loss = win_before - win_after
-    else:
-        # For black, we need to flip the percentages
-        win_loss = (100 - win_before) - (100 - win_after)
-
-    # Normalize to 0-100 range
-    win_loss = max(0, win_loss)
-
-    # Lichess classification thresholds (based on win% loss)
-    if win_loss < 2:
-        return 'excellent', win_loss
-    elif win_loss < 5:
-        return 'good', win_loss
-    elif win_loss < 10:
-        return 'inaccuracies', win_loss
-    elif win_loss < 20:
-        return 'mistakes', win_loss
-    else:
-        # Only count as blunder if the position actually swings significantly
-        # Don't count blunders when already completely winning/losing
-        if win_before > 10 and win_before < 90:  # Position wasn't already decided
-            return 'blunders', win_loss
-        else:
-            return 'mistakes', win_loss
-
-def calculate_accuracy_from_win_percentage(win_losses):
-    """
-    Calculate accuracy percentage from list of win percentage losses.
-    Based on Lichess formula.
-    """
-    if not win_losses:
-        return 100
 
-    # Lichess formula: 103.1668 * e^(-0.04354 * average_win_loss) - 3.1669
-    import math
-    avg_loss = sum(win_losses) / len(win_losses)
-    accuracy = 103.1668 * math.exp(-0.04354 * avg_loss) - 3.1669
-
-    return max(0, min(100, accuracy))
+from analysis.async_engine import EnginePool
+from analysis.awards import AwardReducer
+from analysis.engine_recording import EngineRecording, ReplayPool
+from analysis.checkpoint import Checkpoint, Terminated, default_checkpoint_path, terminate_on_sigterm
+from analysis.eval_cache import DEFAULT_CACHE_PATH, engine_fingerprint
+from analysis.metrics import (BLACK, BLUNDER, BOOK, EXCELLENT, GOOD, INACCURACY, MISTAKE, WHITE,
+                              WIN_LOSS_BOUNDARIES, evals_to_cp, score_game, win_percentage)
+from analysis.opening_book import DEFAULT_BOOK_PATH, OpeningBook
+from analysis.position_batch import PositionBatch
+from analysis.profiling import Profiler, Throughput
+from analysis.search_limit import STATIC_EVAL, SearchLimit, cost_estimate_lines
+from analysis.uci_engine import EngineError, UciEngine
 
 def calculate_blunder_severity(eval_before, eval_after, eval_before_type, eval_after_type, win_loss):
     """
@@ -134,23 +158,240 @@ def calculate_blunder_severity(eval_before, eval_after, eval_before_type, eval_a
 
     return severity
 
-def analyze_game(game, stockfish, depth=15, sample_rate=1):
-    """Analyze a single game with Stockfish using Lichess-style win percentage."""
+def best_move_san(board, evaluation):
+    """Engine's best move of the searched position in SAN, or None."""
+    best_move = evaluation.get('best_move')
+    if not best_move:
+        return None
+    try:
+        return board.san(chess.Move.from_uci(best_move))
+    except ValueError:
+        return None
 
+def sample_plies(move_count, sample_rate=1):
+    """
+    Plies whose moves get classified.
+    Samples every Nth move FOR EACH PLAYER to save time:
+    White moves: 0, 2, 4, 6... -> sample 0, 4, 8...
+    Black moves: 1, 3, 5, 7... -> sample 1, 5, 9...
+    """
+    return {ply for ply in range(move_count) if (ply // 2) % sample_rate == 0}
+
+def game_fens(game):
+    """FEN of every position of the game, starting position first."""
     board = game.board()
-    moves = list(game.mainline_moves())
+    fens = [board.fen()]
+    for move in game.mainline_moves():
+        board.push(move)
+        fens.append(board.fen())
+    return fens
+
+def game_content_hash(game, settings):
+    """
+    Hash of a game's mainline moves and the analysis settings (engine configuration,
+    search budget, sampling, ...). A stored record with the same hash is still valid.
+    """
+    content = json.dumps([settings, [move.uci() for move in game.mainline_moves()]], sort_keys=True)
+    return hashlib.sha1(content.encode()).hexdigest()[:16]
+
+def load_previous_records(path):
+    """
+    Game records of an earlier output (analyze-pgn JSON, or a stats file with an
+    'analysis' section) by content hash. Missing or unreadable files give no records.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    data = data.get('analysis') or data
+    return {record['contentHash']: record for record in data.get('games', []) if 'contentHash' in record}
+
+def sampled_positions(move_count, sample_rate=1):
+    """
+    Positions a game needs: before and after each sampled move.
+    The position after ply N is the position before ply N+1, so it is only listed once.
+    """
+    sampled = sample_plies(move_count, sample_rate)
+    return sampled | {ply + 1 for ply in sampled}
+
+def add_game_to_batch(batch, game_id, fens, sample_rate=1, moves=None):
+    """
+    Register the positions a game needs (see sampled_positions()).
+    With the game's UCI `moves`, the engine reaches each position through the game.
+    """
+    batch.add_game(game_id, fens, sampled_positions(len(fens) - 1, sample_rate), moves)
+
+# Centipawn values for material counts; kings are not counted
+MATERIAL_VALUES = {'p': 100, 'n': 300, 'b': 300, 'r': 500, 'q': 900}
+
+def fen_material(fen):
+    """Material balance of a FEN in centipawns from white's perspective."""
+    balance = 0
+    for char in fen.split(' ', 1)[0]:
+        value = MATERIAL_VALUES.get(char.lower())
+        if value:
+            balance += value if char.isupper() else -value
+    return balance
+
+# Output keys of the classification codes, in whiteMoveQuality / blackMoveQuality order
+QUALITY_KEYS = {
+    BLUNDER: 'blunders',
+    MISTAKE: 'mistakes',
+    INACCURACY: 'inaccuracies',
+    GOOD: 'good',
+    EXCELLENT: 'excellent',
+    BOOK: 'book'
+}
+
+def refinement_plies(evals, sample_rate=1, margin=0.3, cp_margin=50):
+    """
+    Positions of a shallow-searched game worth re-searching at full depth (--adaptive).
+
+    A sampled move has the positions around it refined when, at shallow depth:
+    - its win% loss is within `margin` (relative) of a classification boundary
+    - it is a mistake or blunder (biggestBlunder candidate), or the position before
+      it is near the 10%/90% "already decided" blunder gate
+    - a mate score is involved
+    - it comes within `cp_margin` of the comeback (±300) or lucky escape (±200/±50) triggers
+
+    Returns: set of position indices (into the game's eval vector)
+    """
+    plies = sorted(sample_plies(len(evals) - 1, sample_rate))
+    win_losses = score_game(evals, plies).win_loss.tolist()
+    cps, is_mate = (values.tolist() for values in evals_to_cp(evals))
+    refine = set()
+    prev_position = None
+    history = []  # (position index, cp) of the last 10 positions after sampled moves
+
+    for ply, win_loss in zip(plies, win_losses):
+        cp_after = cps[ply + 1]
+        move_positions = {ply, ply + 1}
+
+        if any(abs(win_loss - boundary) <= boundary * margin for boundary in WIN_LOSS_BOUNDARIES):
+            refine |= move_positions
+        if win_loss >= WIN_LOSS_BOUNDARIES[2] * (1 - margin):
+            refine |= move_positions
+        if is_mate[ply] or is_mate[ply + 1]:
+            refine |= move_positions
+
+        # Lucky escape: previous position clearly favored one side, this move let it go
+        if prev_position is not None:
+            prev_cp = cps[prev_position]
+            if (prev_cp < -200 + cp_margin and cp_after > -50 - cp_margin) or \
+               (prev_cp > 200 - cp_margin and cp_after < 50 + cp_margin):
+                refine |= move_positions | {prev_position}
+        prev_position = ply + 1
+
+        # Comeback: the last 10 positions swung from clearly losing to clearly winning
+        history.append((ply + 1, cp_after))
+        if len(history) > 10:
+            history.pop(0)
+        if len(history) >= 5:
+            low = min(history, key=lambda entry: entry[1])
+            high = max(history, key=lambda entry: entry[1])
+            if low[1] < -300 + cp_margin and cp_after > 300 - cp_margin:
+                refine |= move_positions | {low[0]}
+            if high[1] > 300 - cp_margin and cp_after < -300 + cp_margin:
+                refine |= move_positions | {high[0]}
+
+    return refine
+
+def triage_positions(evals, static_evals, fens, sample_rate=1, margin=0.3, static_margin=150,
+                     material_swing=200):
+    """
+    Positions of a triage-searched game worth a full-depth search (--triage).
+
+    On top of refinement_plies() (classification boundaries and award triggers,
+    judged on the triage-depth evals), a sampled move is critical when:
+    - it gives check
+    - it swings the material balance by `material_swing` centipawns or more over
+      the move and the reply (a capture that is not won back, a promotion)
+    - the static evaluation of the position before or after it is `static_margin`
+      centipawns or more away from the triage search, or has no value (side to move
+      in check): something hangs that only a search sees. Static evaluations the
+      engine output could not be read for are skipped
+
+    Returns: set of position indices (into the game's eval vector)
+    """
+    critical = refinement_plies(evals, sample_rate, margin)
+    searched = evals_to_cp(evals)[0].tolist()
+    material = [fen_material(fen) for fen in fens]
+    last = len(fens) - 1
+
+    def disagrees(position):
+        static = static_evals[position]
+        # Book positions have no static evaluation and are never critical; neither are
+        # positions whose eval output the engine printed no value in ('missing')
+        if static is None or evals[position] is None or static.get('missing'):
+            return False
+        return static['value'] is None or abs(static['value'] - searched[position]) >= static_margin
+
+    for ply in sample_plies(last, sample_rate):
+        move_positions = {ply, ply + 1}
+        if move_positions <= critical:
+            continue
+        if chess.Board(fens[ply + 1]).is_check():
+            critical |= move_positions
+        elif abs(material[min(ply + 2, last)] - material[ply]) >= material_swing:
+            critical |= move_positions
+        elif disagrees(ply) or disagrees(ply + 1):
+            critical |= move_positions
+
+    return critical
+
+def sparse_positions(move_count, interval, book_plies=0):
+    """First positions searched in --sparse mode: the book line, every `interval`th position and the last one."""
+    return set(range(book_plies + 1)) | set(range(0, move_count + 1, max(1, interval))) | {move_count}
 
-    white_win_losses = []  # Track win% losses for accuracy calculation
-    black_win_losses = []
-    white_cp_losses = []  # Track actual centipawn losses for ACPL
-    black_cp_losses = []
+def bisection_positions(evals, threshold=5.0):
+    """
+    Positions to search next in --sparse mode: the midpoint between each two
+    neighbouring evaluated positions (None = not evaluated) that are more than
+    one ply apart and whose win% (white's perspective) differs by more than
+    `threshold`. Returns an empty set once every such swing spans a single move.
+    """
+    known = [position for position, evaluation in enumerate(evals) if evaluation is not None]
+    wins = win_percentage(evals_to_cp([evals[position] for position in known])[0]).tolist()
+    return {
+        (start + end) // 2
+        for start, end, win_start, win_end in zip(known, known[1:], wins, wins[1:])
+        if end - start > 1 and abs(win_end - win_start) > threshold
+    }
 
-    white_quality = {'blunders': 0, 'mistakes': 0, 'inaccuracies': 0, 'good': 0, 'excellent': 0}
-    black_quality = {'blunders': 0, 'mistakes': 0, 'inaccuracies': 0, 'good': 0, 'excellent': 0}
+def fill_sparse_evals(evals):
+    """
+    Complete a --sparse eval vector: positions between two evaluated ones get the
+    centipawns interpolated linearly (or, next to a mate score, the earlier
+    evaluation), marked 'interpolated' and without best move.
+    """
+    filled = list(evals)
+    known = [position for position, evaluation in enumerate(evals) if evaluation is not None]
+    for start, end in zip(known, known[1:]):
+        first, last = evals[start], evals[end]
+        for position in range(start + 1, end):
+            if first['type'] == 'cp' and last['type'] == 'cp':
+                value = round(first['value'] + (last['value'] - first['value']) * (position - start) / (end - start))
+                filled[position] = {'type': 'cp', 'value': value, 'best_move': None, 'pv': [], 'interpolated': True}
+            else:
+                filled[position] = {'type': first['type'], 'value': first['value'], 'best_move': None, 'pv': [],
+                                    'interpolated': True}
+    return filled
+
+def analyze_game(game, evals, sample_rate=1, book_plies=0):
+    """
+    Analyze a single game with Stockfish using Lichess-style win percentage.
+
+    `evals` is the game's eval vector indexed by ply (Stockfish evaluation dicts,
+    see PositionBatch.game_evals), with every position around a sampled move filled in.
+    The first `book_plies` moves follow opening theory and are counted as 'book'.
+    Moves next to an interpolated evaluation (--sparse) are scored with their
+    interpolated loss and listed in 'interpolatedMoves', but never reported as
+    the biggest blunder or a lucky escape.
+    """
 
-    # Track engine-level moves (win% loss < 2%)
-    white_engine_moves = 0
-    black_engine_moves = 0
+    board = game.board()
+    moves = list(game.mainline_moves())
 
     biggest_blunder = None
     biggest_comeback = None  # Track biggest eval swing from losing position
@@ -161,125 +402,73 @@ def analyze_game(game, stockfish, depth=15, sample_rate=1):
     # Track previous move eval to detect missed punishments
     prev_eval = None
 
-    for move_num, move in enumerate(moves):
+    # Win%, classification, accuracy and ACPL of every sampled move in one pass
+    # (blunders are only counted while the position is not already decided).
+    # Interpolated moves are scored too, so accuracy covers every move; their
+    # loss is bounded by the --sparse threshold of the quiet stretch around them
+    sampled_plies = sorted(sample_plies(len(moves), sample_rate))
+    interpolated_moves = [
+        move_num for move_num in sampled_plies
+        if evals[move_num].get('interpolated') or evals[move_num + 1].get('interpolated')
+    ]
+    interpolated = set(interpolated_moves)
+    scores = score_game(evals, sampled_plies, book_plies, demote_decided=True)
+    codes = scores.codes.tolist()
+    win_losses = scores.win_loss.tolist()
+    cp_losses = scores.cp_loss.tolist()
+
+    # Centipawns from white's perspective for every evaluated position
+    cps = evals_to_cp(evals)[0].tolist()
+
+    ply = 0
+    for move_index, move_num in enumerate(sampled_plies):
+        # Replay the unsampled moves up to this one
+        for move in moves[ply:move_num]:
+            board.push(move)
+        move = moves[move_num]
+        ply = move_num + 1
         is_white_move = move_num % 2 == 0
 
-        # Sample every Nth move FOR EACH PLAYER to save time
-        # White moves: 0, 2, 4, 6... -> sample 0, 4, 8...
-        # Black moves: 1, 3, 5, 7... -> sample 1, 5, 9...
-        move_index_for_player = move_num // 2
-        if move_index_for_player % sample_rate != 0:
-            board.push(move)
-            continue
+        # Evaluations before and after the move (centipawns from white's perspective)
+        eval_before = evals[move_num]
+        eval_after = evals[move_num + 1]
 
-        # Get SAN notation before making the move
+        # Get SAN notation (and the engine's preferred move) before making the move
         move_san = board.san(move)
-
-        # Get evaluation before move
-        stockfish.set_fen_position(board.fen())
-        eval_before = stockfish.get_evaluation()
-
-        # Convert to centipawns from white's perspective
-        # Use more granular mate scoring: mate-in-N = 10000 - (N * 10)
-        if eval_before['type'] == 'cp':
-            cp_before = eval_before['value']
-        elif eval_before['type'] == 'mate':
-            mate_in = eval_before['value']
-            cp_before = (10000 - abs(mate_in) * 10) * (1 if mate_in > 0 else -1)
-        else:
-            cp_before = 0
-
-        # Make the move
+        best_san = best_move_san(board, eval_before)
         board.push(move)
-
-        # Get evaluation after move
-        stockfish.set_fen_position(board.fen())
-        eval_after = stockfish.get_evaluation()
-
-        # Convert to centipawns
-        if eval_after['type'] == 'cp':
-            cp_after = eval_after['value']
-        elif eval_after['type'] == 'mate':
-            mate_in = eval_after['value']
-            cp_after = (10000 - abs(mate_in) * 10) * (1 if mate_in > 0 else -1)
-        else:
-            cp_after = 0
-
-        # Convert centipawns to win percentages
-        win_before = cp_to_win_percentage(cp_before)
-        win_after = cp_to_win_percentage(cp_after)
-
-        if is_white_move:
-            # Calculate actual centipawn loss (only if both evals are non-mate)
-            # Skip ACPL calculation when mate scores involved (unreliable centipawn comparison)
-            if eval_before['type'] == 'cp' and eval_after['type'] == 'cp':
-                cp_loss = max(0, cp_before - cp_after)
-                white_cp_losses.append(cp_loss)
-
-            # Classify move and track win% loss
-            quality, win_loss = classify_move_by_win_percentage(win_before, win_after, True)
-            white_quality[quality] += 1
-            white_win_losses.append(win_loss)
-
-            # Track engine-level moves (excellent = win% loss < 2%)
-            if quality == 'excellent':
-                white_engine_moves += 1
-
-            # Track biggest blunder using severity calculation
-            if quality == 'blunders':
-                severity = calculate_blunder_severity(
-                    cp_before, cp_after,
-                    eval_before['type'], eval_after['type'],
-                    win_loss
-                )
-                if biggest_blunder is None or severity > biggest_blunder.get('severity', 0):
-                    biggest_blunder = {
-                        'moveNumber': move_num // 2 + 1,
-                        'player': 'white',
-                        'cpLoss': int(cp_loss) if eval_before['type'] == 'cp' and eval_after['type'] == 'cp' else 0,
-                        'winLoss': win_loss,
-                        'severity': severity,
-                        'move': move_san,
-                        'evalBefore': cp_before,
-                        'evalAfter': cp_after
-                    }
-        else:
-            # Calculate actual centipawn loss (from black's perspective)
-            # Skip ACPL calculation when mate scores involved (unreliable centipawn comparison)
-            if eval_before['type'] == 'cp' and eval_after['type'] == 'cp':
-                cp_loss = max(0, cp_after - cp_before)  # Black wants negative eval
-                black_cp_losses.append(cp_loss)
-
-            # Classify move and track win% loss
-            quality, win_loss = classify_move_by_win_percentage(win_before, win_after, False)
-            black_quality[quality] += 1
-            black_win_losses.append(win_loss)
-
-            # Track engine-level moves (excellent = win% loss < 2%)
-            if quality == 'excellent':
-                black_engine_moves += 1
-
-            # Track biggest blunder using severity calculation (flip evals for black)
-            if quality == 'blunders':
-                severity = calculate_blunder_severity(
-                    -cp_before, -cp_after,  # Flip for black's perspective
-                    eval_before['type'], eval_after['type'],
-                    win_loss
-                )
-                if biggest_blunder is None or severity > biggest_blunder.get('severity', 0):
-                    biggest_blunder = {
-                        'moveNumber': move_num // 2 + 1,
-                        'player': 'black',
-                        'cpLoss': int(cp_loss) if eval_before['type'] == 'cp' and eval_after['type'] == 'cp' else 0,
-                        'winLoss': win_loss,
-                        'severity': severity,
-                        'move': move_san,
-                        'evalBefore': cp_before,
-                        'evalAfter': cp_after
-                    }
+        cp_before = cps[move_num]
+        cp_after = cps[move_num + 1]
+
+        # Track biggest blunder using severity calculation (evals flipped for black)
+        if codes[move_index] == BLUNDER and move_num not in interpolated:
+            sign = 1 if is_white_move else -1
+            win_loss = win_losses[move_index]
+            severity = calculate_blunder_severity(
+                sign * cp_before, sign * cp_after,
+                eval_before['type'], eval_after['type'],
+                win_loss
+            )
+            if biggest_blunder is None or severity > biggest_blunder.get('severity', 0):
+                # Centipawn loss only when both evals are non-mate (unreliable with mate scores)
+                cp_scored = eval_before['type'] == 'cp' and eval_after['type'] == 'cp'
+                biggest_blunder = {
+                    'moveNumber': move_num // 2 + 1,
+                    'player': 'white' if is_white_move else 'black',
+                    'cpLoss': cp_losses[move_index] if cp_scored else 0,
+                    'winLoss': win_loss,
+                    'severity': severity,
+                    'move': move_san,
+                    'bestMove': best_san,
+                    'evalBefore': cp_before,
+                    'evalAfter': cp_after
+                }
 
         # Track lucky escape: opponent didn't punish a position
         # If previous move gave opponent an advantage (> +200cp) but they didn't maintain it
+        # (not from or across an interpolated eval, which is a guess)
+        if move_num in interpolated or move_num - 1 in interpolated:
+            prev_eval = None
         if prev_eval is not None:
             # White had advantage, black didn't punish (eval went back to neutral/white favor)
             if prev_eval < -200 and cp_after > -50:
@@ -370,13 +559,10 @@ def analyze_game(game, stockfish, depth=15, sample_rate=1):
                         'moveNumber': move_num // 2 + 1
                     }
 
-    # Calculate accuracy using Lichess formula (based on win% losses)
-    white_accuracy = calculate_accuracy_from_win_percentage(white_win_losses)
-    black_accuracy = calculate_accuracy_from_win_percentage(black_win_losses)
-
-    # Calculate ACPL (actual centipawn loss)
-    white_acpl = sum(white_cp_losses) / len(white_cp_losses) if white_cp_losses else 0
-    black_acpl = sum(black_cp_losses) / len(black_cp_losses) if black_cp_losses else 0
+    white_quality = {key: int(scores.counts[0, WHITE, code]) for code, key in QUALITY_KEYS.items()}
+    black_quality = {key: int(scores.counts[0, BLACK, code]) for code, key in QUALITY_KEYS.items()}
+    (white_acpl, black_acpl), = scores.acpl.tolist()
+    (white_accuracy, black_accuracy), = scores.accuracy.tolist()
 
     return {
         'whiteACPL': round(white_acpl, 1),
@@ -385,300 +571,506 @@ def analyze_game(game, stockfish, depth=15, sample_rate=1):
         'blackAccuracy': round(black_accuracy, 1),
         'whiteMoveQuality': white_quality,
         'blackMoveQuality': black_quality,
-        'whiteEngineMoves': white_engine_moves,
-        'blackEngineMoves': black_engine_moves,
+        # Engine-level moves (win% loss < 2%); book moves count too, as before the book was classified
+        'whiteEngineMoves': white_quality['excellent'] + white_quality['book'],
+        'blackEngineMoves': black_quality['excellent'] + black_quality['book'],
         'biggestBlunder': biggest_blunder,
         'biggestComeback': biggest_comeback,
-        'luckyEscape': lucky_escape
+        'luckyEscape': lucky_escape,
+        # Plies of the moves scored on an interpolated eval (--sparse)
+        **({'interpolatedMoves': interpolated_moves} if interpolated_moves else {})
     }
 
-def main():
-    parser = argparse.ArgumentParser(description='Analyze chess PGN with Stockfish')
-    parser.add_argument('--depth', type=int, default=15, help='Stockfish search depth (default: 15)')
-    parser.add_argument('--sample', type=int, default=1, help='Analyze every Nth move (default: 1 = all moves)')
-    parser.add_argument('--stockfish-path', type=str, default='/opt/homebrew/bin/stockfish', help='Path to Stockfish binary')
-    args = parser.parse_args()
-
-    # Initialize Stockfish
-    try:
-        stockfish = Stockfish(path=args.stockfish_path, depth=args.depth)
-    except Exception as e:
-        print(f"Error initializing Stockfish: {e}", file=sys.stderr)
-        print("Install Stockfish: brew install stockfish (macOS) or apt-get install stockfish (Linux)", file=sys.stderr)
-        sys.exit(1)
-
-    # Read PGN from stdin
-    pgn_text = sys.stdin.read()
-
-    # Parse games
-    games_analyzed = []
+def read_games(stream):
+    """Yield (game_index, game) from a PGN stream, one game at a time."""
     game_index = 0
-
-    import io
-    pgn_io = io.StringIO(pgn_text)
-
-    # First pass: count total games
-    total_games = pgn_text.count('[Event ')
-    print(f"\n🔬 Stockfish Analysis Starting...", file=sys.stderr)
-    print(f"📊 Total games to analyze: {total_games}", file=sys.stderr)
-    print(f"⚙️  Depth: {args.depth} | Sample rate: every {args.sample} move(s)", file=sys.stderr)
-
-    # Format estimated time in human-readable form
-    min_seconds = total_games * 15
-    max_seconds = total_games * 30
-    min_minutes = min_seconds // 60
-    min_secs = min_seconds % 60
-    max_minutes = max_seconds // 60
-    max_secs = max_seconds % 60
-
-    if max_minutes > 0:
-        time_estimate = f"{min_minutes}:{min_secs:02d}-{max_minutes}:{max_secs:02d} minutes"
-    else:
-        time_estimate = f"{min_seconds}-{max_seconds} seconds"
-
-    print(f"⏱️  Estimated time: {time_estimate}\n", file=sys.stderr)
-
     while True:
-        game = chess.pgn.read_game(pgn_io)
+        game = chess.pgn.read_game(stream)
         if game is None:
-            break
+            return
+        yield game_index, game
+        game_index += 1
 
-        white = game.headers.get('White', 'Unknown')
-        black = game.headers.get('Black', 'Unknown')
+def chunked(items, size=None):
+    """Split an iterable into lists of `size` items (one list of everything if size is None)."""
+    if size is None:
+        yield list(items)
+        return
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def search_pass(batch, games, limit, pool, label='', on_game=None, total_games=None, profiler=None):
+    """
+    Evaluate the pending positions of every game in `batch` with `limit` on the engine
+    pool, collecting results game by game in order and printing a progress line per game.
+    `games` is a list of (game_index, game); `total_games` (if known) drives the progress bar.
+    `on_game(game_index)` is called as soon as a game's evaluations are recorded; the
+    engines keep searching the following games meanwhile. With an enabled `profiler`,
+    the time spent waiting for the engines is recorded and the progress line shows
+    an ETA from the positions evaluated so far.
+    Returns: (cache_hits, cache_misses)
+    """
+    profiler = profiler or Profiler()
+    tasks = [(batch.pending(game_index), limit) for game_index, game in games if game.next() is not None]
+    evaluated = profiler.waiting(pool.map(tasks))
+    throughput = Throughput(sum(len(requests) for requests, _ in tasks)) if profiler.enabled else None
 
-        # Count moves in this game
-        board = game.board()
-        move_count = 0
-        for _ in game.mainline_moves():
-            move_count += 1
+    cache_hits = 0
+    cache_misses = 0
 
-        # Print progress with game info (use \r to overwrite line)
-        progress_pct = ((game_index + 1) / total_games) * 100
-        progress_bar = '█' * int(progress_pct / 5) + '░' * (20 - int(progress_pct / 5))
+    for game_index, game in games:
+        white = game.headers.get('White', 'Unknown')
+        black = game.headers.get('Black', 'Unknown')
 
         # Truncate long names to fit on one line (shorter to avoid wrapping)
         max_name_len = 20
         white_short = white[:max_name_len] + '...' if len(white) > max_name_len else white
         black_short = black[:max_name_len] + '...' if len(black) > max_name_len else black
 
-        # Clear line with spaces, then print progress
-        progress_line = f"[{progress_bar}] {progress_pct:3.0f}% | {game_index + 1}/{total_games} | {white_short} vs {black_short}"
+        # Print progress with game info (use \r to overwrite line)
+        if total_games:
+            progress_pct = ((game_index + 1) / total_games) * 100
+            progress_bar = '█' * int(progress_pct / 5) + '░' * (20 - int(progress_pct / 5))
+            progress_line = f"{label}[{progress_bar}] {progress_pct:3.0f}% | {game_index + 1}/{total_games} | {white_short} vs {black_short}"
+        else:
+            progress_line = f"{label}Game {game_index + 1} | {white_short} vs {black_short}"
 
-        # Skip games with no moves (forfeits, etc.)
-        if move_count == 0:
+        if game.next() is None:
             print(f"\r{progress_line:<100} [SKIPPED - no moves]", end='', flush=True, file=sys.stderr)
-            game_index += 1
             continue
 
+        if throughput is not None:
+            progress_line = f"{progress_line[:88]:<88} | {throughput.eta()}"
         print(f"\r{progress_line:<100}", end='', flush=True, file=sys.stderr)
 
-        analysis = analyze_game(game, stockfish, args.depth, args.sample)
+        evaluations, hits, misses = next(evaluated)
+        if throughput is not None:
+            throughput.advance(len(evaluations))
+        batch.record(game_index, evaluations)
+        cache_hits += hits
+        cache_misses += misses
+        if on_game is not None:
+            on_game(game_index)
 
-        games_analyzed.append({
-            'gameIndex': game_index,
-            'white': white,
-            'black': black,
-            **analysis
-        })
-
-        game_index += 1
-
-    print(f"\n\n✅ Analysis complete! Processed {total_games} games\n", file=sys.stderr)
-
-    # Find accuracy king, biggest blunder, ACPL extremes, comeback king, lucky escape, stockfish buddy, and inaccuracy king
-    accuracy_king = None
-    biggest_blunder = None
-    comeback_king = None
-    lucky_escape = None
-    stockfish_buddy = None
-    inaccuracy_king = None
-    lowest_acpl = None
-    highest_acpl = None
-    lowest_combined_acpl = None
-    highest_combined_acpl = None
-
-    for game_data in games_analyzed:
-        # Check white accuracy
-        if accuracy_king is None or game_data['whiteAccuracy'] > accuracy_king['accuracy']:
-            accuracy_king = {
-                'player': 'white',
-                'accuracy': game_data['whiteAccuracy'],
-                'acpl': game_data['whiteACPL'],
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex']
-            }
-
-        # Check black accuracy
-        if accuracy_king is None or game_data['blackAccuracy'] > accuracy_king['accuracy']:
-            accuracy_king = {
-                'player': 'black',
-                'accuracy': game_data['blackAccuracy'],
-                'acpl': game_data['blackACPL'],
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex']
-            }
-
-        # Check white lowest ACPL
-        if lowest_acpl is None or game_data['whiteACPL'] < lowest_acpl['acpl']:
-            lowest_acpl = {
-                'player': 'white',
-                'acpl': game_data['whiteACPL'],
-                'accuracy': game_data['whiteAccuracy'],
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex']
-            }
-
-        # Check black lowest ACPL
-        if lowest_acpl is None or game_data['blackACPL'] < lowest_acpl['acpl']:
-            lowest_acpl = {
-                'player': 'black',
-                'acpl': game_data['blackACPL'],
-                'accuracy': game_data['blackAccuracy'],
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex']
-            }
-
-        # Check white highest ACPL
-        if highest_acpl is None or game_data['whiteACPL'] > highest_acpl['acpl']:
-            highest_acpl = {
-                'player': 'white',
-                'acpl': game_data['whiteACPL'],
-                'accuracy': game_data['whiteAccuracy'],
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex']
-            }
-
-        # Check black highest ACPL
-        if highest_acpl is None or game_data['blackACPL'] > highest_acpl['acpl']:
-            highest_acpl = {
-                'player': 'black',
-                'acpl': game_data['blackACPL'],
-                'accuracy': game_data['blackAccuracy'],
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex']
-            }
-
-        # Check combined ACPL
-        combined_acpl = game_data['whiteACPL'] + game_data['blackACPL']
-
-        if lowest_combined_acpl is None or combined_acpl < lowest_combined_acpl['combinedACPL']:
-            lowest_combined_acpl = {
-                'combinedACPL': combined_acpl,
-                'whiteACPL': game_data['whiteACPL'],
-                'blackACPL': game_data['blackACPL'],
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex']
-            }
+    return cache_hits, cache_misses
 
-        if highest_combined_acpl is None or combined_acpl > highest_combined_acpl['combinedACPL']:
-            highest_combined_acpl = {
-                'combinedACPL': combined_acpl,
-                'whiteACPL': game_data['whiteACPL'],
-                'blackACPL': game_data['blackACPL'],
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex']
-            }
-
-        # Check biggest blunder (compare by severity, not just cpLoss)
-        if game_data['biggestBlunder']:
-            if biggest_blunder is None or game_data['biggestBlunder']['severity'] > biggest_blunder.get('severity', 0):
-                biggest_blunder = {
-                    **game_data['biggestBlunder'],
-                    'white': game_data['white'],
-                    'black': game_data['black'],
-                    'gameIndex': game_data['gameIndex']
-                }
-
-        # Check biggest comeback
-        if game_data['biggestComeback']:
-            if comeback_king is None or game_data['biggestComeback']['swing'] > comeback_king.get('swing', 0):
-                comeback_king = {
-                    **game_data['biggestComeback'],
-                    'white': game_data['white'],
-                    'black': game_data['black'],
-                    'gameIndex': game_data['gameIndex']
-                }
-
-        # Check lucky escape
-        if game_data['luckyEscape']:
-            if lucky_escape is None or game_data['luckyEscape']['escapeAmount'] > lucky_escape.get('escapeAmount', 0):
-                lucky_escape = {
-                    **game_data['luckyEscape'],
-                    'white': game_data['white'],
-                    'black': game_data['black'],
-                    'gameIndex': game_data['gameIndex']
-                }
-
-        # Check Stockfish Buddy (most engine-level moves)
-        if stockfish_buddy is None or game_data['whiteEngineMoves'] > stockfish_buddy.get('engineMoves', 0):
-            stockfish_buddy = {
-                'player': 'white',
-                'engineMoves': game_data['whiteEngineMoves'],
-                'totalMoves': sum(game_data['whiteMoveQuality'].values()),
-                'percentage': round(game_data['whiteEngineMoves'] / sum(game_data['whiteMoveQuality'].values()) * 100, 1) if sum(game_data['whiteMoveQuality'].values()) > 0 else 0,
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex']
-            }
-
-        if stockfish_buddy is None or game_data['blackEngineMoves'] > stockfish_buddy.get('engineMoves', 0):
-            stockfish_buddy = {
-                'player': 'black',
-                'engineMoves': game_data['blackEngineMoves'],
-                'totalMoves': sum(game_data['blackMoveQuality'].values()),
-                'percentage': round(game_data['blackEngineMoves'] / sum(game_data['blackMoveQuality'].values()) * 100, 1) if sum(game_data['blackMoveQuality'].values()) > 0 else 0,
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex']
-            }
+def analyze_chunk(games, args, limit, pool, book, emit, total_games=None, nps=None, done=None, profiler=None):
+    """
+    Search and analyze a list of (game_index, game), deduplicating positions within it,
+    and pass each game record to `emit` in game order. With `nps`, a cost estimate for
+    the chunk's searches is printed first. `done` maps game indices to records finished
+    by an earlier run; those games are emitted as they are, without searching.
+    Returns: (cache_hits, cache_misses)
+    """
+    profiler = profiler or Profiler()
+    done = done or {}
+    # Skip games with no moves (forfeits, etc.)
+    playable = [(game_index, game) for game_index, game in games if game.next() is not None]
+    games_by_index = dict(games)
+    to_analyze = [(game_index, game) for game_index, game in playable if game_index not in done]
+
+    # Records are emitted in game order, resumed ones as soon as the games before them are
+    ready = dict(done)
+    order = deque(game_index for game_index, game in playable)
+    def release():
+        while order and order[0] in ready:
+            emit(ready.pop(order.popleft()))
+
+    # Gather the unique positions of the chunk so transpositions and
+    # shared opening lines are only searched once
+    batch = PositionBatch()
+    book_plies = {}
+    game_lines = {}  # Game index -> (FENs, UCI moves)
+    with profiler.phase('collect positions'):
+        for game_index, game in to_analyze:
+            fens = game_fens(game)
+            moves = [move.uci() for move in game.mainline_moves()]
+            game_lines[game_index] = (fens, moves)
+            book_plies[game_index] = book.book_plies(fens)
+            if args.sparse:
+                batch.add_game(game_index, fens, sparse_positions(len(moves), args.sparse, book_plies[game_index]), moves)
+            else:
+                add_game_to_batch(batch, game_index, fens, args.sample, moves)
+
+    # Textbook opening positions come from the precomputed book table
+    two_pass = args.adaptive or args.triage
+    if args.triage:
+        first_limit = SearchLimit('depth', args.triage_depth)
+    elif args.adaptive:
+        first_limit = SearchLimit('depth', args.shallow_depth)
+    else:
+        first_limit = limit
+    with profiler.phase('opening book'):
+        from_book = batch.resolve(lambda request: book.get(request.fen, first_limit.book_depth))
+
+    if nps is not None:
+        print(f"♻️  Positions: {batch.summary()}", file=sys.stderr)
+        print(f"📖 Opening book: {from_book} positions resolved without search ({len(book)} in book)", file=sys.stderr)
+
+        # Cost of searching the remaining positions under each budget mode
+        # (upper bound: cache hits and, with --adaptive / --triage, skipped re-searches are free)
+        if nps:
+            to_search = batch.unique_positions - from_book
+            print(f"⏱️  Estimated time for {to_search} positions:", file=sys.stderr)
+            for line in cost_estimate_lines(limit, args.depth, to_search, args.jobs, nps):
+                print(f"   {line}", file=sys.stderr)
+        print(file=sys.stderr)
+
+    def emit_game(game_index, evals, extra=None):
+        game = games_by_index[game_index]
+        with profiler.section('analysis', 'analyze_game'):
+            analysis = analyze_game(game, evals, args.sample, book_plies[game_index])
+        ready[game_index] = {
+            'gameIndex': game_index,
+            'white': game.headers.get('White', 'Unknown'),
+            'black': game.headers.get('Black', 'Unknown'),
+            **analysis,
+            **(extra or {})
+        }
+        with profiler.section('analysis', 'emit'):
+            release()
+
+    release()
+    searched = [(game_index, game) for game_index, game in games if game_index not in done]
+    cache_hits = cache_misses = 0
+
+    # Triage: the engine's static evaluation of every position that is not in
+    # the book, compared with the triage search below
+    if args.triage:
+        statics = PositionBatch()
+        for game_index, game in to_analyze:
+            fens, moves = game_lines[game_index]
+            keys = batch.game_keys(game_index)
+            statics.add_game(game_index, fens, [
+                position for position in sampled_positions(len(moves), args.sample)
+                if keys[position] not in batch.evaluations
+            ], moves)
+        with profiler.phase('static eval'):
+            cache_hits, cache_misses = search_pass(statics, searched, STATIC_EVAL, pool, label='🧮 ',
+                                                   total_games=total_games, profiler=profiler)
+        print(file=sys.stderr)
+
+    # In a single pass each game is analyzed as soon as its evaluations are in
+    with profiler.phase('shallow search' if two_pass else 'search'):
+        hits, misses = search_pass(
+            batch, searched, first_limit, pool, total_games=total_games, profiler=profiler,
+            on_game=None if two_pass or args.sparse else lambda game_index: emit_game(game_index, batch.game_evals(game_index))
+        )
+        cache_hits += hits
+        cache_misses += misses
+
+    # Sparse mode: bisect every interval whose ends differ by more than the
+    # threshold until each swing is pinned to one move, then interpolate the rest
+    if args.sparse:
+        sparse_evals = {game_index: batch.game_evals(game_index) for game_index, game in to_analyze}
+        known = dict(batch.evaluations)  # Position key -> evaluation, across rounds
+        bisection_round = 0
+        with profiler.phase('bisection'):
+            while True:
+                bisection = PositionBatch()
+                for game_index, game in to_analyze:
+                    fens, moves = game_lines[game_index]
+                    bisection.add_game(game_index, fens, bisection_positions(sparse_evals[game_index], args.sparse_threshold),
+                                       moves)
+                if not bisection.references:
+                    break
+                bisection_round += 1
+                bisection.resolve(lambda request: known.get(request.key) or
+                                  book.get(request.fen, limit.book_depth))
+                print(f"\n🔎 Bisection round {bisection_round}: {bisection.unique_positions} positions", file=sys.stderr)
+                hits, misses = search_pass(bisection, searched, limit, pool, label='🔎 ', total_games=total_games,
+                                           profiler=profiler)
+                cache_hits += hits
+                cache_misses += misses
+                known.update(bisection.evaluations)
+                for game_index, evals in sparse_evals.items():
+                    for position, evaluation in enumerate(bisection.game_evals(game_index)):
+                        if evaluation is not None:
+                            evals[position] = evaluation
+
+        for game_index, evals in sparse_evals.items():
+            searched_positions = sum(evaluation is not None for evaluation in evals)
+            emit_game(game_index, fill_sparse_evals(evals), {
+                'sparse': {'evaluated': searched_positions, 'interpolated': len(evals) - searched_positions}
+            })
+
+    # Adaptive mode: re-search at full depth only the positions whose shallow
+    # evaluation sits near a classification boundary or an award trigger;
+    # triage mode also re-searches the positions flagged by its cheap signals
+    if two_pass:
+        refined = PositionBatch()
+        triaged_out = {}  # Game index -> positions keeping their triage evaluation
+        with profiler.phase('select refinements'):
+            for game_index, game in to_analyze:
+                fens, moves = game_lines[game_index]
+                if args.triage:
+                    refine = triage_positions(batch.game_evals(game_index), statics.game_evals(game_index), fens,
+                                              args.sample, args.boundary_margin, args.static_margin,
+                                              args.material_swing)
+                    triaged_out[game_index] = [
+                        position for position in sorted(sampled_positions(len(moves), args.sample) - refine)
+                        if book.get(fens[position], limit.book_depth) is None
+                    ]
+                else:
+                    refine = refinement_plies(batch.game_evals(game_index), args.sample, args.boundary_margin)
+                refined.add_game(game_index, fens, refine, moves)
+            refined.resolve(lambda request: book.get(request.fen, limit.book_depth))
+        print(f"\n🎯 Refining with {limit.describe()}: {refined.unique_positions} of {batch.unique_positions} positions", file=sys.stderr)
+
+        def emit_refined(game_index):
+            evals = [deep or shallow for shallow, deep in zip(batch.game_evals(game_index), refined.game_evals(game_index))]
+            extra = {'triagedOut': triaged_out[game_index]} if args.triage else None
+            emit_game(game_index, evals, extra)
+
+        with profiler.phase('refinement search'):
+            hits, misses = search_pass(refined, searched, limit, pool, label='🎯 ', on_game=emit_refined,
+                                       total_games=total_games, profiler=profiler)
+        cache_hits += hits
+        cache_misses += misses
+
+    return cache_hits, cache_misses
 
-        # Check Inaccuracy King (most inaccuracies)
-        if inaccuracy_king is None or game_data['whiteMoveQuality']['inaccuracies'] > inaccuracy_king.get('inaccuracies', 0):
-            inaccuracy_king = {
-                'player': 'white',
-                'inaccuracies': game_data['whiteMoveQuality']['inaccuracies'],
-                'totalMoves': sum(game_data['whiteMoveQuality'].values()),
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex']
-            }
+def main():
+    parser = argparse.ArgumentParser(description='Analyze chess PGN with Stockfish')
+    parser.add_argument('--depth', type=int, default=15, help='Stockfish search depth (default: 15)')
+    parser.add_argument('--nodes', type=int, default=0, help='Search N nodes per position instead of a fixed depth')
+    parser.add_argument('--movetime', type=int, default=0, help='Search N milliseconds per position instead of a fixed depth')
+    parser.add_argument('--sample', type=int, default=1, help='Analyze every Nth move (default: 1 = all moves)')
+    parser.add_argument('--stockfish-path', type=str, default='/opt/homebrew/bin/stockfish', help='Path to Stockfish binary')
+    parser.add_argument('--hash', type=int, default=64, help='Engine hash table size in MB, per process (default: 64)')
+    parser.add_argument('--jobs', type=int, default=1, help='Number of Stockfish processes searching in parallel (default: 1)')
+    parser.add_argument('--cache', type=str, default=str(DEFAULT_CACHE_PATH), help='Path to the persistent evaluation cache')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the persistent evaluation cache')
+    parser.add_argument('--opening-book', type=str, default=str(DEFAULT_BOOK_PATH), help='Path to the opening book table')
+    parser.add_argument('--no-book', action='store_true', help='Search opening positions instead of using the book')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Two-pass mode: shallow search everywhere, --depth only where it can change the result')
+    parser.add_argument('--shallow-depth', type=int, default=8, help='First-pass depth in --adaptive mode (default: 8)')
+    parser.add_argument('--boundary-margin', type=float, default=0.3,
+                        help='Relative distance to a win%% boundary that triggers a re-search (default: 0.3)')
+    parser.add_argument('--sparse', type=int, default=0,
+                        help='Search every Nth position, then bisect large eval swings down to the move (default: off)')
+    parser.add_argument('--sparse-threshold', type=float, default=5.0,
+                        help='Win%% difference between two searched positions that is bisected in --sparse mode (default: 5)')
+    parser.add_argument('--triage', action='store_true',
+                        help='Static eval and a --triage-depth search everywhere, --depth only for critical positions '
+                             '(replaces --adaptive)')
+    parser.add_argument('--triage-depth', type=int, default=4, help='Search depth of the --triage pass (default: 4)')
+    parser.add_argument('--static-margin', type=int, default=150,
+                        help='Static eval vs triage search difference (cp) that makes a position critical (default: 150)')
+    parser.add_argument('--material-swing', type=int, default=200,
+                        help='Material change (cp) over a move and its reply that makes it critical in --triage (default: 200)')
+    parser.add_argument('pgn', nargs='?', default=None, help='PGN file to analyze (default: stdin)')
+    parser.add_argument('--ndjson', action='store_true',
+                        help='Stream games from the input and print one JSON record per game, then a summary record')
+    parser.add_argument('--chunk-size', type=int, default=50,
+                        help='Games searched together (sharing deduplicated positions) with --ndjson (default: 50)')
+    parser.add_argument('--checkpoint', type=str, default=str(default_checkpoint_path('analyze-pgn')),
+                        help='Sidecar file recording finished games (removed when the run completes)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip games finished by an interrupted run with the same settings')
+    parser.add_argument('--top-k', type=int, default=5, help='Entries per award leaderboard (default: 5)')
+    parser.add_argument('--previous', type=str, default=None,
+                        help='Earlier output (or stats JSON) whose records are reused for unchanged games')
+    parser.add_argument('--record', type=str, default=None,
+                        help='Write every engine answer of this run to an engine recording file')
+    parser.add_argument('--replay', type=str, default=None,
+                        help='Answer searches from an engine recording instead of running Stockfish')
+    parser.add_argument('--profile', action='store_true',
+                        help='Record a time breakdown per phase, engine call and analysis step in metadata.profile')
+    parser.add_argument('--profile-stats', type=str, default=None,
+                        help='With --profile, also dump cProfile stats of the main thread to this file')
+    args = parser.parse_args()
+    args.jobs = max(1, args.jobs)
+    args.adaptive = args.adaptive and not args.triage  # Triage includes the adaptive refinement
+    if args.sparse and (args.sample != 1 or args.adaptive or args.triage):
+        parser.error('--sparse evaluates every move itself; it cannot be combined with --sample, --adaptive or --triage')
+    limit = SearchLimit.from_args(args)
+    profiler = Profiler(args.profile, args.profile_stats).start()
+
+    if args.replay:
+        # Re-scoring recorded answers: no engine process, no cost estimate
+        try:
+            recording = EngineRecording(args.replay)
+        except EngineError as e:
+            print(f"Error loading engine recording: {e}", file=sys.stderr)
+            sys.exit(1)
+        engine_name = recording.name
+        engine_id = recording.fingerprint
+        nps = 0
+        print(f"⏯️  Replaying {len(recording)} recorded engine answers from {args.replay}", file=sys.stderr)
+    else:
+        # Initialize Stockfish
+        try:
+            stockfish = UciEngine(args.stockfish_path, depth=args.depth, options={'Hash': args.hash})
+        except Exception as e:
+            print(f"Error initializing Stockfish: {e}", file=sys.stderr)
+            print("Install Stockfish: brew install stockfish (macOS) or apt-get install stockfish (Linux)", file=sys.stderr)
+            sys.exit(1)
+        engine_name = stockfish.name
+        engine_id = engine_fingerprint(stockfish)
+        nps = stockfish.measure_nps()
+        stockfish.quit()  # Only used to validate the engine path and measure its speed
+
+    pgn_stream = open(args.pgn, encoding='utf-8') if args.pgn else sys.stdin
+
+    if args.ndjson:
+        # Games are read, searched and written out chunk by chunk, so memory
+        # stays flat however large the archive is
+        chunks = chunked(read_games(pgn_stream), max(1, args.chunk_size))
+        total_games = None
+        print(f"\n🔬 Stockfish Analysis Starting (streaming, {max(1, args.chunk_size)} games per chunk)...", file=sys.stderr)
+    else:
+        with profiler.phase('read pgn'):
+            games = list(read_games(pgn_stream))
+        chunks = [games]
+        total_games = len(games)
+        print(f"\n🔬 Stockfish Analysis Starting...", file=sys.stderr)
+        print(f"📊 Total games to analyze: {total_games}", file=sys.stderr)
+    print(f"⚙️  Search: {limit.describe()} | Sample rate: every {args.sample} move(s) | Workers: {args.jobs}", file=sys.stderr)
+    if args.sparse:
+        print(f"🔎 Sparse: every {args.sparse}th position, bisecting swings over {args.sparse_threshold:g} win%", file=sys.stderr)
+    if args.triage:
+        print(f"🧮 Triage: static eval and depth {args.triage_depth} everywhere, {limit.describe()} for critical positions", file=sys.stderr)
+    elif args.adaptive:
+        print(f"🎯 Adaptive: depth {args.shallow_depth} first pass, {limit.describe()} near classification boundaries and award triggers", file=sys.stderr)
+
+    metadata = {
+        'engine': engine_name,
+        'search': limit.to_dict(),
+        'sample': args.sample,
+        'adaptive': {'shallowDepth': args.shallow_depth} if args.adaptive else None
+    }
+    if args.sparse:
+        metadata['sparse'] = {'interval': args.sparse, 'threshold': args.sparse_threshold}
+    if args.triage:
+        metadata['triage'] = {'depth': args.triage_depth, 'staticMargin': args.static_margin,
+                              'materialSwing': args.material_swing, 'boundaryMargin': args.boundary_margin}
+
+    book = OpeningBook() if args.no_book else OpeningBook.load(args.opening_book)
+    awards = AwardReducer(top_k=args.top_k)
+    games_analyzed = []
+    games_seen = 0
+    games_written = 0
+
+    # Everything that affects a game record besides its moves; part of each game's content hash
+    settings = {
+        'engine': engine_id,
+        'search': limit.to_dict(),
+        'sample': args.sample,
+        'adaptive': {'shallowDepth': args.shallow_depth, 'boundaryMargin': args.boundary_margin} if args.adaptive else None,
+        'book': not args.no_book
+    }
+    if args.triage:
+        settings['triage'] = metadata['triage']
+    if args.sparse:
+        settings['sparse'] = metadata['sparse']
+
+    # Records of unchanged games are reused from an earlier output (--previous)
+    # or from an interrupted run (--resume); finished games are checkpointed as they are emitted
+    previous = load_previous_records(args.previous) if args.previous else {}
+    if args.previous:
+        print(f"♻️  Previous output: {len(previous)} reusable game records in {args.previous}", file=sys.stderr)
+    checkpoint = Checkpoint(args.checkpoint, settings, resume=args.resume)
+    if args.resume:
+        print(f"⏯️  Resuming: {checkpoint.resumed} finished games in {args.checkpoint}", file=sys.stderr)
+    hashes = {}  # Game index -> game_content_hash() of the current chunk
+    reused = 0
+
+    def emit(game_data):
+        nonlocal games_written
+        game_data['contentHash'] = hashes[game_data['gameIndex']]
+        checkpoint.add(game_data['contentHash'], game_data)
+        awards.add(game_data)
+        games_written += 1
+        if args.ndjson:
+            print(json.dumps({'type': 'game', **game_data}), flush=True)
+        else:
+            games_analyzed.append(game_data)
 
-        if inaccuracy_king is None or game_data['blackMoveQuality']['inaccuracies'] > inaccuracy_king.get('inaccuracies', 0):
-            inaccuracy_king = {
-                'player': 'black',
-                'inaccuracies': game_data['blackMoveQuality']['inaccuracies'],
-                'totalMoves': sum(game_data['blackMoveQuality'].values()),
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex']
-            }
+    # The engines of the pool search the games in order from one event loop, while
+    # this thread records results and analyzes finished games
+    if args.replay:
+        pool = ReplayPool(recording)
+    else:
+        pool = EnginePool(args.stockfish_path, size=args.jobs, depth=args.depth, options={'Hash': args.hash},
+                          cache_path=None if args.no_cache else args.cache, record_path=args.record,
+                          profiler=profiler)
+    cache_hits = cache_misses = 0
+
+    # On SIGTERM (e.g. a workflow timeout) the games finished so far are kept
+    # in the checkpoint and written out as a partial result
+    terminate_on_sigterm()
+    terminated = False
+    try:
+        for chunk in chunks:
+            hashes = {game_index: game_content_hash(game, settings) for game_index, game in chunk}
+            done = {}
+            for game_index, game in chunk:
+                record = checkpoint.get(hashes[game_index]) or previous.get(hashes[game_index])
+                if record is not None and game.next() is not None:
+                    done[game_index] = {
+                        **record,
+                        'gameIndex': game_index,
+                        'white': game.headers.get('White', 'Unknown'),
+                        'black': game.headers.get('Black', 'Unknown')
+                    }
+            reused += len(done)
+            hits, misses = analyze_chunk(chunk, args, limit, pool, book, emit, total_games,
+                                         nps=None if args.ndjson else nps, done=done, profiler=profiler)
+            cache_hits += hits
+            cache_misses += misses
+            games_seen += len(chunk)
+    except Terminated:
+        terminated = True
+        metadata['partial'] = True
+    except EngineError as e:
+        print(f"\n\n❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        pool.close()
+        checkpoint.close()
+        if args.pgn:
+            pgn_stream.close()
+
+    if terminated:
+        print(f"\n\n⚠️  Terminated: writing partial results, re-run with --resume to continue "
+              f"(checkpoint: {args.checkpoint})", file=sys.stderr)
+    else:
+        print(f"\n\n✅ Analysis complete! Processed {games_seen} games", file=sys.stderr)
+    if reused:
+        print(f"♻️  Reused {reused} unchanged game records without search", file=sys.stderr)
+    if not args.no_cache and not args.replay:
+        print(f"💾 Eval cache: {cache_hits}/{cache_hits + cache_misses} positions served from {args.cache}", file=sys.stderr)
+    if profiler.enabled:
+        metadata['profile'] = profiler.stop()
+        print(f"⏱️  Profile:", file=sys.stderr)
+        for line in profiler.summary_lines():
+            print(f"   {line}", file=sys.stderr)
+    print(file=sys.stderr)
 
     # Output JSON
-    output = {
-        'games': games_analyzed,
-        'summary': {
-            'accuracyKing': accuracy_king,
-            'biggestBlunder': biggest_blunder,
-            'comebackKing': comeback_king,
-            'luckyEscape': lucky_escape,
-            'stockfishBuddy': stockfish_buddy,
-            'inaccuracyKing': inaccuracy_king,
-            'lowestACPL': lowest_acpl,
-            'highestACPL': highest_acpl,
-            'lowestCombinedACPL': lowest_combined_acpl,
-            'highestCombinedACPL': highest_combined_acpl
+    if args.ndjson:
+        print(json.dumps({'type': 'summary', 'games': games_written, 'metadata': metadata,
+                          'summary': awards.summary(), 'leaderboards': awards.leaderboards()}), flush=True)
+    else:
+        output = {
+            'metadata': metadata,
+            'games': games_analyzed,
+            'summary': awards.summary(),
+            'leaderboards': awards.leaderboards()
         }
-    }
+        print(json.dumps(output, indent=2))
 
-    print(json.dumps(output, indent=2))
+    if terminated:
+        sys.exit(128 + signal.SIGTERM)
+    checkpoint.discard()
 
 if __name__ == '__main__':
     main()
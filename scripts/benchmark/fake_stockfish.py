@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Deterministic Stockfish Stand-In
+================================
+
+A tiny UCI engine for benchmarks and reproducible runs without a Stockfish
+binary. It speaks the subset of UCI the analysis scripts use (uci, isready,
+setoption, ucinewgame, position, go, eval, quit) and answers every search
+with a one-ply material search, so the same position always gets the same
+score, best move and PV whatever the search limit.
+
+Per-search cost is a few milliseconds of Python. Set FAKE_STOCKFISH_DELAY_MS
+to add a fixed sleep per `go` and emulate an engine-bound run.
+
+Usage:
+    python analyze-pgn.py --stockfish-path scripts/benchmark/fake_stockfish.py < games.pgn
+"""
+
+import os
+import sys
+import time
+
+import chess
+
+ENGINE_NAME = 'Stockfish 16 (deterministic stand-in)'
+
+PIECE_VALUES = {chess.PAWN: 100, chess.KNIGHT: 300, chess.BISHOP: 320, chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 0}
+
+MATE_SCORE = 100000
+
+DELAY = float(os.environ.get('FAKE_STOCKFISH_DELAY_MS', 0)) / 1000
+
+
+def static_eval(board: chess.Board) -> int:
+    """Material plus a small advancement bonus, in centipawns from white's perspective."""
+    score = 0
+    for square, piece in board.piece_map().items():
+        rank = chess.square_rank(square) if piece.color == chess.WHITE else 7 - chess.square_rank(square)
+        value = PIECE_VALUES[piece.piece_type] + rank * 2
+        score += value if piece.color == chess.WHITE else -value
+    return score
+
+
+def ranked_moves(board: chess.Board) -> list[tuple[int, chess.Move]]:
+    """Legal moves with their one-ply score for the side to move, best first (ties by UCI)."""
+    sign = 1 if board.turn == chess.WHITE else -1
+    scored = []
+    for move in sorted(board.legal_moves, key=lambda m: m.uci()):
+        board.push(move)
+        score = MATE_SCORE if board.is_checkmate() else sign * static_eval(board)
+        board.pop()
+        scored.append((score, move))
+    scored.sort(key=lambda entry: -entry[0])
+    return scored
+
+
+def score_tokens(score: int, depth: int) -> str:
+    if score == MATE_SCORE:
+        return 'mate 1'
+    # The depth term keeps shallow and deep searches distinguishable
+    return f"cp {score + depth % 3}"
+
+
+def search(board: chess.Board, depth: int, multipv: int) -> list[str]:
+    """Output lines of one search, up to and including `bestmove`."""
+    if board.is_checkmate():
+        return ['info depth 0 score mate 0', 'bestmove (none)']
+    if board.is_game_over():
+        return ['info depth 0 score cp 0', 'bestmove (none)']
+
+    moves = ranked_moves(board)
+    lines = []
+    for index, (score, move) in enumerate(moves[:max(1, multipv)], start=1):
+        lines.append(f"info depth {depth} seldepth {depth} multipv {index} score {score_tokens(score, depth)} "
+                     f"nodes {len(moves) * depth} nps 1000000 time 1 pv {move.uci()}")
+    lines.append(f"bestmove {moves[0][1].uci()}")
+    return lines
+
+
+def parse_position(tokens: list[str]) -> chess.Board:
+    """Board of a `position startpos|fen ... [moves ...]` command."""
+    moves_at = tokens.index('moves') if 'moves' in tokens else len(tokens)
+    board = chess.Board() if tokens[1] == 'startpos' else chess.Board(' '.join(tokens[2:moves_at]))
+    for uci in tokens[moves_at + 1:]:
+        board.push_uci(uci)
+    return board
+
+
+def main():
+    board = chess.Board()
+    multipv = 1
+    out = sys.stdout
+
+    for line in sys.stdin:
+        tokens = line.split()
+        if not tokens:
+            continue
+        command = tokens[0]
+
+        if command == 'uci':
+            out.write(f"id name {ENGINE_NAME}\n")
+            out.write('option name Threads type spin default 1 min 1 max 1024\n')
+            out.write('option name Hash type spin default 16 min 1 max 33554432\n')
+            out.write('option name MultiPV type spin default 1 min 1 max 500\n')
+            out.write('uciok\n')
+        elif command == 'isready':
+            out.write('readyok\n')
+        elif command == 'setoption' and tokens[2:3] == ['MultiPV']:
+            multipv = int(tokens[-1])
+        elif command == 'position':
+            board = parse_position(tokens)
+        elif command == 'go':
+            depth = int(tokens[tokens.index('depth') + 1]) if 'depth' in tokens else 10
+            if DELAY:
+                time.sleep(DELAY)
+            out.write('\n'.join(search(board, depth, multipv)) + '\n')
+        elif command == 'eval':
+            out.write(f"Final evaluation       {static_eval(board) / 100:+.2f} (white side)\n")
+        elif command == 'quit':
+            break
+        out.flush()
+
+
+if __name__ == '__main__':
+    main()
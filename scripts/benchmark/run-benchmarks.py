@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Analysis Script Benchmarks
+==========================
+
+Times analyze-pgn.py, analyze-tactics.py and generate-highlights.py on
+scripts/highlights/all-games.pgn and scaled-up copies of it, and compares the
+results against a stored baseline so performance regressions fail loudly.
+
+For each script and scale it reports:
+    - games/sec and positions/sec (positions of the input games)
+    - peak RSS of the script process (engine processes not included)
+    - wall time per phase, split on the phase lines the script prints to stderr
+
+Engine-bound scripts run against the deterministic stand-in engine
+(fake_stockfish.py) by default, so results only measure the Python side and
+are reproducible on any machine; --engine points them at a real Stockfish.
+Evaluations are never served from the eval cache. Scaled copies repeat the
+same positions, which the scripts deduplicate before searching, so scaling
+mostly grows the per-game Python work (parsing, scoring, detection) and memory.
+
+baseline.json holds one reference run per engine kind ('fake', 'stockfish');
+refresh it with --update-baseline on the machine that runs the gate.
+
+When analyze-pgn is benchmarked, a --sparse run on the unscaled input also
+checks that sparse mode searches at most --sparse-max-share of the positions
+a full run searches.
+
+Usage:
+    python scripts/benchmark/run-benchmarks.py                      # Gate against baseline.json
+    python scripts/benchmark/run-benchmarks.py --scales 1,4 --repeat 1
+    python scripts/benchmark/run-benchmarks.py --engine /usr/bin/stockfish --depth 10
+    python scripts/benchmark/run-benchmarks.py --update-baseline    # Record new reference numbers
+
+Exit status: 0 when every measurement is within --tolerance of the baseline,
+1 on a regression, a sparse run searching too many positions, or a failed run.
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import chess.pgn
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = BENCHMARK_DIR.parent
+DEFAULT_PGN = SCRIPTS_DIR / 'highlights' / 'all-games.pgn'
+DEFAULT_BASELINE = BENCHMARK_DIR / 'baseline.json'
+FAKE_ENGINE = BENCHMARK_DIR / 'fake_stockfish.py'
+
+# Script -> ordered (stderr line pattern, phase entered) markers; time before
+# the first marker counts as 'startup'
+PHASE_MARKERS = {
+    'analyze-pgn': [
+        (r'🔬 Stockfish Analysis Starting', 'prepare'),
+        (r'^(🎯 )?\[[█░]+\]', 'search'),
+        (r'^🎯 Refining', 'refine'),
+        (r'^(✅ Analysis complete|⚠️  Terminated)', 'output'),
+    ],
+    'analyze-tactics': [
+        (r'^🔍 Analyzing game', 'analysis'),
+        (r'^✅ Analysis complete', 'output'),
+    ],
+    'generate-highlights': [
+        (r'^📥 Phase 1', 'parse'),
+        (r'^🔬 Phase 2', 'engine'),
+        (r'^📇 Generating player cards', 'player cards'),
+        (r'^🎯 Phase 3', 'detection'),
+        (r'^⭐ Phase 4', 'selection'),
+        (r'^💾 Phase 5', 'output'),
+    ],
+}
+
+SCRIPTS = tuple(PHASE_MARKERS)
+
+# Measurement -> direction in which it regresses
+GATED = {
+    'gamesPerSec': 'lower',
+    'positionsPerSec': 'lower',
+    'peakRssMb': 'higher',
+}
+
+
+def scaled_pgn(source: Path, scale: int, directory: Path) -> Path:
+    """
+    `source` repeated `scale` times. Copies get a distinct Round header so
+    they count as different games (checkpoints, --previous).
+    """
+    if scale == 1:
+        return source
+    text = source.read_text(encoding='utf-8')
+    path = directory / f"{source.stem}-x{scale}.pgn"
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        for copy in range(2, scale + 1):
+            f.write('\n\n')
+            f.write(re.sub(r'^\[Round "([^"]*)"\]', rf'[Round "\1 (copy {copy})"]', text, flags=re.M))
+    return path
+
+
+def count_positions(path: Path) -> tuple[int, int]:
+    """(games, positions) of a PGN file; each game has one position per ply plus its start."""
+    games = positions = 0
+    with open(path, encoding='utf-8') as f:
+        while (game := chess.pgn.read_game(f)) is not None:
+            games += 1
+            positions += 1 + sum(1 for _ in game.mainline_moves())
+    return games, positions
+
+
+def command_for(script: str, pgn: Path, output: Path, args, workdir: Path) -> tuple[list[str], object]:
+    """Command line and stdin (a path or None) of one benchmark run."""
+    engine = ['--stockfish-path', args.engine, '--depth', str(args.depth), '--jobs', str(args.jobs), '--no-cache',
+              '--checkpoint', str(workdir / f"{script}.checkpoint.jsonl")]
+    if script == 'analyze-pgn':
+        return [sys.executable, str(SCRIPTS_DIR / 'analyze-pgn.py'), *engine, str(pgn)], None
+    if script == 'analyze-tactics':
+        return [sys.executable, str(SCRIPTS_DIR / 'analyze-tactics.py')], pgn
+    return [sys.executable, str(SCRIPTS_DIR / 'highlights' / 'generate-highlights.py'), *engine,
+            '--min-games', '1', '--pgn', str(pgn), '--output', str(output)], None
+
+
+def phase_times(script: str, stderr_events: list[tuple[float, str]], started: float, finished: float) -> dict:
+    """Wall time per phase from timestamped stderr lines."""
+    markers = [(re.compile(pattern), phase) for pattern, phase in PHASE_MARKERS[script]]
+    phases = {}
+    phase, since = 'startup', started
+    for timestamp, line in stderr_events:
+        for pattern, entered in markers:
+            if entered != phase and pattern.search(line):
+                phases[phase] = phases.get(phase, 0) + timestamp - since
+                phase, since = entered, timestamp
+                break
+    phases[phase] = phases.get(phase, 0) + finished - since
+    return {name: round(seconds, 3) for name, seconds in phases.items()}
+
+
+def run_once(script: str, pgn: Path, args, workdir: Path) -> dict:
+    """Run a script once; wall time, peak RSS and phase times."""
+    output = workdir / f"{script}.json"
+    command, stdin_path = command_for(script, pgn, output, args, workdir)
+    env = dict(os.environ)
+    if args.engine_delay:
+        env['FAKE_STOCKFISH_DELAY_MS'] = str(args.engine_delay)
+
+    stdin = open(stdin_path, 'rb') if stdin_path else subprocess.DEVNULL
+    stdout = open(output, 'wb') if script != 'generate-highlights' else subprocess.DEVNULL
+    started = time.perf_counter()
+    process = subprocess.Popen(command, stdin=stdin, stdout=stdout, stderr=subprocess.PIPE, env=env)
+
+    # Progress bars are redrawn with \r, so split stderr on both line endings as it arrives
+    events = []
+    log = []
+    def read_stderr():
+        pending = ''
+        while chunk := os.read(process.stderr.fileno(), 65536):
+            timestamp = time.perf_counter()
+            text = pending + chunk.decode('utf-8', errors='replace')
+            log.append(text[len(pending):])
+            *lines, pending = re.split(r'[\r\n]', text)
+            events.extend((timestamp, line.strip()) for line in lines if line.strip())
+    reader = threading.Thread(target=read_stderr, daemon=True)
+    reader.start()
+
+    _, status, usage = os.wait4(process.pid, 0)
+    finished = time.perf_counter()
+    process.returncode = os.waitstatus_to_exitcode(status)
+    reader.join()
+    process.stderr.close()
+    for stream in (stdin, stdout):
+        if hasattr(stream, 'close'):
+            stream.close()
+
+    if process.returncode != 0:
+        tail = ''.join(log)[-2000:]
+        raise RuntimeError(f"{script} exited with status {process.returncode}:\n{tail}")
+
+    return {
+        'seconds': finished - started,
+        'peakRssMb': usage.ru_maxrss / 1024,  # ru_maxrss is in KiB on Linux
+        'phases': phase_times(script, events, started, finished)
+    }
+
+
+def benchmark(script: str, pgn: Path, games: int, positions: int, args, workdir: Path) -> dict:
+    """Best of --repeat runs (fastest wall time, highest peak RSS)."""
+    runs = [run_once(script, pgn, args, workdir) for _ in range(args.repeat)]
+    best = min(runs, key=lambda run: run['seconds'])
+    return {
+        'games': games,
+        'positions': positions,
+        'seconds': round(best['seconds'], 3),
+        'gamesPerSec': round(games / best['seconds'], 2),
+        'positionsPerSec': round(positions / best['seconds'], 1),
+        'peakRssMb': round(max(run['peakRssMb'] for run in runs), 1),
+        'phases': best['phases']
+    }
+
+
+def sparse_share(pgn: Path, args, workdir: Path) -> tuple[int, int]:
+    """(positions searched, positions) of an analyze-pgn --sparse run, from its per-game 'sparse' counts."""
+    output = workdir / 'analyze-pgn-sparse.json'
+    command, _ = command_for('analyze-pgn', pgn, output, args, workdir)
+    command[-1:-1] = ['--sparse', str(args.sparse)]
+    with open(output, 'wb') as stdout:
+        process = subprocess.run(command, stdin=subprocess.DEVNULL, stdout=stdout, stderr=subprocess.PIPE)
+    if process.returncode != 0:
+        tail = process.stderr.decode('utf-8', errors='replace')[-2000:]
+        raise RuntimeError(f"analyze-pgn --sparse exited with status {process.returncode}:\n{tail}")
+    games = json.loads(output.read_text(encoding='utf-8'))['games']
+    searched = sum(game['sparse']['evaluated'] for game in games)
+    return searched, searched + sum(game['sparse']['interpolated'] for game in games)
+
+
+def engine_label(args) -> str:
+    return 'fake' if Path(args.engine).resolve() == FAKE_ENGINE else 'stockfish'
+
+
+def run_settings(args) -> dict:
+    """Settings a baseline is only comparable under."""
+    return {'depth': args.depth, 'jobs': args.jobs, 'engineDelayMs': args.engine_delay}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of `results` against `baseline` beyond the relative tolerance."""
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        for measure, direction in GATED.items():
+            expected, actual = reference[measure], result[measure]
+            if direction == 'lower' and actual < expected * (1 - tolerance):
+                regressions.append(f"{key} {measure}: {actual} < {expected} (-{(1 - actual / expected) * 100:.0f}%)")
+            elif direction == 'higher' and actual > expected * (1 + tolerance):
+                regressions.append(f"{key} {measure}: {actual} > {expected} (+{(actual / expected - 1) * 100:.0f}%)")
+    return regressions
+
+
+def delta(actual: float, expected) -> str:
+    if not expected:
+        return ''
+    return f" ({(actual / expected - 1) * 100:+.0f}%)"
+
+
+def print_report(results: dict, baseline: dict) -> None:
+    print(f"\n{'benchmark':<28} {'seconds':>9} {'games/s':>16} {'positions/s':>20} {'peak RSS MB':>18}", file=sys.stderr)
+    for key, result in results.items():
+        reference = baseline.get(key, {})
+        print(f"{key:<28} {result['seconds']:>9.2f} "
+              f"{result['gamesPerSec']:>8.2f}{delta(result['gamesPerSec'], reference.get('gamesPerSec')):>8} "
+              f"{result['positionsPerSec']:>11.1f}{delta(result['positionsPerSec'], reference.get('positionsPerSec')):>9} "
+              f"{result['peakRssMb']:>10.1f}{delta(result['peakRssMb'], reference.get('peakRssMb')):>8}",
+              file=sys.stderr)
+        phases = ', '.join(f"{name} {seconds:.2f}s" for name, seconds in result['phases'].items())
+        print(f"   {phases}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Python analysis scripts')
+    parser.add_argument('--scripts', type=str, default=','.join(SCRIPTS),
+                        help=f"Comma-separated scripts to run (default: {','.join(SCRIPTS)})")
+    parser.add_argument('--pgn', type=str, default=str(DEFAULT_PGN), help='Input PGN (default: highlights/all-games.pgn)')
+    parser.add_argument('--scales', type=str, default='1', help='Comma-separated input scale factors (default: 1)')
+    parser.add_argument('--engine', type=str, default=str(FAKE_ENGINE),
+                        help='UCI engine for analyze-pgn / generate-highlights (default: deterministic stand-in)')
+    parser.add_argument('--engine-delay', type=int, default=0,
+                        help='Extra milliseconds per search of the stand-in engine (default: 0)')
+    parser.add_argument('--depth', type=int, default=10, help='Engine search depth (default: 10)')
+    parser.add_argument('--jobs', type=int, default=1, help='Engine processes per script (default: 1)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark, fastest kept (default: 3)')
+    parser.add_argument('--baseline', type=str, default=str(DEFAULT_BASELINE), help='Baseline results file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative slowdown / memory growth before failing (default: 0.25)')
+    parser.add_argument('--update-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--sparse', type=int, default=8,
+                        help='Interval of the analyze-pgn --sparse check (default: 8, 0 to skip)')
+    parser.add_argument('--sparse-max-share', type=float, default=0.6,
+                        help='Largest share of positions the --sparse check may search (default: 0.6)')
+    parser.add_argument('--output', type=str, default='', help='Also write the results JSON to this file')
+    args = parser.parse_args()
+
+    scripts = [name.strip() for name in args.scripts.split(',') if name.strip()]
+    unknown = [name for name in scripts if name not in PHASE_MARKERS]
+    if unknown:
+        parser.error(f"unknown script(s): {', '.join(unknown)}")
+    scales = [int(scale) for scale in args.scales.split(',')]
+    label = engine_label(args)
+
+    print("⏱️  Analysis Benchmarks\n", file=sys.stderr)
+    print(f"⚙️  Engine: {args.engine} ({label}) | depth {args.depth} | jobs {args.jobs} | "
+          f"repeat {args.repeat}", file=sys.stderr)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='benchmarks-') as tmp:
+        workdir = Path(tmp)
+        for scale in scales:
+            pgn = scaled_pgn(Path(args.pgn), scale, workdir)
+            games, positions = count_positions(pgn)
+            print(f"\n📊 Scale x{scale}: {games} games, {positions} positions", file=sys.stderr)
+            for script in scripts:
+                key = f"{script}@x{scale}"
+                print(f"   ▶ {key}...", end='', flush=True, file=sys.stderr)
+                try:
+                    results[key] = benchmark(script, pgn, games, positions, args, workdir)
+                except RuntimeError as e:
+                    print(f"\n❌ {e}", file=sys.stderr)
+                    sys.exit(1)
+                print(f" {results[key]['seconds']:.2f}s", file=sys.stderr)
+
+        sparse = None
+        if args.sparse and 'analyze-pgn' in scripts:
+            print(f"\n🔎 analyze-pgn --sparse {args.sparse}...", end='', flush=True, file=sys.stderr)
+            try:
+                searched, positions = sparse_share(Path(args.pgn), args, workdir)
+            except RuntimeError as e:
+                print(f"\n❌ {e}", file=sys.stderr)
+                sys.exit(1)
+            sparse = {'interval': args.sparse, 'searched': searched, 'positions': positions,
+                      'share': round(searched / positions, 3)}
+            print(f" {searched}/{positions} positions searched ({sparse['share']:.0%})", file=sys.stderr)
+            if sparse['share'] > args.sparse_max_share:
+                print(f"❌ Sparse mode searched more than {args.sparse_max_share:.0%} of the positions", file=sys.stderr)
+                sys.exit(1)
+
+    report = {
+        'engine': label,
+        'settings': run_settings(args),
+        'python': platform.python_version(),
+        'machine': f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPU(s)",
+        'results': results
+    }
+    if sparse is not None:
+        report['sparse'] = sparse
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+
+    # The baseline holds one reference run per engine kind
+    baseline_path = Path(args.baseline)
+    baselines = json.loads(baseline_path.read_text(encoding='utf-8')) if baseline_path.exists() else {}
+    reference = baselines.get(label)
+
+    if args.update_baseline:
+        merged = {**(reference['results'] if reference and reference['settings'] == report['settings'] else {}),
+                  **results}
+        baselines[label] = {**report, 'results': merged}
+        baseline_path.write_text(json.dumps(baselines, indent=2) + '\n', encoding='utf-8')
+        print_report(results, reference['results'] if reference else {})
+        print(f"\n💾 Baseline updated: {baseline_path}", file=sys.stderr)
+        return
+
+    if reference is None or reference['settings'] != report['settings']:
+        print_report(results, {})
+        print(f"\n⚠️  No {label} baseline recorded with these settings in {baseline_path}; "
+              f"nothing to compare (use --update-baseline)", file=sys.stderr)
+        return
+
+    print_report(results, reference['results'])
+    print(f"\n   Baseline: {reference['machine']}, Python {reference['python']}", file=sys.stderr)
+    regressions = compare(results, reference['results'], args.tolerance)
+    if regressions:
+        print(f"\n❌ Performance regression (tolerance {args.tolerance:.0%}):", file=sys.stderr)
+        for regression in regressions:
+            print(f"   - {regression}", file=sys.stderr)
+        sys.exit(1)
+    print(f"\n✅ Within {args.tolerance:.0%} of the baseline", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Build Opening Book Evaluation Table
+===================================
+
+Evaluates every position along the Lichess ECO lines (scripts/utils/openings-*.tsv)
+with Stockfish and stores the results in scripts/utils/opening-book.tsv.
+analyze-pgn.py and generate-highlights.py resolve these positions from the
+table instead of searching them, and mark the moves as "book".
+
+Only needs to be re-run when the ECO files or the Stockfish version change.
+Build at a depth >= the depth used by the analyzers, otherwise book entries
+are ignored and the positions are searched as usual.
+
+Requirements:
+    pip install python-chess
+
+Usage:
+    python scripts/build-opening-book.py
+    python scripts/build-opening-book.py --depth 20 --stockfish-path /usr/games/stockfish
+"""
+
+import sys
+import argparse
+
+from analysis.eval_cache import DEFAULT_CACHE_PATH, EvalCache, engine_fingerprint, evaluate_position
+from analysis.opening_book import DEFAULT_BOOK_PATH, OpeningBook, book_fens
+from analysis.search_limit import SearchLimit
+from analysis.uci_engine import UciEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the opening book evaluation table')
+    parser.add_argument('--depth', type=int, default=20, help='Stockfish search depth (default: 20)')
+    parser.add_argument('--stockfish-path', type=str, default='/opt/homebrew/bin/stockfish', help='Path to Stockfish binary')
+    parser.add_argument('--output', type=str, default=str(DEFAULT_BOOK_PATH), help='Output TSV path')
+    parser.add_argument('--cache', type=str, default=str(DEFAULT_CACHE_PATH), help='Path to the persistent evaluation cache')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the persistent evaluation cache')
+    args = parser.parse_args()
+
+    try:
+        stockfish = UciEngine(args.stockfish_path, depth=args.depth)
+    except Exception as e:
+        print(f"Error initializing Stockfish: {e}", file=sys.stderr)
+        print("Install Stockfish: brew install stockfish (macOS) or apt-get install stockfish (Linux)", file=sys.stderr)
+        sys.exit(1)
+
+    cache = None if args.no_cache else EvalCache(engine_fingerprint(stockfish), args.cache)
+
+    fens = book_fens()
+    print(f"\n📖 Building opening book from ECO lines...", file=sys.stderr)
+    print(f"📊 Unique book positions: {len(fens)}", file=sys.stderr)
+    print(f"⚙️  Depth: {args.depth}\n", file=sys.stderr)
+
+    book = OpeningBook()
+    for i, (position, fen) in enumerate(fens.items()):
+        progress_pct = ((i + 1) / len(fens)) * 100
+        progress_bar = '█' * int(progress_pct / 5) + '░' * (20 - int(progress_pct / 5))
+        print(f"\r[{progress_bar}] {progress_pct:3.0f}% | {i + 1}/{len(fens)}", end='', flush=True, file=sys.stderr)
+
+        evaluation = evaluate_position(stockfish, fen, SearchLimit('depth', args.depth), cache)
+        book.entries[position] = {'type': evaluation['type'], 'value': evaluation['value'],
+                                  'best_move': evaluation['best_move'], 'depth': args.depth}
+
+    if cache is not None:
+        cache.close()
+
+    book.save(args.output)
+    print(f"\n\n✅ Opening book saved to {args.output} ({len(book)} positions)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
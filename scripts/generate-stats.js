@@ -147,7 +147,8 @@ function analyzeTactics(parsedGames) {
 }
 
 // Run Stockfish analysis on parsed games
-function analyzeGames(parsedGames) {
+// previousFile: earlier stats JSON of the same round; its records are reused for unchanged games
+function analyzeGames(parsedGames, previousFile) {
   const startTime = Date.now();
 
   try {
@@ -172,9 +173,12 @@ function analyzeGames(parsedGames) {
       stockfishPath = '/opt/homebrew/bin/stockfish';
     }
 
+    // Only new or changed games reach the engine when the round was analyzed before
+    const previousArg = previousFile && fs.existsSync(previousFile) ? ` --previous "${previousFile}"` : '';
+
     // Run Python analyzer (depth 15, analyze all moves for maximum accuracy)
     const analysisOutput = execSync(
-      `${pythonPath} scripts/analyze-pgn.py --depth 15 --sample 1 --stockfish-path ${stockfishPath}`,
+      `${pythonPath} scripts/analyze-pgn.py --depth 15 --sample 1 --stockfish-path ${stockfishPath}${previousArg}`,
       {
         input: normalizedPgn,
         encoding: 'utf-8',
@@ -252,7 +256,8 @@ async function main() {
     // Step 4: Run Stockfish analysis (optional - slow!)
     let analysisData = null;
     if (options.analyze) {
-      analysisData = analyzeGames(parseResults.valid);
+      const previousFile = path.join(__dirname, `../public/stats/season-${options.season}-round-${options.round}.json`);
+      analysisData = analyzeGames(parseResults.valid, previousFile);
     }
 
     // Step 5: Calculate statistics (pass tactical data for awards)
@@ -7,19 +7,46 @@ Generates 1-3 highlight positions for each player who played at least 3 games.
 Highlights include brilliant moves, blunders, tactical shots, checkmates, etc.
 
 Requirements:
-    pip install python-chess stockfish
+    pip install python-chess numpy
+    Stockfish binary (driven over UCI, see scripts/analysis/uci_engine.py)
 
 Usage:
     python scripts/highlights/generate-highlights.py
     python scripts/highlights/generate-highlights.py --depth 10 --limit 5  # Quick test
     python scripts/highlights/generate-highlights.py --depth 15            # Production
+    python scripts/highlights/generate-highlights.py --multipv 3           # Also list alternative moves
+    python scripts/highlights/generate-highlights.py --movetime 100        # Predictable wall clock
+    python scripts/highlights/generate-highlights.py --jobs 4              # 4 engine processes
+    python scripts/highlights/generate-highlights.py --resume              # Continue an interrupted run
+    python scripts/highlights/generate-highlights.py --pgn round.pgn --output /tmp/highlights.json
+    python scripts/highlights/generate-highlights.py --record evals.rec.gz  # Keep every engine answer
+    python scripts/highlights/generate-highlights.py --replay evals.rec.gz  # Re-detect without Stockfish
+    python scripts/highlights/generate-highlights.py --profile             # Time breakdown in the output
 
 Output:
     public/stats/season-2-highlights.json
+
+Evaluations are cached in .cache/stockfish-evals.sqlite (shared with analyze-pgn.py),
+so a re-run only searches positions it has not seen before. Use --no-cache to disable.
+
+Opening positions are resolved from scripts/utils/opening-book.tsv (built with
+scripts/build-opening-book.py) and the moves leading to them are classified as "book".
+Use --no-book to search them like any other position.
+
+The evaluations of finished games are checkpointed to
+.cache/generate-highlights.checkpoint.jsonl until the output is written;
+--resume skips their search. On SIGTERM, Phase 2 stops and the highlights of
+the games analyzed so far are written with "status": "partial".
+
+With --profile, wall time and call counts per phase, engine call and detector
+tier (see scripts/analysis/profiling.py) are written to the output's "profile"
+field and Phase 2 shows a throughput-based ETA; --profile-stats FILE also dumps
+cProfile stats of the main thread.
 """
 
 import sys
 import json
+import signal
 import argparse
 import os
 from pathlib import Path
@@ -29,7 +56,18 @@ from typing import Optional, List
 
 import chess
 import chess.pgn
-from stockfish import Stockfish
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from analysis.async_engine import EnginePool
+from analysis.checkpoint import Checkpoint, Terminated, default_checkpoint_path, game_key, terminate_on_sigterm
+from analysis.engine_recording import EngineRecording, ReplayPool
+from analysis.eval_cache import DEFAULT_CACHE_PATH
+from analysis.metrics import CLASSIFICATIONS, classify, eval_to_cp, score_game, win_percentage
+from analysis.opening_book import DEFAULT_BOOK_PATH, OpeningBook
+from analysis.position_batch import PositionBatch
+from analysis.profiling import Profiler, Throughput
+from analysis.search_limit import SearchLimit, cost_estimate_lines
+from analysis.uci_engine import EngineError, UciEngine
 
 # =============================================================================
 # Phase 2: Stockfish Analysis - Data Classes
@@ -53,11 +91,13 @@ class MoveAnalysis:
     mate_in_after: Optional[int] = None
     best_move: Optional[str] = None  # Engine's best move (UCI)
     best_move_san: Optional[str] = None  # Engine's best move (SAN)
+    best_line: List[str] = field(default_factory=list)  # Engine's principal variation (SAN)
+    alternatives: List[str] = field(default_factory=list)  # Other MultiPV moves that hold the position (SAN)
     cp_loss: int = 0          # Centipawn loss for this move
     win_pct_before: float = 50.0  # Win percentage before
     win_pct_after: float = 50.0   # Win percentage after
     win_pct_loss: float = 0.0     # Win percentage lost
-    classification: str = 'good'  # excellent, good, inaccuracy, mistake, blunder
+    classification: str = 'good'  # book, excellent, good, inaccuracy, mistake, blunder
     is_capture: bool = False
     is_check: bool = False
     is_castling_kingside: bool = False
@@ -91,6 +131,8 @@ class HighlightCandidate:
     win_pct_loss: float = 0.0
     is_sacrifice: bool = False
     pattern_details: Optional[dict] = None
+    best_line: List[str] = field(default_factory=list)     # Engine's principal variation (SAN)
+    alternatives: List[str] = field(default_factory=list)  # Other good moves (SAN, with --multipv)
 
     def to_dict(self) -> dict:
         """Convert to JSON-serializable dict."""
@@ -102,6 +144,8 @@ class HighlightCandidate:
             'move': self.move,
             'moveUci': self.move_uci,
             'bestMove': self.best_move,
+            'bestLine': self.best_line,
+            'alternatives': self.alternatives,
             'evalBefore': self.eval_before,
             'evalAfter': self.eval_after,
             'description': self.description,
@@ -152,6 +196,7 @@ class PlayerCard:
     accuracy_as_black: float = 0.0
     avg_centipawn_loss: float = 0.0
     # Move quality
+    book_moves: int = 0
     excellent_moves: int = 0
     good_moves: int = 0
     inaccuracies: int = 0
@@ -187,6 +232,7 @@ class PlayerCard:
                 'asBlack': round(self.accuracy_as_black, 1)
             },
             'moveQuality': {
+                'book': self.book_moves,
                 'excellent': self.excellent_moves,
                 'good': self.good_moves,
                 'inaccuracies': self.inaccuracies,
@@ -212,50 +258,48 @@ class PlayerCard:
 # Phase 2: Stockfish Analysis - Helper Functions
 # =============================================================================
 
-def cp_to_win_percentage(cp: int) -> float:
-    """
-    Convert centipawn evaluation to win percentage.
-    Based on Lichess formula: https://lichess.org/page/accuracy
-    """
-    return 50 + 50 * (2 / (1 + pow(10, -abs(cp) / 400)) - 1) * (-1 if cp < 0 else 1)
-
-
-def classify_move_by_win_pct(win_before: float, win_after: float, is_white: bool) -> tuple[str, float]:
+def parse_evaluation(evaluation: dict) -> tuple[int, Optional[int], str]:
     """
-    Classify move quality based on win percentage change.
-    Returns: (classification, win_pct_loss)
+    Parse a Stockfish evaluation dict.
+    Returns: (centipawns, mate_in, eval_type) with mate-in-N scored as 10000 - N * 10
     """
-    if is_white:
-        win_loss = win_before - win_after
-    else:
-        win_loss = (100 - win_before) - (100 - win_after)
-
-    win_loss = max(0, win_loss)
-
-    if win_loss < 2:
-        return 'excellent', win_loss
-    elif win_loss < 5:
-        return 'good', win_loss
-    elif win_loss < 10:
-        return 'inaccuracy', win_loss
-    elif win_loss < 20:
-        return 'mistake', win_loss
-    else:
-        return 'blunder', win_loss
+    if evaluation['type'] == 'cp':
+        return evaluation['value'], None, 'cp'
+    return eval_to_cp(evaluation), evaluation['value'], 'mate'
+
+
+def pv_to_san(fen: str, pv: List[str], max_plies: int = 6) -> List[str]:
+    """Convert the first `max_plies` moves of a UCI principal variation to SAN."""
+    board = chess.Board(fen)
+    line = []
+    for uci in pv[:max_plies]:
+        try:
+            move = chess.Move.from_uci(uci)
+            line.append(board.san(move))
+        except ValueError:
+            break
+        board.push(move)
+    return line
 
 
-def calculate_accuracy(win_losses: List[float]) -> float:
+def holding_alternatives(fen: str, evaluation: dict, is_white: bool, max_win_loss: float = 5.0) -> List[str]:
     """
-    Calculate accuracy percentage from list of win percentage losses.
-    Based on Lichess formula.
+    Moves from the MultiPV lines (other than the best move) that keep the position,
+    i.e. lose less than `max_win_loss` win percentage against the best line.
     """
-    import math
-    if not win_losses:
-        return 100.0
-
-    avg_loss = sum(win_losses) / len(win_losses)
-    accuracy = 103.1668 * math.exp(-0.04354 * avg_loss) - 3.1669
-    return max(0, min(100, accuracy))
+    lines = evaluation.get('lines', [])
+    if len(lines) < 2:
+        return []
+
+    wins = win_percentage([eval_to_cp(line) for line in lines])
+    _, win_losses = classify(wins[0], wins[1:], is_white)
+    alternatives = []
+    for line, win_loss in zip(lines[1:], win_losses.tolist()):
+        if not line['pv']:
+            continue
+        if win_loss < max_win_loss:
+            alternatives.extend(pv_to_san(fen, line['pv'], max_plies=1))
+    return alternatives
 
 
 def format_eval(cp: int, is_mate: bool, mate_in: Optional[int]) -> str:
@@ -275,18 +319,19 @@ def format_eval(cp: int, is_mate: bool, mate_in: Optional[int]) -> str:
 
 def analyze_game_with_stockfish(
     game_data: 'GameData',
-    stockfish: Stockfish,
-    depth: int = 15,
-    verbose: bool = False
+    evals: List[dict],
+    verbose: bool = False,
+    book_plies: int = 0
 ) -> GameAnalysis:
     """
-    Analyze a game with Stockfish engine.
+    Analyze a game from its Stockfish evaluations.
 
     Args:
         game_data: Parsed game data
-        stockfish: Initialized Stockfish engine
-        depth: Analysis depth
+        evals: Stockfish evaluation of every position (see PositionBatch.game_evals):
+               score, best move, PV and optional MultiPV lines from a single search
         verbose: Print progress
+        book_plies: Number of leading moves played from the opening book
 
     Returns:
         GameAnalysis with move-by-move analysis
@@ -300,12 +345,19 @@ def analyze_game_with_stockfish(
     if not game_data.moves:
         return analysis
 
-    white_win_losses = []
-    black_win_losses = []
-    white_cp_losses = []
-    black_cp_losses = []
+    # Each position is evaluated once: the position after ply N is the position before ply N+1
+    searches = evals
+    evals = [parse_evaluation(evaluation) for evaluation in searches]
+
+    # Win%, classification and centipawn loss of every move, accuracy and ACPL per side
+    scores = score_game(searches, range(len(game_data.moves)), book_plies)
+    win_pcts_before = scores.win_before.tolist()
+    win_pcts_after = scores.win_after.tolist()
+    win_pct_losses = scores.win_loss.tolist()
+    cp_losses = scores.cp_loss.tolist()
+    classifications = [CLASSIFICATIONS[code] for code in scores.codes.tolist()]
 
-    # Replay the game and analyze each position
+    # Replay the game and analyze each move from the eval vector
     board = chess.Board()
 
     for ply, move in enumerate(game_data.moves):
@@ -315,22 +367,10 @@ def analyze_game_with_stockfish(
 
         # Get SAN before making the move
         move_san = board.san(move)
-        fen_before = board.fen()
-
-        # Analyze position BEFORE move
-        stockfish.set_fen_position(fen_before)
-        eval_before_raw = stockfish.get_evaluation()
-        best_move_uci = stockfish.get_best_move()
-
-        # Parse evaluation before
-        if eval_before_raw['type'] == 'cp':
-            cp_before = eval_before_raw['value']
-            mate_before = None
-            eval_type_before = 'cp'
-        else:  # mate
-            mate_before = eval_before_raw['value']
-            cp_before = (10000 - abs(mate_before) * 10) * (1 if mate_before > 0 else -1)
-            eval_type_before = 'mate'
+        fen_before = game_data.fens[ply]
+
+        cp_before, mate_before, eval_type_before = evals[ply]
+        best_move_uci = searches[ply].get('best_move')
 
         # Make the move
         is_capture = board.is_capture(move)
@@ -343,55 +383,15 @@ def analyze_game_with_stockfish(
                 captured = captured_piece.symbol()
 
         board.push(move)
-        fen_after = board.fen()
+        fen_after = game_data.fens[ply + 1]
         is_check = board.is_check()
 
-        # Analyze position AFTER move
-        stockfish.set_fen_position(fen_after)
-        eval_after_raw = stockfish.get_evaluation()
-
-        # Parse evaluation after
-        if eval_after_raw['type'] == 'cp':
-            cp_after = eval_after_raw['value']
-            mate_after = None
-            eval_type_after = 'cp'
-        else:  # mate
-            mate_after = eval_after_raw['value']
-            cp_after = (10000 - abs(mate_after) * 10) * (1 if mate_after > 0 else -1)
-            eval_type_after = 'mate'
-
-        # Calculate win percentages
-        win_pct_before = cp_to_win_percentage(cp_before)
-        win_pct_after = cp_to_win_percentage(cp_after)
+        cp_after, mate_after, eval_type_after = evals[ply + 1]
 
-        # Classify the move
-        classification, win_pct_loss = classify_move_by_win_pct(win_pct_before, win_pct_after, is_white)
-
-        # Calculate centipawn loss
-        if is_white:
-            cp_loss = max(0, cp_before - cp_after)
-        else:
-            cp_loss = max(0, cp_after - cp_before)  # Black wants negative eval
-
-        # Track for accuracy calculation
-        if is_white:
-            white_win_losses.append(win_pct_loss)
-            if eval_type_before == 'cp' and eval_type_after == 'cp':
-                white_cp_losses.append(cp_loss)
-        else:
-            black_win_losses.append(win_pct_loss)
-            if eval_type_before == 'cp' and eval_type_after == 'cp':
-                black_cp_losses.append(cp_loss)
-
-        # Get best move in SAN
-        best_move_san = None
-        if best_move_uci:
-            try:
-                temp_board = chess.Board(fen_before)
-                best_move_obj = chess.Move.from_uci(best_move_uci)
-                best_move_san = temp_board.san(best_move_obj)
-            except:
-                pass
+        # Best move, principal variation and alternatives in SAN, all from the same search
+        best_line = pv_to_san(fen_before, searches[ply].get('pv') or ([best_move_uci] if best_move_uci else []))
+        best_move_san = best_line[0] if best_line else None
+        alternatives = [san for san in holding_alternatives(fen_before, searches[ply], is_white) if san != move_san]
 
         # Create move analysis
         move_analysis = MoveAnalysis(
@@ -410,11 +410,13 @@ def analyze_game_with_stockfish(
             mate_in_after=mate_after,
             best_move=best_move_uci,
             best_move_san=best_move_san,
-            cp_loss=cp_loss,
-            win_pct_before=win_pct_before,
-            win_pct_after=win_pct_after,
-            win_pct_loss=win_pct_loss,
-            classification=classification,
+            best_line=best_line,
+            alternatives=alternatives,
+            cp_loss=cp_losses[ply],
+            win_pct_before=win_pcts_before[ply],
+            win_pct_after=win_pcts_after[ply],
+            win_pct_loss=win_pct_losses[ply],
+            classification=classifications[ply],
             is_capture=is_capture,
             is_check=is_check,
             is_castling_kingside=is_castling_kingside,
@@ -424,11 +426,8 @@ def analyze_game_with_stockfish(
 
         analysis.moves.append(move_analysis)
 
-    # Calculate accuracy scores
-    analysis.white_accuracy = calculate_accuracy(white_win_losses)
-    analysis.black_accuracy = calculate_accuracy(black_win_losses)
-    analysis.white_acpl = sum(white_cp_losses) / len(white_cp_losses) if white_cp_losses else 0
-    analysis.black_acpl = sum(black_cp_losses) / len(black_cp_losses) if black_cp_losses else 0
+    (analysis.white_accuracy, analysis.black_accuracy), = scores.accuracy.tolist()
+    (analysis.white_acpl, analysis.black_acpl), = scores.acpl.tolist()
 
     return analysis
 
@@ -530,7 +529,9 @@ def calculate_player_card(
             # Move quality - count player's moves only
             for move in analysis.moves:
                 if move.color == color:
-                    if move.classification == 'excellent':
+                    if move.classification == 'book':
+                        card.book_moves += 1
+                    elif move.classification == 'excellent':
                         card.excellent_moves += 1
                     elif move.classification == 'good':
                         card.good_moves += 1
@@ -597,7 +598,8 @@ def calculate_player_card(
 
 def detect_highlights_in_game(
     game_data: 'GameData',
-    analysis: GameAnalysis
+    analysis: GameAnalysis,
+    profiler: Optional[Profiler] = None
 ) -> List[HighlightCandidate]:
     """
     Detect highlight candidates in a game based on move analysis.
@@ -605,11 +607,13 @@ def detect_highlights_in_game(
     Args:
         game_data: Original game data
         analysis: Stockfish analysis of the game
+        profiler: Charges the time of each detector tier to ('detector', tier) if enabled
 
     Returns:
         List of highlight candidates
     """
     highlights = []
+    lap = (profiler or Profiler()).laps('detector')
 
     # Track eval history for comeback detection
     eval_history = []
@@ -627,6 +631,7 @@ def detect_highlights_in_game(
         else:
             min_eval_seen['black'] = min(min_eval_seen['black'], move.eval_after)
             max_eval_seen['black'] = max(max_eval_seen['black'], move.eval_after)
+        lap('eval tracking')
 
         # =================================================================
         # Tier 1: Checkmates
@@ -642,6 +647,7 @@ def detect_highlights_in_game(
                 move=move.move_san,
                 move_uci=move.move_uci,
                 best_move=move.best_move_san,
+                best_line=move.best_line,
                 eval_before=format_eval(move.eval_before, move.eval_type_before == 'mate', move.mate_in_before),
                 eval_after=format_eval(move.eval_after, move.eval_type_after == 'mate', move.mate_in_after),
                 description=f"Checkmate! {move.move_san} ends the game.",
@@ -650,7 +656,9 @@ def detect_highlights_in_game(
                 color=move.color
             ))
             # Skip other pattern detection for checkmate moves
+            lap('checkmate')
             continue
+        lap('checkmate')
 
         # =================================================================
         # Tier 1: Brilliant Moves (sacrifices that work)
@@ -722,6 +730,7 @@ def detect_highlights_in_game(
                         move=move.move_san,
                         move_uci=move.move_uci,
                         best_move=move.best_move_san,
+                        best_line=move.best_line,
                         eval_before=format_eval(move.eval_before, move.eval_type_before == 'mate', move.mate_in_before),
                         eval_after=format_eval(move.eval_after, move.eval_type_after == 'mate', move.mate_in_after),
                         description=f"Brilliant {sac_type} sacrifice! {move.move_san} gives up material but maintains the advantage.",
@@ -748,6 +757,7 @@ def detect_highlights_in_game(
                         move=move.move_san,
                         move_uci=move.move_uci,
                         best_move=move.best_move_san,
+                        best_line=move.best_line,
                         eval_before=format_eval(move.eval_before, move.eval_type_before == 'mate', move.mate_in_before),
                         eval_after=format_eval(move.eval_after, move.eval_type_after == 'mate', move.mate_in_after),
                         description=f"Excellent move! {move.move_san} significantly improves the position.",
@@ -756,6 +766,7 @@ def detect_highlights_in_game(
                         color=move.color,
                         cp_loss=0
                     ))
+        lap('brilliant')
 
         # =================================================================
         # Tier 2: Blunders (dramatic mistakes)
@@ -780,6 +791,7 @@ def detect_highlights_in_game(
                 move=move.move_san,
                 move_uci=move.move_uci,
                 best_move=move.best_move_san,
+                best_line=move.best_line,
                 eval_before=format_eval(move.eval_before, move.eval_type_before == 'mate', move.mate_in_before),
                 eval_after=format_eval(move.eval_after, move.eval_type_after == 'mate', move.mate_in_after),
                 description=desc,
@@ -787,8 +799,10 @@ def detect_highlights_in_game(
                 game_index=game_data.game_index,
                 color=move.color,
                 cp_loss=move.cp_loss,
-                win_pct_loss=move.win_pct_loss
+                win_pct_loss=move.win_pct_loss,
+                alternatives=move.alternatives
             ))
+        lap('blunder')
 
         # =================================================================
         # Tier 2: Comebacks (big eval swing recovery)
@@ -806,6 +820,7 @@ def detect_highlights_in_game(
                         move=move.move_san,
                         move_uci=move.move_uci,
                         best_move=move.best_move_san,
+                        best_line=move.best_line,
                         eval_before=format_eval(move.eval_before, move.eval_type_before == 'mate', move.mate_in_before),
                         eval_after=format_eval(move.eval_after, move.eval_type_after == 'mate', move.mate_in_after),
                         description=f"Comeback! White was losing but {move.move_san} turns the tables.",
@@ -828,6 +843,7 @@ def detect_highlights_in_game(
                         move=move.move_san,
                         move_uci=move.move_uci,
                         best_move=move.best_move_san,
+                        best_line=move.best_line,
                         eval_before=format_eval(move.eval_before, move.eval_type_before == 'mate', move.mate_in_before),
                         eval_after=format_eval(move.eval_after, move.eval_type_after == 'mate', move.mate_in_after),
                         description=f"Comeback! Black was losing but {move.move_san} turns the tables.",
@@ -837,6 +853,7 @@ def detect_highlights_in_game(
                         cp_loss=0
                     ))
                     max_eval_seen['black'] = 0  # Reset to avoid duplicate
+        lap('comeback')
 
         # =================================================================
         # Tier 3: Tactical shots (checks with big eval swing)
@@ -856,6 +873,7 @@ def detect_highlights_in_game(
                     move=move.move_san,
                     move_uci=move.move_uci,
                     best_move=move.best_move_san,
+                    best_line=move.best_line,
                     eval_before=format_eval(move.eval_before, move.eval_type_before == 'mate', move.mate_in_before),
                     eval_after=format_eval(move.eval_after, move.eval_type_after == 'mate', move.mate_in_after),
                     description=f"Tactical shot! {move.move_san} wins material with check.",
@@ -863,6 +881,7 @@ def detect_highlights_in_game(
                     game_index=game_data.game_index,
                     color=move.color
                 ))
+        lap('tactical_check')
 
         # =================================================================
         # Tier 4: Special moves
@@ -882,6 +901,7 @@ def detect_highlights_in_game(
                     move=move.move_san,
                     move_uci=move.move_uci,
                     best_move=move.best_move_san,
+                    best_line=move.best_line,
                     eval_before=format_eval(move.eval_before, move.eval_type_before == 'mate', move.mate_in_before),
                     eval_after=format_eval(move.eval_after, move.eval_type_after == 'mate', move.mate_in_after),
                     description=f"En passant! {move.move_san} - the special pawn capture.",
@@ -889,6 +909,7 @@ def detect_highlights_in_game(
                     game_index=game_data.game_index,
                     color=move.color
                 ))
+        lap('en_passant')
 
         # Detect underpromotion
         if '=' in move.move_san and '=Q' not in move.move_san:
@@ -902,6 +923,7 @@ def detect_highlights_in_game(
                 move=move.move_san,
                 move_uci=move.move_uci,
                 best_move=move.best_move_san,
+                best_line=move.best_line,
                 eval_before=format_eval(move.eval_before, move.eval_type_before == 'mate', move.mate_in_before),
                 eval_after=format_eval(move.eval_after, move.eval_type_after == 'mate', move.mate_in_after),
                 description=f"Underpromotion! {move.move_san} - promoting to {piece_names.get(promo_piece, promo_piece)} instead of queen!",
@@ -909,6 +931,7 @@ def detect_highlights_in_game(
                 game_index=game_data.game_index,
                 color=move.color
             ))
+        lap('underpromotion')
 
     return highlights
 
@@ -1141,23 +1164,57 @@ def print_player_summary(players: dict[str, PlayerData]):
 def main():
     parser = argparse.ArgumentParser(description='Generate player highlights from chess games')
     parser.add_argument('--depth', type=int, default=15, help='Stockfish search depth (default: 15)')
+    parser.add_argument('--nodes', type=int, default=0, help='Search N nodes per position instead of a fixed depth')
+    parser.add_argument('--movetime', type=int, default=0,
+                        help='Search N milliseconds per position instead of a fixed depth')
     parser.add_argument('--limit', type=int, default=0, help='Limit to first N players (0 = all)')
     parser.add_argument('--min-games', type=int, default=3, help='Minimum games per player (default: 3)')
     parser.add_argument('--player', type=str, default='', help='Analyze specific player only')
+    parser.add_argument('--multipv', type=int, default=1,
+                        help='Engine lines per position; >1 lists alternative moves for blunders (default: 1)')
     parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
     parser.add_argument('--stockfish-path', type=str, default='/opt/homebrew/bin/stockfish',
                         help='Path to Stockfish binary')
+    parser.add_argument('--hash', type=int, default=64, help='Engine hash table size in MB, per process (default: 64)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of Stockfish processes searching in parallel (default: 1)')
+    parser.add_argument('--cache', type=str, default=str(DEFAULT_CACHE_PATH),
+                        help='Path to the persistent evaluation cache')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the persistent evaluation cache')
+    parser.add_argument('--opening-book', type=str, default=str(DEFAULT_BOOK_PATH),
+                        help='Path to the opening book evaluation table')
+    parser.add_argument('--no-book', action='store_true', help='Search opening positions instead of using the book')
+    parser.add_argument('--checkpoint', type=str, default=str(default_checkpoint_path('generate-highlights')),
+                        help='Sidecar file recording evaluated games (removed once the output is written)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip searching games evaluated by an interrupted run with the same settings')
+    parser.add_argument('--record', type=str, default='',
+                        help='Write every engine answer of this run to an engine recording file')
+    parser.add_argument('--replay', type=str, default='',
+                        help='Answer searches from an engine recording instead of running Stockfish')
+    parser.add_argument('--pgn', type=str, default='', help='PGN file to analyze (default: all-games.pgn next to this script)')
+    parser.add_argument('--output', type=str, default='',
+                        help='Output JSON file (default: public/stats/season-2-highlights.json)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Record a time breakdown per phase, engine call and detector in the output')
+    parser.add_argument('--profile-stats', type=str, default='',
+                        help='With --profile, also dump cProfile stats of the main thread to this file')
     args = parser.parse_args()
+    profiler = Profiler(args.profile, args.profile_stats or None).start()
+    # Each phase is charged the time since the previous one ended
+    end_phase = profiler.laps('phase')
 
     # Determine paths
     script_dir = Path(__file__).parent
-    pgn_path = script_dir / 'all-games.pgn'
-    output_dir = script_dir.parent.parent / 'public' / 'stats'
-    output_path = output_dir / 'season-2-highlights.json'
+    pgn_path = Path(args.pgn) if args.pgn else script_dir / 'all-games.pgn'
+    output_path = Path(args.output) if args.output else script_dir.parent.parent / 'public' / 'stats' / 'season-2-highlights.json'
+    output_dir = output_path.parent
 
     print("🎯 K4 Classical League - Player Highlight Generator\n", file=sys.stderr)
     print(f"⚙️  Settings:", file=sys.stderr)
-    print(f"   Stockfish depth: {args.depth}", file=sys.stderr)
+    search_limit = SearchLimit.from_args(args)
+    print(f"   Stockfish search: {search_limit.describe()} (MultiPV {args.multipv})", file=sys.stderr)
+    print(f"   Eval cache: {'disabled' if args.no_cache else args.cache}", file=sys.stderr)
     print(f"   Minimum games: {args.min_games}", file=sys.stderr)
     if args.limit > 0:
         print(f"   Player limit: {args.limit}", file=sys.stderr)
@@ -1177,6 +1234,7 @@ def main():
 
     games = parse_pgn_file(str(pgn_path), verbose=args.verbose)
     print(f"✅ Parsed {len(games)} games", file=sys.stderr)
+    end_phase('parse pgn')
 
     # Count total moves
     total_moves = sum(g.move_count for g in games)
@@ -1210,6 +1268,7 @@ def main():
 
     # Print summary
     print_player_summary(players)
+    end_phase('group players')
 
     # ==========================================================================
     # Phase 2: Stockfish Analysis
@@ -1229,54 +1288,156 @@ def main():
     print(f"   Games to analyze: {len(games_list)}", file=sys.stderr)
     print(f"   Moves to analyze: {total_moves_to_analyze}", file=sys.stderr)
 
-    # Estimate time
-    est_seconds = total_moves_to_analyze * 0.3  # ~0.3 sec per move at depth 15
-    est_minutes = est_seconds / 60
-    print(f"   Estimated time: {est_minutes:.1f} minutes", file=sys.stderr)
-
-    # Initialize Stockfish
-    try:
-        stockfish = Stockfish(path=args.stockfish_path, depth=args.depth)
-        stockfish.set_depth(args.depth)
-        print(f"   Stockfish initialized (depth {args.depth})", file=sys.stderr)
-    except Exception as e:
-        print(f"❌ Error initializing Stockfish: {e}", file=sys.stderr)
-        print(f"   Make sure Stockfish is installed: brew install stockfish", file=sys.stderr)
-        sys.exit(1)
-
-    # Analyze each game
-    game_analyses: dict[int, GameAnalysis] = {}
-    print(f"\n   Analyzing games:", file=sys.stderr)
-
-    for i, game in enumerate(games_list):
-        # Progress bar
-        progress = (i + 1) / len(games_list) * 100
-        bar = '█' * int(progress / 5) + '░' * (20 - int(progress / 5))
-
-        # Truncate names for display
-        white_short = game.white[:15] + '...' if len(game.white) > 15 else game.white
-        black_short = game.black[:15] + '...' if len(game.black) > 15 else game.black
-
-        print(f"\r   [{bar}] {progress:3.0f}% | Game {i+1}/{len(games_list)} | {white_short} vs {black_short}",
-              end='', flush=True, file=sys.stderr)
-
-        # Skip games with no moves
+    # Gather the unique positions of all games so shared openings and
+    # transpositions are only searched once.
+    batch = PositionBatch()
+    for game in games_list:
         if game.move_count == 0:
             continue
+        batch.add_game(game.game_index, game.fens, range(len(game.fens)), [move.uci() for move in game.moves])
+    print(f"   Positions: {batch.summary()}", file=sys.stderr)
+
+    # Resolve opening positions from the precomputed book table
+    book = OpeningBook() if args.no_book else OpeningBook.load(args.opening_book)
+    book_plies = {game.game_index: book.book_plies(game.fens) for game in games_list}
+    resolved = batch.resolve(lambda request: book.get(request.fen, search_limit.book_depth))
+    print(f"   Opening book: {resolved} positions resolved without search ({len(book)} in book)", file=sys.stderr)
+    end_phase('collect positions')
+
+    # Initialize Stockfish (or load the recorded answers of an earlier run)
+    args.jobs = max(1, args.jobs)
+    if args.replay:
+        try:
+            stockfish = EngineRecording(args.replay)
+        except EngineError as e:
+            print(f"❌ Error loading engine recording: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"   Replaying {len(stockfish)} recorded engine answers ({stockfish.name})", file=sys.stderr)
+    else:
+        try:
+            stockfish = UciEngine(args.stockfish_path, depth=args.depth, options={'Hash': args.hash})
+            print(f"   Stockfish initialized ({stockfish.name}, {args.jobs} process(es))", file=sys.stderr)
+        except Exception as e:
+            print(f"❌ Error initializing Stockfish: {e}", file=sys.stderr)
+            print(f"   Make sure Stockfish is installed: brew install stockfish", file=sys.stderr)
+            sys.exit(1)
 
-        # Analyze the game
-        analysis = analyze_game_with_stockfish(game, stockfish, args.depth, args.verbose)
-        game_analyses[game.game_index] = analysis
+    # Evaluated games are checkpointed as {position key: evaluation}; with --resume
+    # the positions of games finished by an earlier run need no search
+    checkpoint = Checkpoint(args.checkpoint, {
+        'engine': stockfish.name,
+        'search': search_limit.to_dict(),
+        'multipv': args.multipv,
+        'book': not args.no_book
+    }, resume=args.resume)
+    game_keys = {
+        game.game_index: game_key(
+            {'Date': game.date, 'Round': game.round_num, 'White': game.white, 'Black': game.black, 'Result': game.result},
+            (move.uci() for move in game.moves)
+        )
+        for game in games_list
+    }
+    if args.resume:
+        checkpointed = {}
+        for key in game_keys.values():
+            checkpointed.update(checkpoint.get(key) or {})
+        from_checkpoint = batch.resolve(lambda request: checkpointed.get(request.key))
+        print(f"   Resuming: {from_checkpoint} positions from {checkpoint.resumed} checkpointed games", file=sys.stderr)
+        resolved += from_checkpoint
+
+    if args.replay:
+        pool = ReplayPool(stockfish)
+    else:
+        # Estimate time per search mode (upper bound: cached positions are free)
+        to_search = batch.unique_positions - resolved
+        print(f"   Estimated time for {to_search} positions:", file=sys.stderr)
+        for line in cost_estimate_lines(search_limit, args.depth, to_search, args.jobs, stockfish.measure_nps()):
+            print(f"   {line}", file=sys.stderr)
+        stockfish.quit()
+
+        # The pool's engines search upcoming games from one event loop while this
+        # thread analyzes the games whose evaluations are in
+        pool = EnginePool(args.stockfish_path, size=args.jobs, depth=args.depth, options={'Hash': args.hash},
+                          cache_path=None if args.no_cache else args.cache, record_path=args.record or None,
+                          profiler=profiler)
+    end_phase('engine startup')
+    tasks = [(batch.pending(game.game_index), search_limit) for game in games_list if game.move_count > 0]
+    evaluated = profiler.waiting(pool.map(tasks, args.multipv))
+    throughput = Throughput(sum(len(requests) for requests, _ in tasks)) if profiler.enabled else None
+    cache_hits = cache_misses = 0
+
+    # Analyze each game. On SIGTERM (e.g. a workflow timeout), stop here and
+    # build the output from the games analyzed so far.
+    game_analyses: dict[int, GameAnalysis] = {}
+    print(f"\n   Analyzing games:", file=sys.stderr)
+    terminate_on_sigterm()
+    terminated = False
 
-    print(f"\n\n✅ Stockfish analysis complete!", file=sys.stderr)
+    try:
+        for i, game in enumerate(games_list):
+            # Progress bar
+            progress = (i + 1) / len(games_list) * 100
+            bar = '█' * int(progress / 5) + '░' * (20 - int(progress / 5))
+
+            # Truncate names for display
+            white_short = game.white[:15] + '...' if len(game.white) > 15 else game.white
+            black_short = game.black[:15] + '...' if len(game.black) > 15 else game.black
+
+            eta = f" | {throughput.eta()}" if throughput is not None else ''
+            print(f"\r   [{bar}] {progress:3.0f}% | Game {i+1}/{len(games_list)} | {white_short} vs {black_short}{eta}",
+                  end='', flush=True, file=sys.stderr)
+
+            # Skip games with no moves
+            if game.move_count == 0:
+                continue
+
+            # Collect the evaluations of positions first reached in this game, then analyze it.
+            # The engine follows the game move by move, so its hash is only cleared between games.
+            evaluations, hits, misses = next(evaluated)
+            if throughput is not None:
+                throughput.advance(len(evaluations))
+            batch.record(game.game_index, evaluations)
+            cache_hits += hits
+            cache_misses += misses
+
+            with profiler.section('analysis', 'analyze_game_with_stockfish'):
+                analysis = analyze_game_with_stockfish(game, batch.game_evals(game.game_index), args.verbose,
+                                                       book_plies[game.game_index])
+            game_analyses[game.game_index] = analysis
+            checkpoint.add(game_keys[game.game_index], {
+                key: evaluation
+                for key, evaluation in zip(batch.game_keys(game.game_index), batch.game_evals(game.game_index))
+            })
+    except Terminated:
+        terminated = True
+    except EngineError as e:
+        print(f"\n\n❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        evaluated.close()
+        pool.close()
+        checkpoint.close()
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)  # The checkpoint is safe from here on
+    end_phase('engine analysis')
+
+    if terminated:
+        print(f"\n\n⚠️  Terminated after {len(game_analyses)} of {len(games_list)} games: writing partial highlights, "
+              f"re-run with --resume to continue (checkpoint: {args.checkpoint})", file=sys.stderr)
+    else:
+        print(f"\n\n✅ Stockfish analysis complete!", file=sys.stderr)
+    if not args.no_cache and not args.replay:
+        print(f"   Eval cache: {cache_hits}/{cache_hits + cache_misses} positions served from cache", file=sys.stderr)
 
     # Print some stats
     total_blunders = 0
     total_mistakes = 0
     total_excellent = 0
+    total_book = 0
     for analysis in game_analyses.values():
         for move in analysis.moves:
-            if move.classification == 'blunder':
+            if move.classification == 'book':
+                total_book += 1
+            elif move.classification == 'blunder':
                 total_blunders += 1
             elif move.classification == 'mistake':
                 total_mistakes += 1
@@ -1284,6 +1445,7 @@ def main():
                 total_excellent += 1
 
     print(f"   Move classifications:", file=sys.stderr)
+    print(f"   - Book moves: {total_book}", file=sys.stderr)
     print(f"   - Excellent moves: {total_excellent}", file=sys.stderr)
     print(f"   - Mistakes: {total_mistakes}", file=sys.stderr)
     print(f"   - Blunders: {total_blunders}", file=sys.stderr)
@@ -1299,6 +1461,7 @@ def main():
         player_cards[name] = card
 
     print(f"✅ Generated {len(player_cards)} player cards", file=sys.stderr)
+    end_phase('player cards')
 
     # Show top accuracy players
     sorted_by_accuracy = sorted(player_cards.values(), key=lambda c: c.accuracy_overall, reverse=True)
@@ -1319,7 +1482,7 @@ def main():
 
     for game_index, analysis in game_analyses.items():
         game = games_to_analyze[game_index]
-        highlights = detect_highlights_in_game(game, analysis)
+        highlights = detect_highlights_in_game(game, analysis, profiler)
 
         # Add game context to each highlight
         for h in highlights:
@@ -1337,6 +1500,7 @@ def main():
 
     total_highlights = sum(len(h) for h in all_highlights.values())
     print(f"✅ Detected {total_highlights} highlight candidates", file=sys.stderr)
+    end_phase('pattern detection')
     print(f"   Breakdown:", file=sys.stderr)
     for htype, count in sorted(highlight_counts.items(), key=lambda x: -x[1]):
         if count > 0:
@@ -1386,6 +1550,7 @@ def main():
     players_with_highlights = sum(1 for h in selected_highlights.values() if h)
     total_selected = sum(len(h) for h in selected_highlights.values())
     print(f"✅ Selected {total_selected} highlights for {players_with_highlights} players", file=sys.stderr)
+    end_phase('highlight selection')
 
     print(f"\n💾 Phase 5: Output generation...", file=sys.stderr)
 
@@ -1394,17 +1559,19 @@ def main():
     output = {
         'generated': datetime.now().isoformat(),
         'season': 2,
-        'status': 'complete',
+        'status': 'partial' if terminated else 'complete',
         'playerCount': len(players),
         'totalGames': len(games),
         'totalMoves': total_moves,
         'analysisStats': {
             'gamesAnalyzed': len(game_analyses),
             'movesAnalyzed': total_moves_to_analyze,
+            'bookMoves': total_book,
             'excellentMoves': total_excellent,
             'mistakes': total_mistakes,
             'blunders': total_blunders,
-            'depth': args.depth
+            'depth': args.depth,
+            'search': search_limit.to_dict()
         },
         'highlightStats': {
             'totalCandidates': total_highlights,
@@ -1422,6 +1589,9 @@ def main():
             for player in players.values()
         ]
     }
+    end_phase('output')
+    if profiler.enabled:
+        output['profile'] = profiler.stop()
 
     # Ensure output directory exists
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -1434,6 +1604,14 @@ def main():
     print(f"   Output saved to: {output_path}", file=sys.stderr)
     print(f"   Players: {len(players)}", file=sys.stderr)
     print(f"   Highlights: {total_selected}", file=sys.stderr)
+    if profiler.enabled:
+        print(f"\n⏱️  Profile:", file=sys.stderr)
+        for line in profiler.summary_lines():
+            print(f"   {line}", file=sys.stderr)
+
+    if terminated:
+        sys.exit(128 + signal.SIGTERM)
+    checkpoint.discard()
 
 
 if __name__ == '__main__':